@@ -0,0 +1,194 @@
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+from kivy.config import ConfigParser
+from kivy.logger import Logger as logger
+
+from .config import ButtonConfig
+from .core.metrics import Histogram
+from .hass_client import PreparedCommand, service_call
+
+# Stages of an action, each timed from the touch that started it:
+#   input   → the touch reached the action handler
+#   send    → the service call was written to the websocket (or queued while offline)
+#   result  → HA answered the call
+#   confirm → the button's state_entity changed state
+STAGES = ("input", "send", "result", "confirm")
+
+
+def action_command(button: ButtonConfig) -> Optional[PreparedCommand]:
+    """
+    The service call for ``button.action`` (``domain.service``), serialized once.
+
+    It targets the button's ``state_entity`` when that belongs to the action's domain
+    (``light.toggle`` for ``light.porch``); scripts and scenes are called as they are.
+    """
+    if not button.action or "." not in button.action:
+        return None
+    domain, service = button.action.split(".", 1)
+    target = None
+    if button.state_entity and button.state_entity.split(".", 1)[0] == domain:
+        target = {"entity_id": button.state_entity}
+    return PreparedCommand(service_call(domain, service, target=target))
+
+
+@dataclass
+class ActionStats:
+    presses: int = 0
+    debounced: int = 0  # presses ignored, too soon after the previous one
+    failed: int = 0
+    cancelled: int = 0  # withdrawn by sliding off before they were sent
+    unconfirmed: int = 0  # state_entity did not change within confirm_timeout
+
+
+class _Press:
+    __slots__ = ("button", "touched", "future")
+
+    def __init__(self, button: ButtonConfig, touched: float):
+        self.button = button
+        self.touched = touched  # perf_counter() time of the touch
+        self.future: Optional[Future] = None
+
+
+class ActionPipeline:
+    """
+    Send the service call of a pressed button and time it from the touch onwards.
+
+    Every button's call is built and serialized once (``set_buttons``), so a press
+    only splices in the message id before the websocket write. ``press`` takes the
+    touch's ``time_start`` and records each of ``STAGES`` in the ``latency``
+    histograms; ``observe`` (the client's ``on_entity_update``, any thread) completes
+    a press when its ``state_entity`` changes.
+
+    Presses of one button closer than ``debounce`` seconds are ignored. A touch-down
+    press reaches ``press`` only after the grid's arming delay, so a finger sliding off
+    sooner sends nothing. ``cancel`` withdraws one whose finger slid off later; that
+    only works while the call still waits in the offline queue, a call already sent
+    cannot be taken back.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        buttons: Iterable[ButtonConfig] = (),
+        debounce: float = 0.3,
+        confirm_timeout: float = 10.0,
+    ):
+        self.client = client
+        self.debounce = debounce
+        self.confirm_timeout = confirm_timeout
+        self.stats = ActionStats()
+        self.latency: Dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+        self._commands: Dict[str, PreparedCommand] = {}
+        self._last_press: Dict[str, float] = {}
+        self._inflight: Dict[str, _Press] = {}  # button key -> latest press
+        self._lock = threading.Lock()
+        self.set_buttons(buttons)
+
+    @classmethod
+    def from_config(cls, cfg: ConfigParser, client: Any, **kwargs) -> "ActionPipeline":
+        kwargs.setdefault("debounce", cfg.getfloat("buttons", "button_action_timeout") / 1000)
+        kwargs.setdefault("confirm_timeout", cfg.getfloat("buttons", "confirm_timeout"))
+        return cls(client, **kwargs)
+
+    # ---------- Public API ----------
+
+    def set_buttons(self, buttons: Iterable[ButtonConfig]):
+        commands = {}
+        for button in buttons:
+            command = action_command(button)
+            if command is not None:
+                commands[button.key] = command
+        self._commands = commands
+
+    def press(self, button: ButtonConfig, touch_time: Optional[float] = None) -> Optional[Future]:
+        """
+        Send ``button``'s call. ``touch_time`` is the ``time.time()`` of the touch
+        (``MotionEvent.time_start``); without it timing starts now.
+        """
+        now = time.perf_counter()
+        lag = max(time.time() - touch_time, 0.0) if touch_time is not None else 0.0
+        command = self._commands.get(button.key)
+        if command is None:
+            logger.warning("Actions: Button %s has no valid action (%s)", button.key, button.action)
+            return None
+        last = self._last_press.get(button.key)
+        if last is not None and now - last < self.debounce:
+            self.stats.debounced += 1
+            return None
+        self._last_press[button.key] = now
+        self.stats.presses += 1
+        self.latency["input"].add(lag)
+
+        press = _Press(button, now - lag)
+        with self._lock:
+            self._inflight[button.key] = press
+        press.future = future = self.client.send_command(command)
+        self.latency["send"].add(time.perf_counter() - press.touched)
+        future.add_done_callback(lambda f: self._on_result(press, f))
+        return future
+
+    def cancel(self, button: ButtonConfig) -> bool:
+        """Withdraw the latest press of ``button`` if its call was not sent yet."""
+        with self._lock:
+            press = self._inflight.get(button.key)
+        if press is None or press.future is None or not self.client.cancel_command(press.future):
+            return False
+        with self._lock:
+            if self._inflight.get(button.key) is press:
+                del self._inflight[button.key]
+        self.stats.cancelled += 1
+        return True
+
+    def observe(
+        self,
+        entity_id: str,
+        new_state: Optional[Dict[str, Any]],
+        old_state: Optional[Dict[str, Any]],
+    ):
+        if not self._inflight:
+            return
+        now = time.perf_counter()
+        changed = (new_state or {}).get("state") != (old_state or {}).get("state")
+        with self._lock:
+            for key, press in list(self._inflight.items()):
+                if now - press.touched > self.confirm_timeout:
+                    del self._inflight[key]
+                    self.stats.unconfirmed += 1
+                elif changed and press.button.state_entity == entity_id:
+                    del self._inflight[key]
+                    self.latency["confirm"].add(now - press.touched)
+
+    def summary(self) -> Dict[str, Dict[str, Optional[float]]]:
+        return {stage: self.latency[stage].summary() for stage in STAGES}
+
+    def log_summary(self):
+        for stage, summary in self.summary().items():
+            if summary["count"]:
+                logger.info(
+                    "Actions: %-7s n=%d p50=%.0f ms p95=%.0f ms max=%.0f ms",
+                    stage,
+                    summary["count"],
+                    summary["p50"] * 1000,
+                    summary["p95"] * 1000,
+                    summary["max"] * 1000,
+                )
+
+    # ---------- Internals ----------
+
+    def _on_result(self, press: _Press, future: Future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.stats.failed += 1
+            logger.warning("Actions: %s failed: %s", press.button.action, error)
+        else:
+            self.latency["result"].add(time.perf_counter() - press.touched)
+        if error is not None or not press.button.state_entity:
+            with self._lock:
+                if self._inflight.get(press.button.key) is press:
+                    del self._inflight[press.button.key]
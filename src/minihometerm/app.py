@@ -1,15 +1,36 @@
 # flake8: noqa: E402
 import os
 from configparser import ConfigParser
+from typing import List, Optional, Tuple
 
 # Ensure Kivy behaves in headless-friendly mode unless a window is explicitly desired.
 os.environ.setdefault("KIVY_NO_ARGS", "1")
 
 from kivy.app import App
+from kivy.clock import Clock
 from kivy.lang import Builder
 from kivy.logger import Logger as logger
+from kivy.metrics import dp
+from kivy.uix.label import Label
 from kivy.uix.screenmanager import Screen
 
+from .actions import ActionPipeline
+from .config import CACHE_DIR, ButtonConfig, parse_buttons
+from .core.bindings import BindingRegistry
+from .core.forecast import ForecastCache, ForecastFeed
+from .core.statistics import StatisticsFeed, StatisticsStore, parse_charts
+from .hass_process import client_from_config
+from .helpers.profiler import CornerTaps, SamplingProfiler
+from .ui.browser import EntityBrowserScreen
+from .ui.buttons import ButtonGrid  # noqa: F401  (used in KV)
+from .ui.camera import CameraScreen, camera_url
+from .ui.forecast import ForecastPanel  # noqa: F401  (used in KV)
+from .ui.loader import discover_screens
+from .ui.prebuild import IdleBuilder
+from .ui.statistics import BUCKETS, StatisticsScreen
+from .ui.theme import Theme, configured_theme
+from .ui.widgets import TemplateLabel
+
 # flake8: enable=E402
 
 KV = """
@@ -29,15 +50,36 @@ ScreenManager:
         Label:
             id: title_lbl
             text: app.title
-            font_size: "24sp"
             size_hint_y: None
             height: self.texture_size[1] + dp(8)
 
+        Label:
+            id: status_lbl
+            text: ""
+            size_hint_y: None
+            height: self.texture_size[1] if self.text else 0
+
+        BoxLayout:
+            id: templates
+            orientation: "vertical"
+            size_hint_y: None
+            height: self.minimum_height
+
         Button:
             text: "Click me"
             size_hint_y: None
             height: dp(48)
             on_release: app.on_click_me()
+
+        ForecastPanel:
+            id: forecast
+            size_hint_y: None
+            height: dp(96)
+
+        ButtonGrid:
+            id: buttons
+            on_action: app.on_button_action(*args[1:])
+            on_action_cancel: app.on_button_cancel(args[1])
 """
 
 
@@ -48,12 +90,259 @@ class HomeScreen(Screen):
 class MiniHomeTerm(App):
     title = "MiniHomeTerm"
 
-    def __init__(self, cfg: ConfigParser, **kwargs):
+    def __init__(
+        self,
+        cfg: ConfigParser,
+        profiler: Optional[SamplingProfiler] = None,
+        connect: bool = False,
+        **kwargs,
+    ):
         super().__init__(**kwargs)
+        self.cfg = cfg
+        self.profiler = profiler
+        self.connect = connect  # talk to HA; off for tests and UI work without a server
+        self.client = None
+        self.followed: List[str] = []  # entities the client is limited to
+        self.actions: Optional[ActionPipeline] = None
+        self.forecast: Optional[ForecastFeed] = None
+        self.template_labels: List[TemplateLabel] = []
+        self.status_label: Optional[Label] = None  # shows a stale connection
+        self.statistics: Optional[StatisticsFeed] = None
+        self.charts: List[Tuple[str, str]] = []
+        self.bindings = BindingRegistry()
+        self._profile_taps = CornerTaps()
+        self.prebuilder = IdleBuilder()
+        self.theme = Theme.instance()
 
     def build(self):
-        return Builder.load_string(KV)
+        from kivy.core.window import Window
+
+        self.apply_theme()
+        self.theme.bind("background", Window, "clearcolor")
+        root = Builder.load_string(KV)
+        home = root.get_screen("home")
+        self.theme.bind("text", home.ids.title_lbl, "color")
+        self.theme.bind("font_title", home.ids.title_lbl, "font_size")
+        self.status_label = home.ids.status_lbl
+        self.theme.bind("text_muted", self.status_label, "color")
+        if self.cfg.get("ui", "theme", fallback="dark").strip().lower() == "auto":
+            Clock.schedule_interval(self.apply_theme, 60)
+        grid = home.ids.buttons
+        grid.cols = self.cfg.getint("buttons", "columns", fallback=2)
+        grid.tile_height = self.cfg.getfloat("buttons", "tile_height", fallback=96)
+        grid.trigger = self.cfg.get("buttons", "trigger", fallback="release").strip().lower()
+        grid.arm_delay = self.cfg.getfloat("buttons", "press_delay", fallback=100) / 1000
+        grid.set_buttons(parse_buttons(self.cfg))
+        self._build_templates(home.ids.templates)
+        panel = home.ids.forecast
+        if self.cfg.getboolean("ui", "show_forecast", fallback=True):
+            panel.days = self.cfg.getint("ui", "forecast_days", fallback=5)
+        else:
+            panel.parent.remove_widget(panel)
+            panel = None
+        if self.connect:
+            self._connect(grid)
+            if panel is not None:
+                self._connect_forecast(panel)
+        # Other screens are built in idle frames after startup, so neither the cold
+        # start nor the first transition to them pays for it.
+        for cls in discover_screens("minihometerm.ui"):
+            name = getattr(cls, "screen_name", None)
+            if name and not root.has_screen(name):
+                self.prebuilder.add(
+                    f"screen:{name}", self._screen_builder(root, cls, name), self._screen_built
+                )
+        self.prebuilder.bind_window(Window)
+        self.prebuilder.start()
+        if self.profiler and self.cfg.getboolean("diagnostics", "profile_gesture", fallback=True):
+            Window.bind(on_touch_down=self.on_window_touch)
+        return root
+
+    def on_start(self):
+        if self.client is not None:
+            self.client.start()
+        if self.forecast is not None:
+            self.forecast.start()
+        if self.statistics is not None:
+            # Queued until the client is authenticated
+            self.statistics.refresh()
+            interval = self.cfg.getfloat("statistics", "refresh_interval", fallback=300)
+            Clock.schedule_interval(lambda _dt: self.statistics.refresh(), interval)
+
+    def on_stop(self):
+        camera = self.prebuilder.result("screen:camera")
+        if camera is not None:
+            camera.view.stop()
+        if self.forecast is not None:
+            self.forecast.stop()
+        if self.client is not None:
+            self.client.stop()
+        if self.statistics is not None:
+            self.statistics.store.flush()
+        if self.actions is not None:
+            self.actions.log_summary()
+
+    def on_entity_update(self, entity_id, new_state, old_state):
+        # Client thread (or the UI thread when polled from a client process)
+        if self.actions is not None:
+            self.actions.observe(entity_id, new_state, old_state)
+        Clock.schedule_once(lambda _dt: self._dispatch_update(entity_id, new_state, old_state))
+
+    def _dispatch_update(self, entity_id, new_state, old_state):
+        self.bindings.dispatch(entity_id, new_state, old_state)
+        browser = self.prebuilder.result("screen:browser")
+        if browser is not None:
+            browser.entity_updated(entity_id, new_state, old_state)
+
+    def on_stale(self, stale: bool):
+        # Client thread
+        Clock.schedule_once(lambda _dt: self._show_stale(stale))
+
+    def _show_stale(self, stale: bool):
+        if self.status_label is not None:
+            self.status_label.text = "Not connected, states may be out of date" if stale else ""
+
+    def on_statistics(self, statistic_ids: List[str]):
+        # Client thread
+        screen = self.prebuilder.result("screen:statistics")
+        if screen is not None:
+            screen.push(statistic_ids)
+
+    def apply_theme(self, *_args):
+        """Switch to the theme configured for now; only changed colours are touched."""
+        name = configured_theme(self.cfg)
+        try:
+            self.theme.switch(name)
+        except KeyError:
+            logger.warning("MiniHomeTerm: Unknown theme %r", name)
+
+    def show_screen(self, name: str):
+        self.prebuilder.ensure(f"screen:{name}")
+        self.root.current = name
+
+    @staticmethod
+    def _screen_builder(root, cls, name: str):
+        def build():
+            screen = cls(name=name)
+            yield
+            # Sized like the manager, its layout runs in the next frame, not on first show
+            screen.size = root.size
+            root.add_widget(screen)
+            return screen
+
+        return build
+
+    def _screen_built(self, screen):
+        if isinstance(screen, EntityBrowserScreen) and self.client is not None:
+            screen.set_states(self.client.states)
+            screen.bind(on_pre_enter=self._follow_all, on_leave=self._follow_buttons)
+        if isinstance(screen, StatisticsScreen) and self.statistics is not None:
+            screen.bucket = self.cfg.get("statistics", "bucket", fallback="day").strip()
+            screen.days = self.cfg.getfloat("statistics", "days", fallback=7)
+            screen.set_store(self.statistics.store, self.charts, self.statistics.period)
+        if isinstance(screen, CameraScreen) and self.client is not None:
+            entity_id = self.cfg.get("camera", "entity", fallback="").strip()
+            if entity_id:
+                stream = self.cfg.getboolean("camera", "stream", fallback=False)
+                screen.view.interval = self.cfg.getfloat("camera", "interval", fallback=1.0)
+                screen.view.mjpeg = stream
+                screen.view.token = self.client.token
+                screen.view.url = camera_url(self.client.url, entity_id, stream)
+
+    def on_window_touch(self, window, touch):
+        if self._profile_taps.feed(touch.x, touch.y, window.width, window.height):
+            self.profiler.toggle()
+        return False
 
     def on_click_me(self):
         # Placeholder for business logic
         logger.info("MiniHomeTerm: Button clicked!")
+
+    def on_button_action(self, button: ButtonConfig, touch=None):
+        logger.info(f"MiniHomeTerm: Button {button.key} pressed ({button.action})")
+        if self.actions is not None:
+            self.actions.press(button, touch.time_start if touch is not None else None)
+
+    def on_button_cancel(self, button: ButtonConfig):
+        if self.actions is not None and self.actions.cancel(button):
+            logger.info(f"MiniHomeTerm: Button {button.key} action withdrawn")
+
+    def _build_templates(self, box):
+        if not self.cfg.has_section("templates"):
+            return
+        for _name, template in self.cfg.items("templates"):
+            if not template.strip():
+                continue
+            label = TemplateLabel(template=template, size_hint_y=None, height=dp(32))
+            self.theme.bind("text", label, "color")
+            box.add_widget(label)
+            self.template_labels.append(label)
+
+    def _follow_all(self, *_args):
+        # The browser lists every entity: receive all of them while it is open
+        self.client.set_entities(())
+        self.client.resync()
+
+    def _follow_buttons(self, *_args):
+        self.client.set_entities(self.followed)
+
+    def _connect(self, grid):
+        self.followed = grid.entities()
+        self.client = client_from_config(
+            self.cfg,
+            entities=self.followed,
+            on_entity_update=self.on_entity_update,
+            on_stale=self.on_stale,
+        )
+        self._show_stale(self.client.stale)
+        self.actions = ActionPipeline.from_config(self.cfg, self.client, buttons=grid.buttons)
+        grid.bind_entities(self.bindings)
+        if self.template_labels:
+            if hasattr(self.client, "subscribe_template"):
+                for label in self.template_labels:
+                    label.attach(self.client)
+            else:
+                logger.warning("MiniHomeTerm: Templates are not available with process = 1")
+        try:
+            self._connect_statistics()
+        except ValueError as e:
+            logger.warning("MiniHomeTerm: Statistics disabled: %s", e)
+        poll = getattr(self.client, "poll", None)
+        if poll is not None:
+            Clock.schedule_interval(lambda _dt: poll(), 0)
+
+    def _connect_forecast(self, panel):
+        entity_id = self.cfg.get("conditions", "weather_entity", fallback="").strip()
+        if not entity_id:
+            return
+        if not hasattr(self.client, "subscribe"):
+            logger.warning("MiniHomeTerm: The forecast is not available with process = 1")
+            return
+        forecast_type = self.cfg.get("conditions", "forecast_type", fallback="daily").strip()
+        try:
+            self.forecast = ForecastFeed(
+                self.client,
+                entity_id,
+                forecast_type,
+                cache=ForecastCache(CACHE_DIR / "forecast.json"),
+                on_change=panel.push,
+            )
+        except ValueError as e:
+            logger.warning("MiniHomeTerm: Forecast disabled: %s", e)
+
+    def _connect_statistics(self):
+        self.charts = parse_charts(self.cfg.get("statistics", "charts", fallback=""))
+        if not self.charts:
+            return
+        bucket = self.cfg.get("statistics", "bucket", fallback="day").strip()
+        if bucket not in BUCKETS:
+            raise ValueError(f"Unknown statistics bucket: {bucket!r}")
+        keep = self.cfg.getfloat("statistics", "keep_days", fallback=400) * 86400
+        self.statistics = StatisticsFeed(
+            self.client,
+            [statistic_id for statistic_id, _ in self.charts],
+            period=self.cfg.get("statistics", "period", fallback="hour").strip(),
+            store=StatisticsStore(CACHE_DIR / "statistics.json", keep=keep),
+            history=self.cfg.getfloat("statistics", "days", fallback=7) * 86400,
+            on_change=self.on_statistics,
+        )
@@ -1,6 +1,9 @@
 import os
+import re
 from configparser import MissingSectionHeaderError
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, List, Optional
 
 from kivy.config import ConfigParser
 from kivy.logger import Logger as logger
@@ -10,6 +13,13 @@ APP_NAME = "minihometerm"
 # On Raspberry Pi, run as user “pi” or another; adjust path accordingly
 USER_CONFIG_PATH = Path.home() / ".config" / APP_NAME / "config.ini"
 GLOBAL_CONFIG_PATH = Path(__file__).resolve().parents[2] / "config.ini"
+# Data kept between runs for a warm start (e.g. the last weather forecast)
+CACHE_DIR = Path.home() / ".cache" / APP_NAME
+
+# "button12_label" -> ("12", "label")
+_BUTTON_KEY = re.compile(r"^button(\d+)_(\w+)$")
+# Sub-section form: [button.garage]
+BUTTON_SECTION_PREFIX = "button."
 
 
 def load_config() -> ConfigParser:
@@ -19,7 +29,11 @@ def load_config() -> ConfigParser:
     config.setdefaults(
         "logging",
         {
-            "level": "DEBUG",
+            "level": "INFO",
+            "ring_size": "500",
+            "flush_level": "WARNING",
+            "rate_limit_burst": "5",
+            "rate_limit_period": "60",
         },
     )
 
@@ -27,7 +41,36 @@ def load_config() -> ConfigParser:
         "connection",
         {
             "ws_url": "ws://homeassistant.local:8123/api/websocket",
+            "race_delay": "0.25",
             "token": "<YOUR_LONG_LIVED_TOKEN>",
+            "compression": "1",
+            "command_ttl": "10",
+            "heartbeat_interval": "5",
+            "heartbeat_misses": "2",
+            "catalog_max_age": "86400",
+            "process": "0",
+            "state_slots": "256",
+            "state_slot_size": "2048",
+        },
+    )
+
+    config.setdefaults(
+        "updates",
+        {
+            "min_interval": "0",
+            "intervals": "",
+            "max_pending": "1024",
+        },
+    )
+
+    config.setdefaults(
+        "diagnostics",
+        {
+            "stall_budget": "0.25",
+            "stall_reports": "20",
+            "profile_rate": "100",
+            "profile_duration": "30",
+            "profile_gesture": "1",
         },
     )
 
@@ -36,6 +79,7 @@ def load_config() -> ConfigParser:
         {
             "display_dim_timeout": "60",
             "display_off_timeout": "200",
+            "wake_entities": "",
         },
     )
 
@@ -52,6 +96,8 @@ def load_config() -> ConfigParser:
         "ui",
         {
             "theme": "dark",
+            "dark_from": "20:00",
+            "dark_until": "07:00",
             "fullscreen": "1",
             "screen_dim_timeout": "60",
             "screen_off_timeout": "200",
@@ -59,6 +105,8 @@ def load_config() -> ConfigParser:
             "show_clock": "1",
             "show_temperature": "1",
             "show_temperature_min_max": "1",
+            "show_forecast": "1",
+            "forecast_days": "5",
             "enable_animations": "1",
         },
     )
@@ -69,6 +117,8 @@ def load_config() -> ConfigParser:
             "temperature_sensor": "sensor.smart_outdoor_module_temperature",
             "temperature_min_entity": "input_number.min_temp",
             "temperature_max_entity": "input_number.max_temp",
+            "weather_entity": "weather.forecast_home",
+            "forecast_type": "daily",
         },
     )
 
@@ -76,14 +126,32 @@ def load_config() -> ConfigParser:
         "buttons",
         {
             "button_action_timeout": "300",
-            "button1_label": "Button 1",
-            "button1_icon": "lightbulb",
-            "button1_state_entity": "input_boolean.test_toggle_1",
-            "button1_action": "script.toggle_gate",
-            "button2_label": "Button 2",
-            "button2_icon": "garage",
-            "button2_state_entity": "input_boolean.test_toggle_2",
-            "button2_action": "script.toggle_garage_gate",
+            "trigger": "release",
+            "press_delay": "100",
+            "confirm_timeout": "10",
+            "columns": "2",
+            "tile_height": "96",
+        },
+    )
+
+    config.setdefaults(
+        "statistics",
+        {
+            "charts": "",
+            "period": "hour",
+            "bucket": "day",
+            "days": "7",
+            "keep_days": "400",
+            "refresh_interval": "300",
+        },
+    )
+
+    config.setdefaults(
+        "camera",
+        {
+            "entity": "",
+            "stream": "0",
+            "interval": "1",
         },
     )
 
@@ -114,3 +182,49 @@ def load_config() -> ConfigParser:
         config.set("connection", "token", token_env)
 
     return config
+
+
+@dataclass
+class ButtonConfig:
+    key: str  # "1" for button1_* keys, "garage" for [button.garage]
+    label: str = ""
+    icon: str = ""
+    state_entity: Optional[str] = None
+    action: Optional[str] = None
+    trigger: str = ""  # "press" or "release"; empty follows [buttons] trigger
+
+
+def parse_buttons(config: ConfigParser) -> List[ButtonConfig]:
+    """
+    Collect button definitions from ``buttonN_*`` keys in ``[buttons]`` (ordered by N)
+    followed by ``[button.<name>]`` sections (in file order).
+
+    Any number of buttons may be defined; a button without a label is shown with its
+    action, or its key if it has neither.
+    """
+    numbered: Dict[int, Dict[str, str]] = {}
+    if config.has_section("buttons"):
+        for option, value in config.items("buttons"):
+            match = _BUTTON_KEY.match(option)
+            if match:
+                numbered.setdefault(int(match.group(1)), {})[match.group(2)] = value
+
+    definitions = [(str(n), numbered[n]) for n in sorted(numbered)]
+    for section in config.sections():
+        if section.startswith(BUTTON_SECTION_PREFIX):
+            definitions.append((section.split(".", 1)[1], dict(config.items(section))))
+
+    buttons = []
+    for key, fields in definitions:
+        action = fields.get("action") or None
+        buttons.append(
+            ButtonConfig(
+                key=key,
+                label=fields.get("label") or action or key,
+                icon=fields.get("icon", ""),
+                state_entity=fields.get("state_entity") or None,
+                action=action,
+                trigger=fields.get("trigger", "").strip().lower(),
+            )
+        )
+    return buttons
@@ -0,0 +1,115 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BindingCallback = Callable[[str, Any, Optional[Dict[str, Any]]], None]
+
+
+def resolve_field(state: Optional[Dict[str, Any]], path: Optional[str], default: Any = None) -> Any:
+    """
+    Return the watched value of a HA state dict.
+
+    ``path=None`` selects the main ``state`` value, anything else is a dot-separated
+    path into ``attributes`` (e.g. ``"forecast.0.temperature"``).
+    """
+    if not state:
+        return default
+    if path is None:
+        return state.get("state", default)
+
+    value: Any = state.get("attributes") or {}
+    for key in path.split("."):
+        if isinstance(value, dict):
+            if key not in value:
+                return default
+            value = value[key]
+        elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        else:
+            return default
+    return value
+
+
+class BindingRegistry:
+    """
+    Route entity updates to the widget callbacks bound to them.
+
+    Callbacks are indexed by ``entity_id`` and by the field they watch, so an update
+    only costs a dict lookup plus one comparison per watched field. A callback fires
+    only when its field differs from the last value it saw; updates that only touch
+    ``last_updated``/``last_changed`` or unrelated attributes are swallowed. A
+    callback bound after its field was delivered gets the current value right away.
+
+    ``dispatch`` has the ``on_entity_update`` signature of ``HAWebSocketClient``.
+    """
+
+    def __init__(self):
+        # entity_id -> field path -> callbacks
+        self._bindings: Dict[str, Dict[Optional[str], List[BindingCallback]]] = {}
+        self._last: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._states: Dict[str, Optional[Dict[str, Any]]] = {}  # last delivered state
+
+    def bind(
+        self, entity_id: str, callback: BindingCallback, attribute: Optional[str] = None
+    ) -> None:
+        fields = self._bindings.setdefault(entity_id, {})
+        callbacks = fields.setdefault(attribute, [])
+        if callback in callbacks:
+            return
+        callbacks.append(callback)
+        key = (entity_id, attribute)
+        if key in self._last:
+            callback(entity_id, self._last[key], self._states.get(entity_id))
+
+    def unbind(
+        self, entity_id: str, callback: BindingCallback, attribute: Optional[str] = None
+    ) -> None:
+        fields = self._bindings.get(entity_id)
+        if not fields or attribute not in fields:
+            return
+        callbacks = fields[attribute]
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            del fields[attribute]
+            self._last.pop((entity_id, attribute), None)
+        if not fields:
+            del self._bindings[entity_id]
+            self._states.pop(entity_id, None)
+
+    def entities(self) -> List[str]:
+        return list(self._bindings)
+
+    def dispatch(
+        self,
+        entity_id: str,
+        new_state: Optional[Dict[str, Any]],
+        old_state: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        Deliver an update to the callbacks whose watched field changed.
+
+        ``old_state`` is accepted for signature compatibility only: comparison is made
+        against the value last delivered, which stays correct when updates are dropped
+        or coalesced upstream. Returns the number of callbacks invoked.
+        """
+        fields = self._bindings.get(entity_id)
+        if not fields:
+            return 0
+
+        self._states[entity_id] = new_state
+        fired = 0
+        for path, callbacks in list(fields.items()):
+            value = resolve_field(new_state, path)
+            key = (entity_id, path)
+            # The first update for a binding always fires so widgets get a value.
+            if key in self._last and self._last[key] == value:
+                continue
+            self._last[key] = value
+            for callback in list(callbacks):
+                callback(entity_id, value, new_state)
+                fired += 1
+        return fired
+
+    def clear(self) -> None:
+        """Forget last-seen values so the next update refreshes every binding."""
+        self._last.clear()
+        self._states.clear()
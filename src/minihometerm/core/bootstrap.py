@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Part name -> command sent for it right after auth_ok
+BOOTSTRAP_COMMANDS: Dict[str, str] = {
+    "states": "get_states",
+    "config": "get_config",
+    "services": "get_services",
+    "entity_registry": "config/entity_registry/list",
+    "device_registry": "config/device_registry/list",
+    "area_registry": "config/area_registry/list",
+}
+
+
+@dataclass
+class BootstrapStats:
+    timings: Dict[str, float] = field(default_factory=dict)  # part -> request to result, s
+    errors: Dict[str, str] = field(default_factory=dict)  # part -> error reported by HA
+    cached: List[str] = field(default_factory=list)  # parts taken from the catalog cache
+    total: Optional[float] = None  # first request to last result, s
+    connect_to_ready: Optional[float] = None  # connection attempt to ready, s
+
+
+class Bootstrap:
+    """
+    Results of the bootstrap commands, gathered as they complete.
+
+    All commands are sent back to back, each under its own message id, and their
+    futures are tracked here; ``on_done(bootstrap)`` runs once every part has an
+    answer, so the whole phase costs about one round trip. A part HA refuses (e.g.
+    registry listings for a non-admin token) still counts as answered; a part lost to
+    a disconnect marks the bootstrap ``aborted``.
+    """
+
+    def __init__(
+        self,
+        parts: Iterable[str],
+        on_done: Callable[["Bootstrap"], None],
+        started: Optional[float] = None,
+    ):
+        self.parts = list(parts)
+        self.results: Dict[str, Any] = {}
+        self.stats = BootstrapStats()
+        self.aborted = False
+        self.started = time.monotonic() if started is None else started
+        self._on_done = on_done
+        self._outstanding = set(self.parts)
+        self._first_sent: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return not self._outstanding
+
+    def track(self, part: str, future: Future):
+        sent = time.monotonic()
+        with self._lock:
+            if self._first_sent is None:
+                self._first_sent = sent
+        future.add_done_callback(lambda f: self._complete(part, f, sent))
+
+    def _complete(self, part: str, future: Future, sent: float):
+        now = time.monotonic()
+        error = future.exception()
+        with self._lock:
+            if part not in self._outstanding:
+                return
+            self._outstanding.discard(part)
+            self.stats.timings[part] = now - sent
+            if isinstance(error, ConnectionError):
+                self.aborted = True
+            elif error is not None:
+                self.stats.errors[part] = str(error)
+            else:
+                self.results[part] = future.result()
+            if self._outstanding:
+                return
+            self.stats.total = now - self._first_sent
+            self.stats.connect_to_ready = now - self.started
+        self._on_done(self)
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from kivy.logger import Logger as logger
+
+# Bootstrap parts that are kept on disk; states change too often to be worth it
+CATALOG_PARTS = ("services", "entity_registry", "device_registry", "area_registry")
+
+# HA event -> catalog part it changes
+CHANGE_EVENTS = {
+    "service_registered": "services",
+    "service_removed": "services",
+    "entity_registry_updated": "entity_registry",
+    "device_registry_updated": "device_registry",
+    "area_registry_updated": "area_registry",
+}
+
+# Keys config/entity_registry/get adds to an entry of config/entity_registry/list
+EXTENDED_ENTITY_KEYS = frozenset(
+    ("aliases", "capabilities", "device_class", "original_device_class", "original_icon")
+)
+
+
+def content_hash(data: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+class CatalogCache:
+    """
+    On-disk copy of the service catalog and the registries of one HA instance.
+
+    The file is named after a hash of ``instance`` (the websocket URL of the endpoint
+    that authenticated, so a backup HA instance gets its own), and every part
+    is stored with the hash of its content and the HA version it came from. On load a
+    part whose content no longer matches its hash is dropped. ``store`` returns False
+    when a refetched part hashes the same as the cached one; that leaves nothing to
+    write unless HA's version changed or the saved fetch time has used up half of
+    ``max_age``. Nothing is written before ``save``, which the caller runs off its
+    I/O thread.
+
+    A part is ``fresh`` (no need to fetch it after connecting) while it is younger than
+    ``max_age``, was not invalidated by a change event and HA runs the same version.
+    Changes made while the panel was offline are only picked up by the next refetch,
+    so ``max_age`` bounds how stale a part can get.
+    """
+
+    def __init__(self, directory: Optional[Path], instance: str, max_age: float = 86400.0):
+        self.instance = instance
+        self.max_age = max_age
+        self.path: Optional[Path] = None
+        if directory:
+            name = hashlib.sha1(instance.encode(), usedforsecurity=False).hexdigest()[:12]
+            self.path = Path(directory) / f"catalog-{name}.json"
+        # part -> {"hash": str, "fetched_at": float, "version": str, "data": ...}
+        self._parts: Dict[str, Dict[str, Any]] = {}
+        self._invalid: set = set()
+        self._unsaved = False
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # one writer of the file at a time
+        if self.path:
+            self._load()
+
+    def get(self, part: str) -> Any:
+        with self._lock:
+            entry = self._parts.get(part)
+            return entry["data"] if entry else None
+
+    def fresh(self, part: str, version: Optional[str]) -> bool:
+        with self._lock:
+            entry = self._parts.get(part)
+            return (
+                entry is not None
+                and part not in self._invalid
+                and entry.get("version") == version
+                and time.time() - entry.get("fetched_at", 0) < self.max_age
+            )
+
+    def store(self, part: str, data: Any, version: Optional[str]) -> bool:
+        """Keep a freshly fetched part. Returns False if its content did not change."""
+        digest = content_hash(data)
+        now = time.time()
+        with self._lock:
+            self._invalid.discard(part)
+            entry = self._parts.get(part)
+            changed = entry is None or entry["hash"] != digest
+            if changed:
+                entry = self._parts[part] = {"hash": digest, "data": data}
+            elif (
+                entry.get("version") == version
+                and now - entry.get("fetched_at", 0) < self.max_age / 2
+            ):
+                return False  # the saved copy stays fresh long enough as it is
+            entry["fetched_at"] = now
+            entry["version"] = version
+            self._unsaved = True
+        return changed
+
+    def invalidate(self, part: str):
+        with self._lock:
+            self._invalid.add(part)
+
+    def remove_entity(self, entity_id: str) -> bool:
+        return self._patch_entities(entity_id, None)
+
+    def upsert_entity(self, entry: Dict[str, Any]) -> bool:
+        """Add or replace one entry; an extended entry is stored in the list format."""
+        entry = {k: v for k, v in entry.items() if k not in EXTENDED_ENTITY_KEYS}
+        return self._patch_entities(entry.get("entity_id"), entry)
+
+    def save(self):
+        """Write the cache if anything changed since the last write."""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._unsaved:
+                    return
+                for entry in self._parts.values():
+                    if entry["hash"] is None:
+                        entry["hash"] = content_hash(entry["data"])
+                snapshot = json.dumps(self._parts, separators=(",", ":"))
+                self._unsaved = False
+            tmp = self.path.with_suffix(".tmp")
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(snapshot)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                logger.warning("Catalog: Could not write cache %s: %s", self.path, e)
+
+    # ---------- Internals ----------
+
+    def _patch_entities(self, entity_id: Optional[str], new: Optional[Dict[str, Any]]) -> bool:
+        with self._lock:
+            entry = self._parts.get("entity_registry")
+            if entry is None or not entity_id:
+                return False
+            entities: List[Dict[str, Any]] = [
+                e for e in entry["data"] if e.get("entity_id") != entity_id
+            ]
+            if new is not None:
+                entities.append(new)
+            entry["data"] = entities
+            entry["hash"] = None  # recomputed on save
+            self._unsaved = True
+            return True
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                parts = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Catalog: Ignoring unreadable cache %s: %s", self.path, e)
+            return
+        if not isinstance(parts, dict):
+            return
+        for part, entry in parts.items():
+            if isinstance(entry, dict) and entry.get("hash") == content_hash(entry.get("data")):
+                self._parts[part] = entry
+            else:
+                logger.warning("Catalog: Dropping corrupt %s from %s", part, self.path)
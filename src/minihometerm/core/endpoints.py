@@ -0,0 +1,135 @@
+import json
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from kivy.logger import Logger as logger
+
+from .persist import DeferredSave
+
+
+def split_urls(urls: Union[str, Iterable[str]]) -> List[str]:
+    """``"ws://a, ws://b"`` (or a list) -> ``["ws://a", "ws://b"]``, duplicates dropped."""
+    if isinstance(urls, str):
+        urls = urls.replace(",", " ").split()
+    return list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+
+
+class EndpointRanking:
+    """
+    Remembered connect times of the HA endpoints, to try the best one first.
+
+    ``succeeded`` feeds the time from opening a connection to ``auth_ok`` into an
+    exponential moving average; ``failed`` counts attempts that ended before
+    ``auth_ok``, a success resets the count. ``ordered`` puts endpoints that failed
+    last behind the others, then sorts by average, then by configured order; an
+    endpoint never measured comes after the measured ones.
+
+    With ``path`` the numbers survive restarts, so the first connect after boot
+    already starts with the endpoint that was fastest last time. They are written
+    a while after they change, off the websocket thread; ``flush`` writes them now.
+    """
+
+    def __init__(
+        self,
+        urls: Union[str, Iterable[str]],
+        path: Optional[Path] = None,
+        smoothing: float = 0.3,
+    ):
+        self.urls = split_urls(urls)
+        if not self.urls:
+            raise ValueError("No HA endpoint configured")
+        self.path = Path(path) if path else None
+        self.smoothing = smoothing
+        # url -> {"connect": seconds or None, "failures": int}
+        self._stats: Dict[str, Dict[str, Any]] = {
+            url: {"connect": None, "failures": 0} for url in self.urls
+        }
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._saver = DeferredSave(self.save, name="endpoints-save")
+        if self.path:
+            self._load()
+
+    def ordered(self) -> List[str]:
+        with self._lock:
+
+            def key(item):
+                index, url = item
+                stats = self._stats[url]
+                connect = stats["connect"]
+                return (stats["failures"] > 0, math.inf if connect is None else connect, index)
+
+            return [url for _, url in sorted(enumerate(self.urls), key=key)]
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            stats = self._stats.get(url)
+            return dict(stats) if stats else None
+
+    def succeeded(self, url: str, seconds: float):
+        with self._lock:
+            stats = self._stats.get(url)
+            if stats is None:
+                return
+            last = stats["connect"]
+            stats["connect"] = seconds if last is None else last + self.smoothing * (seconds - last)
+            stats["failures"] = 0
+        self._changed()
+
+    def failed(self, url: str):
+        with self._lock:
+            stats = self._stats.get(url)
+            if stats is None:
+                return
+            stats["failures"] += 1
+        self._changed()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = json.dumps(self._stats, separators=(",", ":"))
+        tmp = self.path.with_suffix(".tmp")
+        # The deferred save and a flush may overlap; they share the temp file
+        with self._save_lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(snapshot)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                logger.warning("HAWebSocket: Could not write %s: %s", self.path, e)
+
+    def flush(self):
+        """Write a change still waiting for its deferred save."""
+        self._saver.flush()
+
+    # ---------- Internals ----------
+
+    def _changed(self):
+        if self.path:
+            self._saver.request()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("HAWebSocket: Ignoring unreadable %s: %s", self.path, e)
+            return
+        if not isinstance(saved, dict):
+            return
+        for url, stats in saved.items():
+            if url not in self._stats or not isinstance(stats, dict):
+                continue  # no longer configured
+            connect = stats.get("connect")
+            failures = stats.get("failures")
+            if connect is None or isinstance(connect, (int, float)):
+                self._stats[url]["connect"] = connect
+            if isinstance(failures, int):
+                self._stats[url]["failures"] = failures
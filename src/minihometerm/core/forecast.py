@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from kivy.logger import Logger as logger
+
+from .persist import DeferredSave
+
+Forecast = List[Dict[str, Any]]
+ForecastCallback = Callable[[str, str, Forecast], None]
+
+FORECAST_TYPES = ("daily", "hourly", "twice_daily")
+
+
+class ForecastCache:
+    """
+    Latest forecast per ``(weather entity, forecast type)``, optionally persisted.
+
+    With a ``path`` the cache is loaded from it on creation and rewritten (atomically)
+    once a forecast actually changed, so the panel can show the last known forecast
+    right after a restart, before HA has sent anything. The write is deferred and
+    done off the websocket thread (``DeferredSave``); ``flush`` writes it at once.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._data: Dict[str, Dict[str, Forecast]] = {}
+        self._lock = threading.Lock()
+        self._saver = DeferredSave(self.save, name="forecast-save")
+        if self.path:
+            self._load()
+
+    def get(self, entity_id: str, forecast_type: str = "daily") -> Optional[Forecast]:
+        with self._lock:
+            return self._data.get(entity_id, {}).get(forecast_type)
+
+    def update(self, entity_id: str, forecast_type: str, forecast: Forecast) -> bool:
+        """Store ``forecast``; returns False (and writes nothing) if it is unchanged."""
+        with self._lock:
+            entry = self._data.setdefault(entity_id, {})
+            if entry.get(forecast_type) == forecast:
+                return False
+            entry[forecast_type] = forecast
+        if self.path:
+            self._saver.request()
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = json.dumps(self._data, separators=(",", ":"))
+        self._save(snapshot)
+
+    def flush(self):
+        """Write a change still waiting for its deferred save."""
+        self._saver.flush()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Forecast: Ignoring unreadable cache %s: %s", self.path, e)
+            return
+        if isinstance(data, dict):
+            self._data = data
+
+    def _save(self, snapshot: str):
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(snapshot)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("Forecast: Could not write cache %s: %s", self.path, e)
+
+
+class ForecastFeed:
+    """
+    Keep a weather entity's forecast current through ``weather/subscribe_forecast``.
+
+    The subscription rides on the client's websocket and is renewed after reconnects.
+    ``on_change(entity_id, forecast_type, forecast)`` is called with the cached
+    forecast on ``start`` and afterwards only when HA sends a different forecast.
+    """
+
+    def __init__(
+        self,
+        client,
+        entity_id: str,
+        forecast_type: str = "daily",
+        cache: Optional[ForecastCache] = None,
+        on_change: Optional[ForecastCallback] = None,
+    ):
+        if forecast_type not in FORECAST_TYPES:
+            raise ValueError(f"Unknown forecast type: {forecast_type!r}")
+        self.client = client
+        self.entity_id = entity_id
+        self.forecast_type = forecast_type
+        self.cache = cache or ForecastCache()
+        self.on_change = on_change
+        self._subscription = None
+
+    @property
+    def forecast(self) -> Optional[Forecast]:
+        return self.cache.get(self.entity_id, self.forecast_type)
+
+    def start(self):
+        if self._subscription:
+            return
+        cached = self.forecast
+        if cached is not None and self.on_change:
+            self.on_change(self.entity_id, self.forecast_type, cached)
+        self._subscription = self.client.subscribe(
+            {
+                "type": "weather/subscribe_forecast",
+                "entity_id": self.entity_id,
+                "forecast_type": self.forecast_type,
+            },
+            self._on_event,
+        )
+
+    def stop(self):
+        if self._subscription:
+            self._subscription.unsubscribe()
+            self._subscription = None
+        self.cache.flush()
+
+    def _on_event(self, event: Dict[str, Any]):
+        forecast = event.get("forecast") or []
+        if self.cache.update(self.entity_id, self.forecast_type, forecast) and self.on_change:
+            self.on_change(self.entity_id, self.forecast_type, forecast)
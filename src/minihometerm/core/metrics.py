@@ -0,0 +1,117 @@
+import bisect
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+class RollingStats:
+    """
+    Summary statistics over the last ``window`` samples.
+    """
+
+    def __init__(self, window: int = 100):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.total = 0  # samples seen since creation, not only those in the window
+
+    def add(self, value: float) -> None:
+        with self._lock:
+            self._samples.append(value)
+            self.total += 1
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    @property
+    def last(self) -> Optional[float]:
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def mean(self) -> Optional[float]:
+        with self._lock:
+            return sum(self._samples) / len(self._samples) if self._samples else None
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        return percentile(samples, pct)
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            samples = sorted(self._samples)
+        return {
+            "count": float(len(samples)),
+            "min": samples[0] if samples else None,
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "max": samples[-1] if samples else None,
+        }
+
+
+def percentile(sorted_samples, pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not sorted_samples:
+        return None
+    rank = max(math.ceil(pct / 100.0 * len(sorted_samples)), 1)
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+# Upper bounds (seconds) of the latency histogram buckets; a last bucket takes the rest
+LATENCY_BUCKETS = (0.005, 0.01, 0.02, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 1.0, 2.0, 5.0)
+
+
+class Histogram:
+    """
+    Counts of samples per bucket, for long-running latency distributions.
+
+    Unlike ``RollingStats`` nothing is forgotten and memory stays constant.
+    Percentiles are the upper bound of the bucket holding the nearest rank (the
+    largest sample seen for the last, unbounded bucket).
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, value: float) -> None:
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.total += 1
+            self.sum += value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def __len__(self) -> int:
+        return self.total
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if not self.total:
+                return None
+            rank = max(math.ceil(pct / 100.0 * self.total), 1)
+            seen = 0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """``(upper bound, count)`` of every bucket; the last bound is ``inf``."""
+        with self._lock:
+            return list(zip(self.bounds + (math.inf,), self.counts))
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": float(self.total),
+            "mean": self.sum / self.total if self.total else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": self.max,
+        }
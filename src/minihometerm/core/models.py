@@ -1,4 +1,8 @@
+import json
+import sys
+import threading
 from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 
 @dataclass
@@ -8,3 +12,165 @@ class Counter:
     def inc(self, by: int = 1) -> int:
         self.value += by
         return self.value
+
+
+# Keys of a HA state dict that EntityState keeps
+STATE_FIELDS = frozenset({"entity_id", "state", "attributes", "last_changed", "last_updated"})
+
+
+def _interned_object(pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    return {sys.intern(k): v for k, v in pairs}
+
+
+def encode_attributes(attributes: Optional[Dict[str, Any]]) -> Optional[bytes]:
+    """Compact JSON form of attributes (``EntityState.raw_attributes``); None when empty."""
+    if not attributes:
+        return None
+    return json.dumps(attributes, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def decode_attributes(raw: Optional[bytes]) -> Dict[str, Any]:
+    if not raw:
+        return {}
+    return json.loads(raw, object_pairs_hook=_interned_object)
+
+
+class EntityState:
+    """
+    Compact record of one entity's state.
+
+    Entity ids and state values are interned, so ``"on"``/``"off"``/``"unavailable"``
+    and ids that show up in every update are stored once. Attributes are kept as they
+    arrive, nothing is done to them on the update path: the dict parsed off the wire
+    is stored as is (treat it as read-only), JSON bytes are only parsed (with
+    interned keys) when read, returning a fresh dict every time. ``raw_attributes``
+    encodes on demand. ``context`` and ``last_reported`` are dropped.
+
+    ``get``/``[]`` accept the keys of a HA state dict, so an ``EntityState`` can be
+    used wherever such a dict is read, e.g. by ``resolve_field``.
+    """
+
+    __slots__ = ("entity_id", "state", "last_changed", "last_updated", "_attributes")
+
+    def __init__(
+        self,
+        entity_id: str,
+        state: str,
+        attributes: Union[Dict[str, Any], bytes, None] = None,
+        last_changed: Optional[str] = None,
+        last_updated: Optional[str] = None,
+    ):
+        self.entity_id = sys.intern(entity_id)
+        self.state = sys.intern(state) if isinstance(state, str) else state
+        self.last_changed = last_changed
+        # Both stamps are usually equal; keep a single string then.
+        self.last_updated = last_changed if last_updated == last_changed else last_updated
+        self._attributes: Union[Dict[str, Any], bytes, None] = attributes or None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], entity_id: Optional[str] = None) -> "EntityState":
+        return cls(
+            data.get("entity_id") or entity_id or "",
+            data.get("state"),
+            data.get("attributes"),
+            data.get("last_changed"),
+            data.get("last_updated"),
+        )
+
+    @property
+    def attributes(self) -> Dict[str, Any]:
+        if isinstance(self._attributes, dict):
+            return self._attributes
+        return decode_attributes(self._attributes)
+
+    @property
+    def raw_attributes(self) -> Optional[bytes]:
+        if isinstance(self._attributes, dict):
+            return encode_attributes(self._attributes)
+        return self._attributes
+
+    def attribute(self, name: str, default: Any = None) -> Any:
+        return self.attributes.get(name, default)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in STATE_FIELDS:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in STATE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "entity_id": self.entity_id,
+            "state": self.state,
+            "attributes": self.attributes,
+            "last_changed": self.last_changed,
+            "last_updated": self.last_updated,
+        }
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, EntityState):
+            return NotImplemented
+        return (
+            self.entity_id == other.entity_id
+            and self.state == other.state
+            and self.last_changed == other.last_changed
+            and self.last_updated == other.last_updated
+            and (
+                self._attributes == other._attributes
+                if type(self._attributes) is type(other._attributes)
+                else self.attributes == other.attributes
+            )
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"EntityState({self.entity_id!r}, {self.state!r})"
+
+
+class StateCache:
+    """
+    Latest ``EntityState`` of every entity seen, safe to read from any thread.
+
+    An update whose attributes did not change reuses the stored attributes, so the
+    copies parsed off the wire for frequent state-only updates (sensors) are freed.
+    """
+
+    def __init__(self):
+        self._states: Dict[str, EntityState] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, entity_id: object) -> bool:
+        return entity_id in self._states
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._states))
+
+    def get(self, entity_id: str) -> Optional[EntityState]:
+        return self._states.get(entity_id)
+
+    def update(self, entity_id: str, new_state: Optional[Dict[str, Any]]) -> Optional[EntityState]:
+        """Store ``new_state`` (a HA state dict); ``None`` means the entity was removed."""
+        with self._lock:
+            if new_state is None:
+                self._states.pop(entity_id, None)
+                return None
+            state = EntityState.from_dict(new_state, entity_id)
+            old = self._states.get(state.entity_id)
+            if old is not None and old._attributes == state._attributes:
+                state._attributes = old._attributes
+            self._states[state.entity_id] = state
+            return state
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class OutboxStats:
+    queued: int = 0
+    collapsed: int = 0  # duplicates merged into an already queued command
+    expired: int = 0
+    rejected: int = 0  # queue full
+
+
+@dataclass
+class QueuedCommand:
+    payload: Dict[str, Any]
+    future: Future
+    expires_at: float
+    key: Optional[str] = None
+    queued_at: float = field(default_factory=time.monotonic)
+    waiters: int = 1  # callers sharing ``future`` through deduplication
+
+
+def command_key(payload: Dict[str, Any]) -> str:
+    """Canonical form of a command, used to collapse duplicates."""
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+
+def resolve(future: Future, result: Any = None, error: Optional[BaseException] = None) -> bool:
+    """Complete a future unless it is already done (or cancelled) by someone else."""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        return True
+    except InvalidStateError:
+        return False
+
+
+class CommandQueue:
+    """
+    Outbound commands waiting for the websocket to come back.
+
+    Every command carries a TTL; commands still queued when it runs out fail with
+    ``TimeoutError``. A command identical to one already queued does not queue again,
+    the caller gets the future of the first one.
+    """
+
+    def __init__(self, ttl: float = 10.0, max_size: int = 64):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stats = OutboxStats()
+        self._items: List[QueuedCommand] = []
+        self._by_key: Dict[str, QueuedCommand] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def put(
+        self, payload: Dict[str, Any], ttl: Optional[float] = None, dedupe: bool = True
+    ) -> Future:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            key = command_key(payload) if dedupe else None
+            if key is not None and key in self._by_key:
+                self.stats.collapsed += 1
+                cmd = self._by_key[key]
+                cmd.waiters += 1
+                return cmd.future
+
+            future: Future = Future()
+            if len(self._items) >= self.max_size:
+                self.stats.rejected += 1
+                resolve(future, error=ConnectionError("Offline command queue is full"))
+                return future
+
+            cmd = QueuedCommand(payload, future, now + (self.ttl if ttl is None else ttl), key)
+            self._items.append(cmd)
+            if key is not None:
+                self._by_key[key] = cmd
+            self.stats.queued += 1
+            return future
+
+    def drain(self) -> List[QueuedCommand]:
+        """Remove and return all live commands in submission order."""
+        with self._lock:
+            self._expire(time.monotonic())
+            items = [cmd for cmd in self._items if not cmd.future.done()]
+            self._items.clear()
+            self._by_key.clear()
+            return items
+
+    def discard(self, future: Future) -> bool:
+        """
+        Withdraw one caller of the queued command of ``future``. The command is
+        removed and ``future`` cancelled once no other caller shares it; False while
+        others still wait on it, or if it is not queued.
+        """
+        with self._lock:
+            for cmd in self._items:
+                if cmd.future is future:
+                    cmd.waiters -= 1
+                    if cmd.waiters > 0:
+                        return False
+                    self._items.remove(cmd)
+                    if cmd.key is not None:
+                        self._by_key.pop(cmd.key, None)
+                    return future.cancel()
+        return False
+
+    def expire(self) -> int:
+        with self._lock:
+            return self._expire(time.monotonic())
+
+    def next_expiry(self) -> Optional[float]:
+        with self._lock:
+            return min((cmd.expires_at for cmd in self._items), default=None)
+
+    def _expire(self, now: float) -> int:
+        live: List[QueuedCommand] = []
+        expired = 0
+        for cmd in self._items:
+            if cmd.expires_at > now and not cmd.future.done():
+                live.append(cmd)
+                continue
+            if cmd.key is not None:
+                self._by_key.pop(cmd.key, None)
+            if resolve(cmd.future, error=TimeoutError("Command expired while offline")):
+                expired += 1
+        self._items = live
+        self.stats.expired += expired
+        return expired
@@ -0,0 +1,52 @@
+import threading
+from typing import Callable, Optional
+
+# Seconds a changed cache waits before it is written; changes meanwhile share the write
+SAVE_DELAY = 2.0
+
+
+class DeferredSave:
+    """
+    Debounced ``save`` for a cache file, run off the caller's thread.
+
+    ``request`` marks the cache changed and returns at once: ``save`` runs on a timer
+    thread ``delay`` seconds after the first request, writing every change made in
+    between in one go. So the websocket thread never waits for the SD card, and a
+    burst of changes costs one write. ``flush`` (on shutdown) writes a pending
+    change right away on the calling thread.
+
+    ``save`` should write atomically (temp file + ``os.replace``): a write still in
+    progress when the interpreter exits is cut off with the timer thread.
+    """
+
+    def __init__(self, save: Callable[[], None], delay: float = SAVE_DELAY, name: str = "save"):
+        self.save = save
+        self.delay = delay
+        self.name = name
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> bool:
+        return self._timer is not None
+
+    def request(self):
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.delay, self._run)
+            self._timer.name = self.name
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+            self.save()
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+        self.save()
@@ -0,0 +1,159 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Word boundaries in entity ids ("sensor.kitchen_temp") and friendly names
+_WORD_SPLIT = re.compile(r"[\s._\-/:,()]+")
+
+
+def _words(text: str) -> Set[str]:
+    return {w for w in _WORD_SPLIT.split(text) if w}
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {a + b + c for a, b, c in zip(text, text[1:], text[2:])}
+
+
+class EntityIndex:
+    """
+    Search index over entity ids and friendly names.
+
+    Two structures are kept up to date entry by entry:
+
+    - a sorted list of ``(word, entity_id)`` pairs, searched with ``bisect`` for
+      terms shorter than three characters ("li" finds "light.*" and "Living room")
+    - a map from each trigram of the lowercased text to the entities containing it;
+      longer terms intersect the posting sets of their trigrams (smallest first)
+      and confirm the substring on the few candidates left
+
+    A query is split on whitespace and every term must match. Results are ranked by
+    how each term matched: exact id, id prefix, whole word, word prefix, substring.
+    """
+
+    def __init__(self):
+        self._names: Dict[str, str] = {}
+        self._text: Dict[str, str] = {}
+        self._words: List[Tuple[str, str]] = []
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_states(cls, states) -> "EntityIndex":
+        """Build from a ``StateCache`` (or any mapping of entity id -> state)."""
+        index = cls()
+        for entity_id in states:
+            state = states.get(entity_id)
+            name = state.attribute("friendly_name", "") if state is not None else ""
+            index.update(entity_id, name)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._text)
+
+    def __contains__(self, entity_id: object) -> bool:
+        return entity_id in self._text
+
+    def name(self, entity_id: str) -> str:
+        return self._names.get(entity_id, "")
+
+    def update(self, entity_id: str, friendly_name: Optional[str] = None) -> bool:
+        """Add or re-index an entity. Returns False if nothing changed."""
+        name = friendly_name or ""
+        with self._lock:
+            if entity_id in self._text and self._names.get(entity_id) == name:
+                return False
+            self._remove(entity_id)
+            text = f"{entity_id} {name}".lower()
+            self._names[entity_id] = name
+            self._text[entity_id] = text
+            for word in _words(text):
+                insort(self._words, (word, entity_id))
+            for gram in _trigrams(text):
+                self._trigrams.setdefault(gram, set()).add(entity_id)
+            return True
+
+    def remove(self, entity_id: str) -> None:
+        with self._lock:
+            self._remove(entity_id)
+
+    def search(self, query: str, limit: int = 200) -> List[str]:
+        """Entity ids matching every term of ``query``, best matches first."""
+        terms = query.lower().split()
+        if not terms:
+            with self._lock:
+                return sorted(self._text)[:limit]
+        with self._lock:
+            matches: Optional[Set[str]] = None
+            for term in sorted(terms, key=len, reverse=True):
+                found = self._match(term, matches)
+                matches = found if matches is None else matches & found
+                if not matches:
+                    return []
+            ranked = sorted(matches, key=lambda eid: (self._rank(eid, terms), eid))
+        return ranked[:limit]
+
+    # ---------- Internals ----------
+
+    def _remove(self, entity_id: str):
+        text = self._text.pop(entity_id, None)
+        if text is None:
+            return
+        del self._names[entity_id]
+        for word in _words(text):
+            i = bisect_left(self._words, (word, entity_id))
+            if i < len(self._words) and self._words[i] == (word, entity_id):
+                del self._words[i]
+        for gram in _trigrams(text):
+            posting = self._trigrams.get(gram)
+            if posting is not None:
+                posting.discard(entity_id)
+                if not posting:
+                    del self._trigrams[gram]
+
+    def _match(self, term: str, within: Optional[Set[str]]) -> Set[str]:
+        if len(term) < 3:
+            return set(self._prefixed(term))
+        postings = []
+        for gram in _trigrams(term):
+            posting = self._trigrams.get(gram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set(within) if within is not None else set(postings[0])
+        for posting in postings:
+            candidates &= posting
+            if not candidates:
+                return candidates
+        text = self._text
+        return {eid for eid in candidates if term in text[eid]}
+
+    def _prefixed(self, prefix: str) -> Iterable[str]:
+        words = self._words
+        i = bisect_left(words, (prefix, ""))
+        while i < len(words) and words[i][0].startswith(prefix):
+            yield words[i][1]
+            i += 1
+
+    def _rank(self, entity_id: str, terms: List[str]) -> int:
+        return sum(self._term_rank(entity_id, term) for term in terms)
+
+    def _term_rank(self, entity_id: str, term: str) -> int:
+        eid = entity_id.lower()
+        object_id = eid.partition(".")[2]
+        if eid == term or object_id == term:
+            return 0
+        if eid.startswith(term) or object_id.startswith(term):
+            return 1
+        text = self._text[entity_id]
+        rank = 4
+        i = text.find(term)
+        while i != -1:
+            if i == 0 or not text[i - 1].isalnum():
+                end = i + len(term)
+                if end == len(text) or not text[end].isalnum():
+                    return 2
+                rank = 3
+            i = text.find(term, i + 1)
+        return rank
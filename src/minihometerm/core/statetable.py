@@ -0,0 +1,201 @@
+import json
+import struct
+import threading
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+from kivy.logger import Logger as logger
+
+MAGIC = b"MHST"
+# magic, slot count, slot size, generation (bumped after every write)
+_HEADER = struct.Struct("<4sIIQ")
+_GENERATION_OFFSET = 12
+_LENGTH = struct.Struct("<I")
+_GENERATION = struct.Struct("<Q")
+
+StateChange = Tuple[str, Optional[Dict[str, Any]]]
+
+
+class StateTable:
+    """
+    Fixed-layout table of entity states in shared memory, one writer, any readers.
+
+    Layout: a header (magic, slot count, slot size, generation counter), then one
+    64-bit sequence number per slot, then the slots themselves. A slot holds a length
+    prefix and the compact JSON ``[entity_id, state, attributes, last_changed,
+    last_updated]`` (``[entity_id, null]`` once the entity is removed). Slots are
+    handed out in order of first update and keep their entity for the table's life.
+
+    Each slot is a seqlock: the writer makes its sequence number odd, writes the
+    payload, makes it even again and bumps the generation. ``changes`` returns
+    nothing while the generation is unchanged; otherwise it compares the sequence
+    array with the one it saw last and decodes only the slots that moved. A slot
+    caught mid-write (odd number, number changed during the copy, or a payload that
+    does not decode) is left for the next call, so readers never block the writer.
+
+    A state that does not fit ``slot_size`` is stored without its attributes (and
+    dropped if even that is too long).
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        magic, self.slots, self.slot_size, _gen = _HEADER.unpack_from(shm.buf)
+        if magic != MAGIC:
+            raise ValueError(f"Not a state table: {shm.name}")
+        seq_start, seq_end = _HEADER.size, _HEADER.size + 8 * self.slots
+        self._data_start = seq_end
+        self._seqs = shm.buf[seq_start:seq_end].cast("Q")
+        # Writer side
+        self._index: Dict[str, int] = {}
+        self._write_lock = threading.Lock()
+        self._truncated: set = set()
+        self._full_logged = False
+        # Reader side
+        self._seen_generation = 0
+        self._seen: List[int] = [0] * self.slots
+
+    @classmethod
+    def create(cls, slots: int = 256, slot_size: int = 2048) -> "StateTable":
+        if slots < 1 or slot_size <= _LENGTH.size:
+            raise ValueError("State table needs at least one slot of a few bytes")
+        size = _HEADER.size + slots * (8 + slot_size)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        _HEADER.pack_into(shm.buf, 0, MAGIC, slots, slot_size, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "StateTable":
+        # Attaching registers the segment with the resource tracker again; child
+        # processes share their parent's tracker, so that is a no-op and the segment
+        # stays until the owner unlinks it.
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def generation(self) -> int:
+        return _GENERATION.unpack_from(self.shm.buf, _GENERATION_OFFSET)[0]
+
+    def close(self):
+        self._seqs.release()
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    # ---------- Writer ----------
+
+    def write(self, entity_id: str, state: Optional[Dict[str, Any]]) -> bool:
+        """Publish the new state of ``entity_id``. Returns False if it was dropped."""
+        payload = self._encode(entity_id, state)
+        if payload is None:
+            return False
+        with self._write_lock:
+            slot = self._index.get(entity_id)
+            if slot is None:
+                if len(self._index) >= self.slots:
+                    if not self._full_logged:
+                        self._full_logged = True
+                        logger.warning(
+                            "StateTable: All %d slots in use, dropping updates of %s and others",
+                            self.slots,
+                            entity_id,
+                        )
+                    return False
+                slot = self._index[entity_id] = len(self._index)
+            offset = self._data_start + slot * self.slot_size
+            seq = self._seqs[slot]
+            self._seqs[slot] = seq + 1
+            _LENGTH.pack_into(self.shm.buf, offset, len(payload))
+            start = offset + _LENGTH.size
+            end = start + len(payload)
+            self.shm.buf[start:end] = payload
+            self._seqs[slot] = seq + 2
+            _GENERATION.pack_into(self.shm.buf, _GENERATION_OFFSET, self.generation + 1)
+            return True
+
+    def _encode(self, entity_id: str, state: Optional[Dict[str, Any]]) -> Optional[bytes]:
+        if state is None:
+            row: List[Any] = [entity_id, None]
+        else:
+            row = [
+                entity_id,
+                state.get("state"),
+                state.get("attributes") or {},
+                state.get("last_changed"),
+                state.get("last_updated"),
+            ]
+        payload = json.dumps(row, separators=(",", ":"), ensure_ascii=False).encode()
+        if len(payload) + _LENGTH.size <= self.slot_size or state is None:
+            return payload
+        if entity_id not in self._truncated:
+            self._truncated.add(entity_id)
+            logger.warning(
+                "StateTable: State of %s is %d bytes, over the slot size of %d; "
+                "attributes dropped",
+                entity_id,
+                len(payload),
+                self.slot_size,
+            )
+        row[2] = {}
+        payload = json.dumps(row, separators=(",", ":"), ensure_ascii=False).encode()
+        return payload if len(payload) + _LENGTH.size <= self.slot_size else None
+
+    # ---------- Reader ----------
+
+    def changes(self) -> List[StateChange]:
+        """``(entity_id, state dict or None)`` of every slot written since the last call."""
+        generation = self.generation
+        if generation == self._seen_generation:
+            return []
+        current = self._seqs.tolist()
+        seen = self._seen
+        changed: List[StateChange] = []
+        complete = True
+        for slot, (seq, last) in enumerate(zip(current, seen)):
+            if seq == last:
+                continue
+            row = self._read(slot, seq)
+            if row is None:
+                complete = False
+                continue
+            seen[slot] = seq
+            changed.append(row)
+        if complete:
+            self._seen_generation = generation
+        return changed
+
+    def _read(self, slot: int, seq: int) -> Optional[StateChange]:
+        if seq & 1:
+            return None
+        offset = self._data_start + slot * self.slot_size
+        (length,) = _LENGTH.unpack_from(self.shm.buf, offset)
+        start = offset + _LENGTH.size
+        end = start + length
+        if length > self.slot_size - _LENGTH.size:
+            return None
+        raw = bytes(self.shm.buf[start:end])
+        if self._seqs[slot] != seq:
+            return None
+        try:
+            row = json.loads(raw)
+        except ValueError:
+            return None
+        entity_id = row[0]
+        if row[1] is None and len(row) == 2:
+            return entity_id, None
+        _eid, state, attributes, last_changed, last_updated = row
+        return entity_id, {
+            "entity_id": entity_id,
+            "state": state,
+            "attributes": attributes,
+            "last_changed": last_changed,
+            "last_updated": last_updated,
+        }
@@ -0,0 +1,424 @@
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from kivy.logger import Logger as logger
+
+from .persist import DeferredSave
+
+try:
+    import numpy as np
+except ImportError:  # optional: the pure-Python path gives the same results, slower
+    np = None
+
+# Columns kept per row, as requested from the recorder
+COLUMNS = ("mean", "min", "max", "sum")
+# Columns of aggregated buckets; ``change`` is the growth of the cumulative ``sum``
+AGGREGATES = COLUMNS + ("change",)
+# Recorder periods of a fixed length, in seconds
+PERIODS = {"5minute": 300, "hour": 3600, "day": 86400, "week": 7 * 86400}
+
+NAN = float("nan")
+
+StatisticsCallback = Callable[[List[str]], None]
+
+
+def row_start(value: Any) -> float:
+    """Start of a recorder row in epoch seconds; HA sends milliseconds or ISO text."""
+    if isinstance(value, (int, float)):
+        return value / 1000.0
+    return datetime.fromisoformat(str(value)).timestamp()
+
+
+def local_offset(at: Optional[float] = None) -> float:
+    """Seconds to add to epoch time for buckets aligned to local midnight."""
+    at = time.time() if at is None else at
+    offset = datetime.fromtimestamp(at).astimezone().utcoffset()
+    return offset.total_seconds() if offset else 0.0
+
+
+def parse_charts(text: str) -> List[Tuple[str, str]]:
+    """``"sensor.energy:change, sensor.temp"`` -> ``[(id, column), ...]``, mean by default."""
+    charts = []
+    for item in text.split(","):
+        statistic_id, _, column = item.strip().partition(":")
+        if not statistic_id:
+            continue
+        column = column.strip() or "mean"
+        if column not in AGGREGATES:
+            raise ValueError(f"Unknown statistics column: {column!r}")
+        charts.append((statistic_id, column))
+    return charts
+
+
+class Series:
+    """
+    The rows of one statistic at one period, column-wise.
+
+    ``start`` (epoch seconds, ascending) and every column of ``COLUMNS`` are
+    ``array("d")``: 8 bytes a value, appended in place and readable by NumPy without a
+    copy. A value HA did not send (e.g. no ``sum`` for a temperature) is NaN.
+    """
+
+    def __init__(self):
+        self.start = array("d")
+        self.columns: Dict[str, array] = {name: array("d") for name in COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @property
+    def last_start(self) -> Optional[float]:
+        return self.start[-1] if self.start else None
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Append recorder rows newer than the last one kept. A row for the last kept
+        period replaces it; older rows are ignored. Returns the number of rows stored.
+        """
+        stored = 0
+        for start, row in sorted((row_start(r["start"]), r) for r in rows if "start" in r):
+            last = self.last_start
+            if last is not None and start < last:
+                continue
+            values = [row.get(name) for name in COLUMNS]
+            values = [NAN if v is None else float(v) for v in values]
+            if last is not None and start == last:
+                for name, value in zip(COLUMNS, values):
+                    self.columns[name][-1] = value
+            else:
+                self.start.append(start)
+                for name, value in zip(COLUMNS, values):
+                    self.columns[name].append(value)
+            stored += 1
+        return stored
+
+    def trim(self, before: float) -> int:
+        """Drop rows that start before ``before``."""
+        cut = bisect.bisect_left(self.start, before)
+        if cut:
+            del self.start[:cut]
+            for column in self.columns.values():
+                del column[:cut]
+        return cut
+
+    def span(self, since: Optional[float] = None, until: Optional[float] = None) -> Tuple[int, int]:
+        """Index range of the rows starting in ``[since, until)``."""
+        lo = 0 if since is None else bisect.bisect_left(self.start, since)
+        hi = len(self.start) if until is None else bisect.bisect_left(self.start, until)
+        return lo, max(lo, hi)
+
+    def copy(self) -> "Series":
+        series = Series()
+        series.start = array("d", self.start)
+        series.columns = {name: array("d", column) for name, column in self.columns.items()}
+        return series
+
+    def to_dict(self) -> Dict[str, List[float]]:
+        data = {"start": self.start.tolist()}
+        data.update((name, column.tolist()) for name, column in self.columns.items())
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, List[float]]) -> "Series":
+        series = cls()
+        start = data.get("start") or []
+        columns = [data.get(name) or [] for name in COLUMNS]
+        if any(len(column) != len(start) for column in columns):
+            raise ValueError("Columns of different length")
+        series.start = array("d", start)
+        series.columns = {name: array("d", column) for name, column in zip(COLUMNS, columns)}
+        return series
+
+
+class Buckets:
+    """Rows aggregated into buckets: ``start`` and one array per ``AGGREGATES`` column."""
+
+    def __init__(self, start: array, columns: Dict[str, array]):
+        self.start = start
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __getitem__(self, column: str) -> array:
+        return self.columns[column]
+
+
+def aggregate(
+    series: Series,
+    size: float,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    offset: float = 0.0,
+) -> Buckets:
+    """
+    Aggregate the rows in ``[since, until)`` into buckets of ``size`` seconds.
+
+    Buckets start at multiples of ``size`` in epoch time shifted by ``offset`` (see
+    ``local_offset``); empty buckets are left out. Per bucket ``mean`` is the mean of
+    the row means, ``min``/``max`` the extremes, ``sum`` the cumulative sum at its
+    last row and ``change`` how much ``sum`` grew since the end of the previous bucket
+    (for the first one, since the row before ``since`` if there is one). Missing
+    values are skipped; NaN where a bucket has none. Uses NumPy when it is installed.
+    """
+    lo, hi = series.span(since, until)
+    before = series.columns["sum"][lo - 1] if lo > 0 else NAN
+    if hi == lo:
+        return Buckets(array("d"), {name: array("d") for name in AGGREGATES})
+    if np is not None:
+        return _aggregate_numpy(series, lo, hi, size, offset, before)
+    return _aggregate_python(series, lo, hi, size, offset, before)
+
+
+def _aggregate_numpy(series, lo, hi, size, offset, before) -> Buckets:
+    start = np.frombuffer(series.start, dtype=np.float64)[lo:hi]
+    keys = np.floor((start + offset) / size)
+    first = np.flatnonzero(np.diff(keys, prepend=keys[0] - 1))
+    last = np.append(first[1:], len(start)) - 1
+    columns = {}
+    mean = np.frombuffer(series.columns["mean"], dtype=np.float64)[lo:hi]
+    valid = ~np.isnan(mean)
+    totals = np.add.reduceat(np.where(valid, mean, 0.0), first)
+    counts = np.add.reduceat(valid.astype(np.int64), first)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        columns["mean"] = np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+    columns["min"] = np.fmin.reduceat(
+        np.frombuffer(series.columns["min"], dtype=np.float64)[lo:hi], first
+    )
+    columns["max"] = np.fmax.reduceat(
+        np.frombuffer(series.columns["max"], dtype=np.float64)[lo:hi], first
+    )
+    sums = np.frombuffer(series.columns["sum"], dtype=np.float64)[lo:hi]
+    # Last known cumulative sum up to each row, so a bucket ending in a gap still counts
+    known = np.where(np.isnan(sums), -1, np.arange(len(sums)))
+    known = np.maximum.accumulate(known)[last]
+    columns["sum"] = np.where(known >= 0, sums[np.maximum(known, 0)], np.nan)
+    columns["change"] = np.diff(columns["sum"], prepend=before)
+    bucket_start = keys[first] * size - offset
+    return Buckets(_to_array(bucket_start), {k: _to_array(v) for k, v in columns.items()})
+
+
+def _aggregate_python(series, lo, hi, size, offset, before) -> Buckets:
+    out_start = array("d")
+    out = {name: array("d") for name in AGGREGATES}
+    start = series.start
+    mean, low, high, sums = (series.columns[name] for name in COLUMNS)
+    previous = before
+    last_sum = NAN
+    i = lo
+    while i < hi:
+        key = math.floor((start[i] + offset) / size)
+        total, count = 0.0, 0
+        lowest, highest = NAN, NAN
+        while i < hi and math.floor((start[i] + offset) / size) == key:
+            if mean[i] == mean[i]:  # not NaN
+                total += mean[i]
+                count += 1
+            if low[i] == low[i] and not lowest <= low[i]:
+                lowest = low[i]
+            if high[i] == high[i] and not highest >= high[i]:
+                highest = high[i]
+            if sums[i] == sums[i]:
+                last_sum = sums[i]
+            i += 1
+        out_start.append(key * size - offset)
+        out["mean"].append(total / count if count else NAN)
+        out["min"].append(lowest)
+        out["max"].append(highest)
+        out["sum"].append(last_sum)
+        out["change"].append(last_sum - previous)
+        previous = last_sum
+    return Buckets(out_start, out)
+
+
+def _to_array(values) -> array:
+    result = array("d")
+    result.frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return result
+
+
+class StatisticsStore:
+    """
+    ``Series`` per ``(period, statistic_id)``, optionally persisted.
+
+    Rows older than ``keep`` seconds are dropped as new ones come in. With a
+    ``path`` the store is loaded on creation and rewritten (atomically) once rows
+    were stored; the write is deferred and done off the client's thread
+    (``DeferredSave``), ``flush`` writes it at once.
+
+    ``extend`` runs on the client's thread while the UI reads: ``series`` hands out
+    a copy, and ``aggregate`` reads the stored rows under the store's lock.
+    """
+
+    def __init__(self, path: Optional[Path] = None, keep: float = 400 * 86400.0):
+        self.path = Path(path) if path else None
+        self.keep = keep
+        self._series: Dict[str, Dict[str, Series]] = {}
+        self._lock = threading.Lock()
+        self._saver = DeferredSave(self.save, name="statistics-save")
+        if self.path:
+            self._load()
+
+    def series(self, statistic_id: str, period: str = "hour") -> Series:
+        """A copy of the rows of ``statistic_id``, empty if there are none."""
+        with self._lock:
+            series = self._series.get(period, {}).get(statistic_id)
+            return series.copy() if series is not None else Series()
+
+    def aggregate(
+        self, statistic_id: str, period: str, size: float, since=None, until=None, offset=0.0
+    ) -> Buckets:
+        """``aggregate`` of the stored rows of ``statistic_id``, without copying them."""
+        with self._lock:
+            series = self._series.get(period, {}).get(statistic_id) or Series()
+            return aggregate(series, size, since, until, offset)
+
+    def next_start(self, statistic_id: str, period: str = "hour") -> Optional[float]:
+        """Start of the first period not in the store yet; None when it holds nothing."""
+        with self._lock:
+            series = self._series.get(period, {}).get(statistic_id)
+            last = series.last_start if series is not None else None
+        return None if last is None else last + PERIODS[period]
+
+    def extend(
+        self, statistic_id: str, period: str, rows: Iterable[Dict[str, Any]], now=None
+    ) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            series = self._series.setdefault(period, {}).setdefault(statistic_id, Series())
+            stored = series.extend(rows)
+            if stored:
+                series.trim(now - self.keep)
+        if stored and self.path:
+            self._saver.request()
+        return stored
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = self._snapshot()
+        self._save(snapshot)
+
+    def flush(self):
+        """Write rows still waiting for their deferred save."""
+        self._saver.flush()
+
+    # ---------- Internals ----------
+
+    def _snapshot(self) -> str:
+        return json.dumps(
+            {
+                period: {sid: series.to_dict() for sid, series in by_id.items()}
+                for period, by_id in self._series.items()
+            },
+            separators=(",", ":"),
+        )
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Statistics: Ignoring unreadable cache %s: %s", self.path, e)
+            return
+        if not isinstance(data, dict):
+            return
+        for period, by_id in data.items():
+            if period not in PERIODS or not isinstance(by_id, dict):
+                continue
+            for statistic_id, columns in by_id.items():
+                try:
+                    self._series.setdefault(period, {})[statistic_id] = Series.from_dict(columns)
+                except (AttributeError, TypeError, ValueError):
+                    logger.warning(
+                        "Statistics: Dropping corrupt %s from %s", statistic_id, self.path
+                    )
+
+    def _save(self, snapshot: str):
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(snapshot)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("Statistics: Could not write cache %s: %s", self.path, e)
+
+
+class StatisticsFeed:
+    """
+    Keep long-term statistics current through ``recorder/statistics_during_period``.
+
+    Every ``refresh`` asks HA only for the periods after the newest row in the store
+    (``history`` seconds back for statistics it has nothing of yet), in one request
+    for all ``statistic_ids``. ``on_change(statistic_ids)`` is called, on the
+    client's thread, with the ones that got new rows. While a request is out,
+    ``refresh`` does nothing.
+    """
+
+    def __init__(
+        self,
+        client,
+        statistic_ids: Iterable[str],
+        period: str = "hour",
+        store: Optional[StatisticsStore] = None,
+        history: float = 7 * 86400.0,
+        on_change: Optional[StatisticsCallback] = None,
+    ):
+        if period not in PERIODS:
+            raise ValueError(f"Unknown statistics period: {period!r}")
+        self.client = client
+        self.statistic_ids = list(dict.fromkeys(statistic_ids))
+        self.period = period
+        self.store = store or StatisticsStore()
+        self.history = history
+        self.on_change = on_change
+        self._pending: Optional[Future] = None
+
+    def request(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """The recorder command fetching everything missing from the store."""
+        now = time.time() if now is None else now
+        starts = [self.store.next_start(sid, self.period) for sid in self.statistic_ids]
+        start = min(now - self.history if s is None else s for s in starts)
+        return {
+            "type": "recorder/statistics_during_period",
+            "start_time": datetime.fromtimestamp(start, timezone.utc).isoformat(),
+            "statistic_ids": self.statistic_ids,
+            "period": self.period,
+            "types": list(COLUMNS),
+        }
+
+    def refresh(self) -> Optional[Future]:
+        if not self.statistic_ids or (self._pending is not None and not self._pending.done()):
+            return None
+        future = self._pending = self.client.send_command(self.request())
+        future.add_done_callback(self._on_result)
+        return future
+
+    def _on_result(self, future: Future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.warning("Statistics: Fetching statistics failed: %s", error)
+            return
+        result = future.result() or {}
+        changed = [
+            sid
+            for sid in self.statistic_ids
+            if self.store.extend(sid, self.period, result.get(sid) or [])
+        ]
+        if changed and self.on_change:
+            self.on_change(changed)
@@ -0,0 +1,179 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from kivy.logger import Logger as logger
+
+UpdateConsumer = Callable[[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]
+
+
+@dataclass
+class ThrottleStats:
+    received: int = 0
+    delivered: int = 0
+    coalesced: int = 0  # intermediate states replaced by a newer one
+    overflow: int = 0  # updates that found the queue full and flushed it early
+
+
+def parse_intervals(text: str) -> Dict[str, float]:
+    """
+    Parse ``"sensor: 1.0, sensor.power_meter: 0.25"`` into a dict of overrides.
+
+    Keys are either a domain or a full entity id.
+    """
+    intervals: Dict[str, float] = {}
+    for chunk in text.split(","):
+        if not chunk.strip():
+            continue
+        key, sep, value = chunk.partition(":")
+        if not sep:
+            raise ValueError(f"Invalid interval override: {chunk.strip()!r}")
+        intervals[key.strip()] = float(value)
+    return intervals
+
+
+class UpdateThrottle:
+    """
+    Bounded, per-entity, latest-wins queue between the network thread and consumers.
+
+    ``submit`` never blocks on the consumer: it replaces any pending update of the same
+    entity and returns. A worker thread delivers each entity at most once per its
+    minimum interval, passing the newest ``new_state`` together with the ``old_state``
+    of the first coalesced update, i.e. the state the consumer saw last.
+
+    Once ``max_pending`` entities are waiting, the next new one is still queued but
+    the whole queue is delivered at once, ignoring the intervals: no entity's latest
+    state is ever dropped.
+    """
+
+    def __init__(
+        self,
+        consumer: UpdateConsumer,
+        min_interval: float = 0.0,
+        intervals: Optional[Dict[str, float]] = None,
+        max_pending: int = 1024,
+    ):
+        self.consumer = consumer
+        self.min_interval = min_interval
+        self.intervals: Dict[str, float] = dict(intervals or {})
+        self.max_pending = max_pending
+        self.stats = ThrottleStats()
+
+        # entity_id -> (new_state, old_state)
+        self._pending: Dict[str, Tuple[Any, Any]] = {}
+        self._last_sent: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._flush = False  # deliver everything pending, due or not
+        self._generation = 0  # a worker outliving stop() exits once restarted
+
+    # ---------- Public API ----------
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._generation += 1
+            generation = self._generation
+        self._thread = threading.Thread(
+            target=self._run, args=(generation,), name="ha-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def submit(
+        self,
+        entity_id: str,
+        new_state: Optional[Dict[str, Any]],
+        old_state: Optional[Dict[str, Any]] = None,
+    ):
+        with self._cond:
+            self.stats.received += 1
+            pending = self._pending.get(entity_id)
+            if pending is not None:
+                self.stats.coalesced += 1
+                self._pending[entity_id] = (new_state, pending[1])
+                return
+            if len(self._pending) >= self.max_pending:
+                self.stats.overflow += 1
+                self._flush = True
+            self._pending[entity_id] = (new_state, old_state)
+            self._cond.notify()
+
+    def interval_for(self, entity_id: str) -> float:
+        interval = self.intervals.get(entity_id)
+        if interval is None:
+            interval = self.intervals.get(entity_id.split(".", 1)[0], self.min_interval)
+        return interval
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    # ---------- Internals ----------
+
+    def _run(self, generation: int):
+        while True:
+            with self._cond:
+                batch: List[Tuple[str, Any, Any]] = []
+                while self._current(generation):
+                    batch = self._collect_due()
+                    if batch:
+                        break
+                    self._cond.wait(timeout=self._next_wait())
+                else:
+                    return
+            for entity_id, new_state, old_state in batch:
+                try:
+                    self.consumer(entity_id, new_state, old_state)
+                except Exception as e:
+                    logger.error("UpdateThrottle: Consumer failed for %s: %s", entity_id, e)
+            with self._cond:
+                self.stats.delivered += len(batch)
+
+    def _current(self, generation: int) -> bool:
+        return self._running and generation == self._generation
+
+    def _collect_due(self) -> List[Tuple[str, Any, Any]]:
+        now = time.monotonic()
+        flush, self._flush = self._flush, False
+        batch = []
+        for entity_id in list(self._pending):
+            if (
+                not flush
+                and self._last_sent.get(entity_id, float("-inf")) + self.interval_for(entity_id)
+                > now
+            ):
+                continue
+            new_state, old_state = self._pending.pop(entity_id)
+            self._last_sent[entity_id] = now
+            batch.append((entity_id, new_state, old_state))
+        if len(self._last_sent) > self.max_pending:
+            self._prune(now)
+        return batch
+
+    def _next_wait(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        now = time.monotonic()
+        due = min(
+            self._last_sent.get(entity_id, now) + self.interval_for(entity_id)
+            for entity_id in self._pending
+        )
+        return max(due - now, 0.0)
+
+    def _prune(self, now: float):
+        # Entries whose interval has elapsed no longer delay anything.
+        for entity_id, sent in list(self._last_sent.items()):
+            if sent + self.interval_for(entity_id) <= now:
+                del self._last_sent[entity_id]
@@ -0,0 +1,132 @@
+"""
+permessage-deflate (RFC 7692) support for ``websocket-client``.
+
+``websocket-client`` does not implement websocket extensions and rejects frames with
+RSV1 set. This module offers the extension during the handshake and, once the server
+accepted it, swaps the connection's frame buffer for one that inflates compressed
+messages. Outgoing messages stay uncompressed, which the RFC allows: they are small
+commands, the bulk of the traffic is state pushed by Home Assistant.
+"""
+
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from websocket import ABNF, frame_buffer
+
+EXTENSION = "permessage-deflate"
+OFFER_HEADER = f"Sec-WebSocket-Extensions: {EXTENSION}; client_no_context_takeover"
+
+_TAIL = b"\x00\x00\xff\xff"
+
+
+@dataclass
+class TrafficStats:
+    wire_bytes_in: int = 0  # bytes read from the socket, frame headers included
+    payload_bytes_in: int = 0  # message payload after decompression
+    messages_in: int = 0
+    compressed_messages_in: int = 0
+    bytes_out: int = 0
+
+    @property
+    def compression_ratio(self) -> float:
+        if not self.wire_bytes_in:
+            return 1.0
+        return self.payload_bytes_in / self.wire_bytes_in
+
+
+def parse_extension_header(value: Optional[str]) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Return the parameters of the accepted permessage-deflate extension, or None.
+    """
+    if not value:
+        return None
+    for extension in value.split(","):
+        name, *params = [part.strip() for part in extension.split(";")]
+        if name.lower() != EXTENSION:
+            continue
+        parsed: Dict[str, Optional[str]] = {}
+        for param in params:
+            key, _, val = param.partition("=")
+            parsed[key.strip().lower()] = val.strip().strip('"') or None
+        return parsed
+    return None
+
+
+class InflatingFrameBuffer(frame_buffer):
+    """
+    Frame buffer that counts wire bytes and inflates permessage-deflate messages.
+
+    With ``params=None`` it only does the accounting.
+    """
+
+    def __init__(
+        self,
+        recv_fn: Callable[[int], bytes],
+        skip_utf8_validation: bool,
+        stats: TrafficStats,
+        params: Optional[Dict[str, Optional[str]]] = None,
+    ):
+        def counting_recv(bufsize: int) -> bytes:
+            data = recv_fn(bufsize)
+            stats.wire_bytes_in += len(data)
+            return data
+
+        super().__init__(counting_recv, skip_utf8_validation)
+        self.stats = stats
+        self.params = params
+        self._reset_context = params is not None and "server_no_context_takeover" in params
+        self._inflater: Any = zlib.decompressobj(-zlib.MAX_WBITS)
+        self._frame_compressed = False
+        self._in_compressed_message = False
+
+    def recv_header(self) -> None:
+        super().recv_header()
+        if self.header is None or self.params is None:
+            return
+        fin, rsv1, rsv2, rsv3, opcode, has_mask, length_bits = self.header
+        self._frame_compressed = bool(rsv1)
+        if rsv1:
+            # RSV1 marks a compressed message; hide it from ABNF.validate().
+            self.header = (fin, 0, rsv2, rsv3, opcode, has_mask, length_bits)
+
+    def recv_frame(self) -> ABNF:
+        frame = super().recv_frame()
+        if frame.opcode in (ABNF.OPCODE_TEXT, ABNF.OPCODE_BINARY):
+            self._in_compressed_message = self._frame_compressed
+        self._frame_compressed = False
+
+        if frame.opcode in (ABNF.OPCODE_TEXT, ABNF.OPCODE_BINARY, ABNF.OPCODE_CONT):
+            if self._in_compressed_message:
+                frame.data = self._inflate(frame.data, frame.fin)
+            self.stats.payload_bytes_in += len(frame.data)
+            if frame.fin:
+                self.stats.messages_in += 1
+                if self._in_compressed_message:
+                    self.stats.compressed_messages_in += 1
+                self._in_compressed_message = False
+        return frame
+
+    def _inflate(self, data: bytes, fin: int) -> bytes:
+        out = self._inflater.decompress(data)
+        if fin:
+            out += self._inflater.decompress(_TAIL)
+            if self._reset_context:
+                self._inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+        return out
+
+
+def install(sock: Any, stats: TrafficStats, compression: bool) -> bool:
+    """
+    Hook traffic accounting (and inflation, if negotiated) into a connected
+    ``websocket.WebSocket``. Returns True if permessage-deflate is active.
+    """
+    old = getattr(sock, "frame_buffer", None)
+    if old is None:
+        return False
+    params = None
+    if compression:
+        headers = sock.getheaders() or {}
+        params = parse_extension_header(headers.get("sec-websocket-extensions"))
+    sock.frame_buffer = InflatingFrameBuffer(old.recv, old.skip_utf8_validation, stats, params)
+    return params is not None
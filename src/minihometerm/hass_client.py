@@ -2,16 +2,107 @@ import json
 import random
 import threading
 import time
-from typing import Any, Callable, Dict, Iterable, Optional, Set
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 import websocket
+from kivy.config import ConfigParser
 from kivy.logger import Logger as logger
 
+from .config import CACHE_DIR
+from .core.bootstrap import BOOTSTRAP_COMMANDS, Bootstrap, BootstrapStats
+from .core.catalog import CATALOG_PARTS, CHANGE_EVENTS, CatalogCache
+from .core.endpoints import EndpointRanking
+from .core.metrics import RollingStats
+from .core.models import EntityState, StateCache
+from .core.outbox import CommandQueue, OutboxStats, resolve
+from .core.throttle import ThrottleStats, UpdateThrottle, parse_intervals
+from .ext import ws_deflate
+from .ext.ws_deflate import TrafficStats
+from .ioloop import IOLoop, TimerHandle
+
+# Protocol-level keepalive used while the application heartbeat is disabled
+PING_INTERVAL = 20.0
+# Catalog change events usually come in bursts (an integration registering its
+# services); refetches and cache writes wait this long to cover the whole burst.
+CATALOG_DELAY = 2.0
+
+EventCallback = Callable[[Dict[str, Any]], None]
+
+
+def service_call(
+    domain: str,
+    service: str,
+    service_data: Optional[Dict[str, Any]] = None,
+    target: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """The ``call_service`` command for ``domain.service``."""
+    msg: Dict[str, Any] = {"type": "call_service", "domain": domain, "service": service}
+    if service_data:
+        msg["service_data"] = service_data
+    if target:
+        msg["target"] = target
+    return msg
+
+
+class PreparedCommand(dict):
+    """
+    A command serialized once, ahead of time; sending it only splices in the id.
+
+    Use it for messages sent again and again with the same content, like the service
+    call of a button. It must not be changed after creation.
+    """
+
+    def __init__(self, msg: Dict[str, Any]):
+        super().__init__(msg)
+        # Everything after the opening brace
+        self.encoded = json.dumps(msg, separators=(",", ":"))[1:]
+
+
+def encode_command(msg: Dict[str, Any], mid: int) -> str:
+    """JSON text of command ``msg`` sent with message id ``mid``."""
+    encoded = getattr(msg, "encoded", None)
+    if encoded is not None:
+        return f'{{"id":{mid},{encoded}'
+    return json.dumps({**msg, "id": mid})
+
+
+class Subscription:
+    """
+    A server-side subscription that ``HAWebSocketClient`` renews after every reconnect.
+
+    ``id`` is the message id HA tags its events with; it changes with every renewal
+    and is None while disconnected.
+    """
+
+    def __init__(
+        self, client: "HAWebSocketClient", payload: Dict[str, Any], callback: EventCallback
+    ):
+        self.payload = payload
+        self.callback = callback
+        self.id: Optional[int] = None
+        self._client = client
+
+    def unsubscribe(self):
+        self._client.unsubscribe(self)
+
+
+class _Race:
+    """Connection attempts to the endpoints, of which the first to authenticate is kept."""
+
+    def __init__(self, urls: List[str]):
+        self.queue = list(urls)  # not started yet, best first
+        self.candidates: Dict[Any, Tuple[str, float]] = {}  # ws -> (url, monotonic start)
+        self.compressed: Dict[Any, bool] = {}
+        self.winner: Any = None
+        self.timer: Optional[TimerHandle] = None
+
 
 class HAWebSocketClient:
     def __init__(
         self,
-        url: str,
+        url: Union[str, Iterable[str]],
         token: str,
         entities: Optional[Iterable[str]] = None,
         on_entity_update: Optional[
@@ -19,47 +110,266 @@ class HAWebSocketClient:
         ] = None,
         on_connect: Optional[Callable[[], None]] = None,
         on_disconnect: Optional[Callable[[Exception | None], None]] = None,
+        min_update_interval: Optional[float] = None,
+        update_intervals: Optional[Dict[str, float]] = None,
+        max_pending_updates: int = 1024,
+        compression: bool = False,
+        command_ttl: float = 10.0,
+        max_queued_commands: int = 64,
+        heartbeat_interval: float = 0.0,
+        heartbeat_misses: int = 2,
+        on_stale: Optional[Callable[[bool], None]] = None,
+        loop: Optional[IOLoop] = None,
+        bootstrap: Iterable[str] = tuple(BOOTSTRAP_COMMANDS),
+        on_ready: Optional[Callable[[], None]] = None,
+        catalog: Optional[CatalogCache] = None,
+        catalogs: Optional[Callable[[str], CatalogCache]] = None,
+        wake_entities: Optional[Iterable[str]] = None,
+        race_delay: float = 0.25,
+        endpoints: Optional[EndpointRanking] = None,
     ):
-        self.url = url
+        # Several endpoints (a list, or URLs separated by commas) are raced on every
+        # connect: the best known one is opened first, the next one ``race_delay``
+        # seconds later (right away if one fails) and the first to authenticate wins.
+        self.endpoints = endpoints or EndpointRanking(url)
+        self.url = self.endpoints.ordered()[0]  # endpoint of the current connection
+        self.race_delay = race_delay
         self.token = token
         self.entities: Set[str] = set(entities or [])
         self.on_entity_update = on_entity_update
         self.on_connect = on_connect
         self.on_disconnect = on_disconnect
+        self.compression = compression
+        self.compression_active = False
+        self.traffic = TrafficStats()
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_misses = heartbeat_misses
+        self.on_stale = on_stale
+        self.latency = RollingStats(window=60)  # heartbeat round trips, seconds
+        self.states = StateCache()  # latest state of every entity passing the filter
+
+        # Fetched right after every auth_ok, all requests in flight at once; ``ready``
+        # is set (and ``on_ready`` called) once every part has been answered.
+        self.bootstrap_parts = list(bootstrap)
+        unknown = set(self.bootstrap_parts) - set(BOOTSTRAP_COMMANDS)
+        if unknown:
+            raise ValueError(f"Unknown bootstrap parts: {sorted(unknown)}")
+        self.on_ready = on_ready
+        self.ready = threading.Event()
+        self.bootstrap_stats = BootstrapStats()
+        self.ha_version: Optional[str] = None
+        self.config: Dict[str, Any] = {}
+        self.services: Dict[str, Any] = {}
+        self.entity_registry: List[Dict[str, Any]] = []
+        self.device_registry: List[Dict[str, Any]] = []
+        self.area_registry: List[Dict[str, Any]] = []
+        self._bootstrap: Optional[Bootstrap] = None
+        self._connect_started = 0.0
 
+        # Low-power mode (display off): no state_changed subscription, only a trigger
+        # subscription for ``wake_entities``; a snapshot diff catches up on exit.
+        self.wake_entities: Set[str] = set(wake_entities or [])
+        self.low_power = False
+        self._state_sub_id: Optional[int] = None
+        self._wake_sub: Optional[Subscription] = None
+
+        # Sockets, reconnect backoff, heartbeat and TTL timers all run on the (shared)
+        # I/O loop; only the blocking connect + handshake gets a short-lived thread.
+        self._loop = loop or IOLoop.instance()
         self._ws: Optional[websocket.WebSocketApp] = None
-        self._thread: Optional[threading.Thread] = None
+        self._live_ws: Optional[websocket.WebSocketApp] = None  # not yet reported lost
+        self._race: Optional[_Race] = None
+        self._last_error: Optional[Exception] = None
+        self._reconnect_timer: Optional[TimerHandle] = None
         self._running = False
         self._id = 1
         self._id_lock = threading.Lock()
-        self._pending: Dict[int, Dict[str, Any]] = {}
-        self._pending_cond = threading.Condition()
+        # id -> (command type, future) of commands sent and awaiting their result
+        self._pending: Dict[int, Tuple[str, Future]] = {}
+        self._pending_lock = threading.Lock()
+        self._authenticated = False
+        # Extra subscriptions (besides state_changed), renewed on every auth_ok
+        self._subscriptions: List[Subscription] = []
+        self._sub_by_id: Dict[int, Subscription] = {}
+        # Commands issued while offline, flushed right after the next auth_ok
+        self._outbox = CommandQueue(ttl=command_ttl, max_size=max_queued_commands)
+        self._outbox_timer: Optional[TimerHandle] = None
+
+        # Application-level heartbeat: ping id -> monotonic send time
+        self._hb_outstanding: Dict[int, float] = {}
+        self._hb_lock = threading.Lock()
+        self._hb_timer: Optional[TimerHandle] = None
+        self._missed_heartbeats = 0
+        self._stale = True
 
         self._backoff = 1.0
         self._max_backoff = 60.0
 
+        # With an update interval configured, entity updates are handed to a latest-wins
+        # queue and delivered on its own thread instead of the websocket thread.
+        self._throttle: Optional[UpdateThrottle] = None
+        if min_update_interval is not None or update_intervals:
+            self._throttle = UpdateThrottle(
+                self._deliver_update,
+                min_interval=min_update_interval or 0.0,
+                intervals=update_intervals,
+                max_pending=max_pending_updates,
+            )
+
+        # Services and registries are taken from disk while fresh and then kept up to
+        # date from change events; only parts that changed are fetched again.
+        # ``catalogs(url)`` opens the cache of the instance behind an endpoint. Until a
+        # race is won that is the endpoint ranked first, then the one that won.
+        self.catalogs = catalogs
+        if catalog is None and catalogs is not None:
+            catalog = catalogs(self.url)
+        self.catalog = catalog
+        self._catalog_refetch: Set[str] = set()
+        self._catalog_refetch_timer: Optional[TimerHandle] = None
+        self._catalog_save_timer: Optional[TimerHandle] = None
+        if catalog:
+            for part in CATALOG_PARTS:
+                cached = catalog.get(part)
+                if cached is not None:
+                    setattr(self, part, cached)
+            for event_type in CHANGE_EVENTS:
+                self.subscribe(
+                    {"type": "subscribe_events", "event_type": event_type}, self._on_catalog_event
+                )
+
+    @classmethod
+    def from_config(cls, cfg: ConfigParser, **kwargs) -> "HAWebSocketClient":
+        kwargs.setdefault("min_update_interval", cfg.getfloat("updates", "min_interval"))
+        kwargs.setdefault("update_intervals", parse_intervals(cfg.get("updates", "intervals")))
+        kwargs.setdefault("max_pending_updates", cfg.getint("updates", "max_pending"))
+        kwargs.setdefault("compression", cfg.getboolean("connection", "compression"))
+        kwargs.setdefault("command_ttl", cfg.getfloat("connection", "command_ttl"))
+        kwargs.setdefault("heartbeat_interval", cfg.getfloat("connection", "heartbeat_interval"))
+        kwargs.setdefault("heartbeat_misses", cfg.getint("connection", "heartbeat_misses"))
+        wake = cfg.get("display", "wake_entities")
+        kwargs.setdefault("wake_entities", [e.strip() for e in wake.split(",") if e.strip()])
+        kwargs.setdefault("race_delay", cfg.getfloat("connection", "race_delay"))
+        kwargs.setdefault(
+            "endpoints",
+            EndpointRanking(cfg.get("connection", "ws_url"), CACHE_DIR / "endpoints.json"),
+        )
+        max_age = cfg.getfloat("connection", "catalog_max_age")
+        if max_age > 0:
+            kwargs.setdefault("catalogs", lambda url: CatalogCache(CACHE_DIR, url, max_age))
+        return cls(cfg.get("connection", "ws_url"), cfg.get("connection", "token"), **kwargs)
+
     # ---------- Public API ----------
 
+    @property
+    def connected(self) -> bool:
+        return self._authenticated
+
+    @property
+    def stale(self) -> bool:
+        """True while disconnected or while heartbeats go unanswered."""
+        return self._stale
+
+    @property
+    def update_stats(self) -> Optional[ThrottleStats]:
+        return self._throttle.stats if self._throttle else None
+
+    @property
+    def outbox_stats(self) -> OutboxStats:
+        return self._outbox.stats
+
     def start(self):
         if self._running:
             return
         self._running = True
-        self._thread = threading.Thread(target=self._run_forever, daemon=True)
-        self._thread.start()
+        if self._throttle:
+            self._throttle.start()
+        self._loop.start()
+        self._connect()
 
     def stop(self):
+        """
+        Close the connection and cancel any pending reconnect. Never blocks: the socket
+        is closed without waiting for the server's close frame.
+        """
         self._running = False
-        if self._ws:
-            try:
-                self._ws.close()
-            except Exception as e:
-                logger.warning("HAWebSocket: Error while closing WebSocket: %s", e)
-        if self._thread:
-            self._thread.join(timeout=5)
+        if self._reconnect_timer:
+            self._reconnect_timer.cancel()
+        if self._catalog_save_timer:
+            self._catalog_save_timer.cancel()
+            self._catalog_save_timer = None
+        if self.catalog:
+            self._save_catalog()
+        self.endpoints.flush()
+        with self._pending_lock:
+            race = self._race
+            sockets = [self._ws] + (list(race.candidates) if race else [])
+            if race and race.timer:
+                race.timer.cancel()
+        for ws in dict.fromkeys(ws for ws in sockets if ws):
+            self._close_ws(ws)
+            self._connection_lost(ws, None)
+        if self._throttle:
+            self._throttle.stop(timeout=0)
 
     def set_entities(self, entities: Iterable[str]):
         self.entities = set(entities)
 
+    def enter_low_power(self, wake_entities: Optional[Iterable[str]] = None):
+        """
+        Stop receiving state changes, e.g. while the display is off.
+
+        The ``state_changed`` subscription is dropped; only changes of
+        ``wake_entities`` (the configured ones by default), such as a doorbell, are
+        still delivered, through a state trigger subscription. Other subscriptions
+        and queued commands are not affected. Survives reconnects.
+        """
+        with self._pending_lock:
+            if self.low_power:
+                return
+            self.low_power = True
+            if wake_entities is not None:
+                self.wake_entities = set(wake_entities)
+            mid, self._state_sub_id = self._state_sub_id, None
+            if mid is not None and self._authenticated:
+                self._dispatch_command(
+                    {"type": "unsubscribe_events", "subscription": mid}, Future()
+                )
+        wake = sorted(e for e in self.wake_entities if e)
+        if wake:
+            self._wake_sub = self.subscribe(
+                {
+                    "type": "subscribe_trigger",
+                    "trigger": {"platform": "state", "entity_id": wake},
+                },
+                self._on_wake_trigger,
+            )
+        logger.info("HAWebSocket: Low-power mode, watching %d wake entities", len(wake))
+
+    def exit_low_power(self):
+        """
+        Resume ``state_changed`` and apply one ``get_states`` snapshot: only entities
+        that changed meanwhile are delivered, with removed ones as ``None``.
+        """
+        with self._pending_lock:
+            if not self.low_power:
+                return
+            self.low_power = False
+            wake_sub, self._wake_sub = self._wake_sub, None
+            if self._authenticated:
+                self._subscribe_states()
+        if wake_sub:
+            self.unsubscribe(wake_sub)
+        self.resync()
+
+    def resync(self):
+        """
+        Fetch one ``get_states`` snapshot and deliver the entities that differ from
+        ``states``, e.g. after widening the filter with ``set_entities``. While
+        disconnected nothing is sent: the next bootstrap brings everything up to date.
+        """
+        if self._authenticated:
+            self.send_command({"type": "get_states"}).add_done_callback(self._on_resync)
+
     def call_service(
         self,
         domain: str,
@@ -68,81 +378,321 @@ class HAWebSocketClient:
         target: Optional[Dict[str, Any]] = None,
         timeout: float = 2.0,
     ) -> Dict[str, Any]:
-        msg = {
-            "type": "call_service",
-            "domain": domain,
-            "service": service,
+        """
+        Call a service and wait up to ``timeout`` seconds for its result.
+
+        On timeout a call still queued offline is withdrawn, so it does not run later
+        behind the caller's back; one already sent may still complete in HA.
+        """
+        future = self.call_service_async(domain, service, service_data, target)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.cancel_command(future)
+            raise TimeoutError("Service call timed out") from None
+
+    def call_service_async(
+        self,
+        domain: str,
+        service: str,
+        service_data: Optional[Dict[str, Any]] = None,
+        target: Optional[Dict[str, Any]] = None,
+        ttl: Optional[float] = None,
+    ) -> Future:
+        """
+        Issue a service call without waiting for it.
+
+        While disconnected the call is queued (for ``ttl`` seconds, the configured
+        command TTL by default) and sent right after the next successful auth. An
+        identical call still in the queue is not queued twice; both callers share one
+        future, so a double-pressed toggle only toggles once.
+        """
+        return self.send_command(service_call(domain, service, service_data, target), ttl=ttl)
+
+    def send_command(
+        self, msg: Dict[str, Any], ttl: Optional[float] = None, dedupe: bool = True
+    ) -> Future:
+        """
+        Send a command (a message without ``id``) and return a future of its result.
+
+        The future fails with ``RuntimeError`` if HA reports an error and with
+        ``ConnectionError`` if the connection drops before the result arrives.
+        """
+        with self._pending_lock:
+            if self._authenticated:
+                future: Future = Future()
+                if self._dispatch_command(msg, future) is not None:
+                    return future
+            future = self._outbox.put(msg, ttl=ttl, dedupe=dedupe)
+            self._schedule_outbox_expiry()
+            return future
+
+    def cancel_command(self, future: Future) -> bool:
+        """
+        Withdraw a command still waiting in the offline queue; its future is cancelled.
+
+        Returns False once the command went out: HA is acting on it already. Callers
+        sharing a deduplicated command withdraw only their own interest; it stays
+        queued (False) until the last of them cancels.
+        """
+        with self._pending_lock:
+            return self._outbox.discard(future)
+
+    def subscribe(self, payload: Dict[str, Any], callback: EventCallback) -> Subscription:
+        """
+        Start a subscription, e.g. ``{"type": "weather/subscribe_forecast", ...}``, and
+        call ``callback(event)`` with the ``event`` of every message it produces.
+
+        The subscription survives reconnects until ``unsubscribe`` is called. Events
+        are delivered on the websocket thread.
+        """
+        sub = Subscription(self, dict(payload), callback)
+        with self._pending_lock:
+            self._subscriptions.append(sub)
+            if self._authenticated:
+                self._send_subscription(sub)
+        return sub
+
+    def subscribe_template(
+        self,
+        template: str,
+        callback: Callable[[Any], None],
+        variables: Optional[Dict[str, Any]] = None,
+    ) -> Subscription:
+        """
+        Have HA render ``template`` and call ``callback(result)`` with each new result.
+
+        HA re-renders the template whenever an entity it reads changes and only sends
+        results that differ; the render sent after a reconnect is dropped here too if
+        it equals the last one. Render errors are logged, not passed to ``callback``.
+        """
+        payload: Dict[str, Any] = {
+            "type": "render_template",
+            "template": template,
+            "report_errors": True,
         }
-        if service_data:
-            msg["service_data"] = service_data
-        if target:
-            msg["target"] = target
+        if variables:
+            payload["variables"] = variables
+        last: List[Any] = []
 
-        mid = self._next_id()
-        msg["id"] = mid
+        def on_event(event: Dict[str, Any]):
+            if "result" not in event:
+                if event.get("error"):
+                    logger.warning("HAWebSocket: Template %r: %s", template, event.get("error"))
+                return
+            result = event["result"]
+            if last and last[0] == result:
+                return
+            last[:] = [result]
+            callback(result)
 
-        with self._pending_cond:
-            self._pending[mid] = None
-            self._send(msg)
-            ok = self._pending_cond.wait_for(
-                lambda: self._pending[mid] is not None, timeout=timeout
-            )
-            resp = self._pending.pop(mid, None)
-        if not ok or not resp:
-            raise TimeoutError("Service call timed out")
-        if resp.get("error") == "disconnected":
-            raise ConnectionError("WebSocket disconnected during service call")
-        if not resp.get("success", False):
-            raise RuntimeError(f"Service call failed: {resp.get('error')}")
-        return resp.get("result", {})
+        return self.subscribe(payload, on_event)
 
-    # ---------- Internals ----------
+    def unsubscribe(self, sub: Subscription):
+        with self._pending_lock:
+            if sub not in self._subscriptions:
+                return
+            self._subscriptions.remove(sub)
+            mid, sub.id = sub.id, None
+            if mid is None:
+                return
+            self._sub_by_id.pop(mid, None)
+            if self._authenticated:
+                self._dispatch_command(
+                    {"type": "unsubscribe_events", "subscription": mid}, Future()
+                )
 
-    def _run_forever(self):
-        while self._running:
-            try:
-                self._connect()
-            except Exception as e:
-                if self.on_disconnect:
-                    self.on_disconnect(e)
-                delay = min(self._backoff, self._max_backoff)
-                jitter = random.uniform(0, delay * 0.2)  # nosec
-                wait = delay + jitter
-                logger.warning("HAWebSocket: Disconnected: %s, retrying in %.1fs", e, wait)
-                time.sleep(wait)
-                self._backoff = min(self._backoff * 2, self._max_backoff)
+    # ---------- Internals ----------
 
     def _connect(self):
+        if not self._running:
+            return
+        self._connect_started = time.monotonic()
+        self._last_error = None
+        race = _Race(self.endpoints.ordered())
+        with self._pending_lock:
+            self._race = race
+        self._race_next(race)
+
+    def _race_next(self, race: _Race):
+        # Open the next endpoint of ``race``; the one after follows in race_delay.
+        with self._pending_lock:
+            if not self._running or race is not self._race or race.winner or not race.queue:
+                return
+            url = race.queue.pop(0)
+            if race.timer:
+                race.timer.cancel()
+            race.timer = (
+                self._loop.call_later(self.race_delay, self._race_next, race)
+                if race.queue
+                else None
+            )
+        self._open(url, race)
+
+    def _open(self, url: str, race: _Race):
         def on_open(ws):
-            logger.info("HAWebSocket: Connected, authenticating…")
-            ws.send(json.dumps({"type": "auth", "access_token": self.token}))
+            sock = getattr(ws, "sock", None)
+            compressed = bool(sock and ws_deflate.install(sock, self.traffic, self.compression))
+            race.compressed[ws] = compressed
+            raw = getattr(sock, "sock", None)
+            if raw is not None:
+                self._loop.on_reader_error(raw, lambda error: self._reader_failed(ws, error))
+            logger.info(
+                "HAWebSocket: Connected to %s (compression %s), authenticating…",
+                url,
+                "on" if compressed else "off",
+            )
+            self._send_text(json.dumps({"type": "auth", "access_token": self.token}), ws)
 
         def on_message(ws, message):
-            self._handle_message(json.loads(message))
+            msg = json.loads(message)
+            if ws is self._live_ws or self._race_message(race, ws, msg):
+                self._handle_message(msg)
 
         def on_error(ws, error):
-            logger.error("HAWebSocket: WebSocket error: %s", error)
+            self._last_error = error
+            logger.error("HAWebSocket: WebSocket error (%s): %s", url, error)
 
         def on_close(ws, code, msg):
-            logger.info("HAWebSocket: WebSocket closed: %s %s", code, msg)
-
-        self._ws = websocket.WebSocketApp(
-            self.url,
-            on_open=on_open,
-            on_message=on_message,
-            on_error=on_error,
-            on_close=on_close,
-        )
+            logger.info("HAWebSocket: WebSocket closed (%s): %s %s", url, code, msg)
+            self._connection_lost(ws, self._last_error)
 
-        # Blocking loop (returns on disconnect)
-        self._ws.run_forever(ping_interval=20)
+        try:
+            ws = websocket.WebSocketApp(
+                url,
+                header=[ws_deflate.OFFER_HEADER] if self.compression else [],
+                on_open=on_open,
+                on_message=on_message,
+                on_error=on_error,
+                on_close=on_close,
+            )
+        except Exception as e:
+            self._attempt_failed(race, url, e)
+            return
+        with self._pending_lock:
+            if race is not self._race or race.winner:
+                return
+            race.candidates[ws] = (url, time.monotonic())
+            if self._ws is None or self._ws not in race.candidates:
+                self._ws = ws  # until a winner is known: the first attempt
+        threading.Thread(
+            target=self._run_connection, args=(ws,), name="ha-connect", daemon=True
+        ).start()
 
-        # 🚨 After run_forever exits, reject all pending calls
-        with self._pending_cond:
-            for mid in list(self._pending):
-                # Mark them with a special marker so caller sees disconnect
-                self._pending[mid] = {"success": False, "error": "disconnected"}
-            self._pending_cond.notify_all()
+    def _race_message(self, race: _Race, ws, msg: Dict[str, Any]) -> bool:
+        """Whether a message from a connection that is not the live one is handled."""
+        with self._pending_lock:
+            if race is not self._race or ws not in race.candidates:
+                return False  # lost the race, or from an earlier connection
+            if msg.get("type") != "auth_ok":
+                return True
+            race.winner = ws
+            url, started = race.candidates.pop(ws)
+            losers = list(race.candidates)
+            race.candidates.clear()
+            race.queue.clear()
+            if race.timer:
+                race.timer.cancel()
+            self._ws = self._live_ws = ws
+            self.url = url
+            self.compression_active = race.compressed.get(ws, False)
+        self._use_catalog(url)
+        elapsed = time.monotonic() - started
+        self.endpoints.succeeded(url, elapsed)
+        if losers or len(self.endpoints.urls) > 1:
+            logger.info(
+                "HAWebSocket: Using %s (%.0f ms), dropping %d other attempt(s)",
+                url,
+                elapsed * 1000,
+                len(losers),
+            )
+        for loser in losers:
+            self._close_ws(loser)
+        return True
+
+    def _attempt_failed(self, race: _Race, url: str, error: Optional[Exception]):
+        if self._running:
+            self.endpoints.failed(url)
+        with self._pending_lock:
+            if race is not self._race or race.winner:
+                return
+            more = bool(race.queue)
+            ended = not more and not race.candidates
+            if ended:
+                self._race = None
+        if more:
+            self._race_next(race)  # without waiting for race_delay
+        elif ended:
+            self._disconnected(error)
+
+    def _run_connection(self, ws):
+        # With the loop as dispatcher run_forever returns as soon as the handshake is
+        # done and the socket is registered with the loop; reads happen there.
+        try:
+            ws.run_forever(dispatcher=self._loop, reconnect=0)
+        except Exception as e:
+            self._last_error = e
+        if not getattr(ws, "keep_running", False):
+            self._connection_lost(ws, self._last_error)
+
+    def _reader_failed(self, ws, error: Exception):
+        # Raised while reading a frame (e.g. a corrupt deflate stream); the loop has
+        # closed the socket already. Without this, nothing would notice the loss.
+        logger.error("HAWebSocket: Reading from the WebSocket failed: %s", error)
+        self._last_error = error
+        self._close_ws(ws)
+        self._connection_lost(ws, error)
+
+    def _close_ws(self, ws):
+        try:
+            ws.close(timeout=0)
+        except Exception as e:
+            logger.warning("HAWebSocket: Error while closing WebSocket: %s", e)
+
+    def _connection_lost(self, ws, error: Optional[Exception]):
+        # Reported by on_close, by run_forever returning, by stop() and by the heartbeat;
+        # only the first report for the current connection counts.
+        with self._pending_lock:
+            race = self._race
+            attempt = None
+            if race is not None and not race.winner:
+                attempt = race.candidates.pop(ws, None)
+            if attempt is None:
+                if ws is None or ws is not self._live_ws:
+                    return
+                self._live_ws = None
+        if attempt is not None:
+            self._attempt_failed(race, attempt[0], error)
+            return
+        self._disconnected(error)
+
+    def _disconnected(self, error: Optional[Exception]):
+        # 🚨 Reject all calls in flight; their outcome is unknown so they are not retried.
+        # Commands issued from now on queue up until auth_ok.
+        with self._pending_lock:
+            self._authenticated = False
+            self._bootstrap = None
+            self.ready.clear()
+            pending, self._pending = self._pending, {}
+            self._sub_by_id.clear()
+            self._state_sub_id = None
+            for sub in self._subscriptions:
+                sub.id = None
+        for _, future in pending.values():
+            resolve(future, error=ConnectionError("WebSocket disconnected during service call"))
+        self._stop_heartbeat()
+        self._set_stale(True)
+        if self.on_disconnect:
+            self.on_disconnect(error)
+        if not self._running:
+            return
+
+        delay = min(self._backoff, self._max_backoff)
+        jitter = random.uniform(0, delay * 0.2)  # nosec
+        wait = delay + jitter
+        logger.warning("HAWebSocket: Disconnected: %s, retrying in %.1fs", error, wait)
+        self._reconnect_timer = self._loop.call_later(wait, self._connect)
+        self._backoff = min(self._backoff * 2, self._max_backoff)
 
     def _handle_message(self, msg: Dict[str, Any]):
         mtype = msg.get("type")
@@ -150,37 +700,395 @@ class HAWebSocketClient:
             return  # will auth in on_open
         if mtype == "auth_ok":
             self._backoff = 1.0
+            self.ha_version = msg.get("ha_version")
             logger.info("HAWebSocket: Auth OK")
 
-            mid = self._next_id()
-            self._send({"id": mid, "type": "subscribe_events", "event_type": "state_changed"})
+            with self._pending_lock:
+                if not self.low_power:
+                    self._subscribe_states()
+            self._start_bootstrap()
+            self._flush_outbox()
+            self._renew_subscriptions()
+            self._set_stale(False)
+            self._start_heartbeat(self._ws)
 
             if self.on_connect:
                 self.on_connect()
             return
         if mtype == "event":
             event = msg.get("event", {})
-            if event.get("event_type") == "state_changed":
+            sub = self._sub_by_id.get(msg.get("id"))
+            if sub is not None:
+                sub.callback(event)
+                return
+            if event.get("event_type") == "state_changed" and not self.low_power:
                 data = event.get("data", {})
                 eid = data.get("entity_id")
                 if self.entities and eid not in self.entities:
                     return
-                if self.on_entity_update:
-                    self.on_entity_update(eid, data.get("new_state"), data.get("old_state"))
+                self._apply_update(eid, data.get("new_state"), data.get("old_state"))
+            return
+        if mtype == "pong":
+            self._on_pong(msg.get("id"))
             return
         if mtype == "result":
-            mid = msg.get("id")
-            if mid:
-                with self._pending_cond:
-                    self._pending[mid] = msg
-                    self._pending_cond.notify_all()
+            with self._pending_lock:
+                entry = self._pending.pop(msg.get("id"), None)
+            if entry is None:
+                return
+            ctype, future = entry
+            if msg.get("success", False):
+                resolve(future, msg.get("result") or {})
+            else:
+                label = "Service call" if ctype == "call_service" else f"Command {ctype}"
+                resolve(future, error=RuntimeError(f"{label} failed: {msg.get('error')}"))
+
+    # ---------- Heartbeat ----------
+
+    def _start_heartbeat(self, ws):
+        self._stop_heartbeat()
+        if self.heartbeat_interval > 0:
+            self._hb_timer = self._loop.call_later(self.heartbeat_interval, self._heartbeat, ws)
+        else:
+            self._hb_timer = self._loop.call_later(PING_INTERVAL, self._keepalive, ws)
+
+    def _stop_heartbeat(self):
+        if self._hb_timer:
+            self._hb_timer.cancel()
+            self._hb_timer = None
+        with self._hb_lock:
+            self._hb_outstanding.clear()
+            self._missed_heartbeats = 0
+
+    def _heartbeat(self, ws):
+        if ws is self._live_ws and not self._heartbeat_tick(ws):
+            self._hb_timer = self._loop.call_later(self.heartbeat_interval, self._heartbeat, ws)
+
+    def _keepalive(self, ws):
+        if ws is not self._live_ws:
+            return
+        sock = getattr(ws, "sock", None)
+        try:
+            if sock:
+                sock.ping()
+        except Exception as e:
+            logger.warning("HAWebSocket: Ping failed: %s", e)
+        self._hb_timer = self._loop.call_later(PING_INTERVAL, self._keepalive, ws)
+
+    def _heartbeat_tick(self, ws) -> bool:
+        """Send one ping; returns True if the link was declared dead."""
+        with self._hb_lock:
+            if self._hb_outstanding:
+                self._missed_heartbeats += 1
+            missed = self._missed_heartbeats
+        if missed:
+            self._set_stale(True)
+        if missed >= self.heartbeat_misses:
+            logger.warning("HAWebSocket: %d heartbeats missed, forcing reconnect", missed)
+            self._close_ws(ws)
+            self._connection_lost(ws, ConnectionError(f"{missed} heartbeats missed"))
+            return True
+
+        mid = self._next_id()
+        with self._hb_lock:
+            self._hb_outstanding[mid] = time.monotonic()
+        self._send({"id": mid, "type": "ping"})
+        return False
+
+    def _on_pong(self, mid: Optional[int]):
+        with self._hb_lock:
+            sent = self._hb_outstanding.pop(mid, None) if mid is not None else None
+            if sent is None:
+                return
+            # An answer proves the link is alive; older unanswered pings are moot.
+            self._hb_outstanding.clear()
+            self._missed_heartbeats = 0
+        self.latency.add(time.monotonic() - sent)
+        self._set_stale(False)
+
+    def _set_stale(self, stale: bool):
+        if stale == self._stale:
+            return
+        self._stale = stale
+        if self.on_stale:
+            self.on_stale(stale)
+
+    # ---------- Bootstrap ----------
+
+    def _start_bootstrap(self):
+        # Subscribed to state_changed first, so no change after the get_states snapshot
+        # is missed. Every request goes out before the first result comes back.
+        failed = []
+        cached = {}
+        if self.catalog:
+            cached = {
+                part: self.catalog.get(part)
+                for part in self.bootstrap_parts
+                if part in CATALOG_PARTS and self.catalog.fresh(part, self.ha_version)
+            }
+        with self._pending_lock:
+            boot = Bootstrap(
+                [p for p in self.bootstrap_parts if p not in cached],
+                self._bootstrap_done,
+                self._connect_started,
+            )
+            boot.results.update(cached)
+            boot.stats.cached = sorted(cached)
+            self._bootstrap = boot
+            for part in boot.parts:
+                future: Future = Future()
+                boot.track(part, future)
+                if self._dispatch_command({"type": BOOTSTRAP_COMMANDS[part]}, future) is None:
+                    failed.append(future)
+        for future in failed:
+            resolve(future, error=ConnectionError("Send failed"))
+        if not boot.parts:
+            boot.stats.connect_to_ready = time.monotonic() - boot.started
+            self._bootstrap_done(boot)
+
+    def _bootstrap_done(self, boot: Bootstrap):
+        with self._pending_lock:
+            if boot is not self._bootstrap or boot.aborted:
+                return  # connection lost meanwhile; the next auth_ok starts over
+        results = boot.results
+        if "config" in results:
+            self.config = results["config"] or {}
+        for part in CATALOG_PARTS:
+            if part in results:
+                self._set_catalog_part(part, results[part], fetched=part in boot.parts)
+        states = results.get("states") or []
+        for state in states:
+            eid = state.get("entity_id")
+            if not eid or (self.entities and eid not in self.entities):
+                continue
+            self._apply_update(eid, state, None)
+
+        self.bootstrap_stats = boot.stats
+        for part, error in boot.stats.errors.items():
+            logger.warning("HAWebSocket: Bootstrap %s failed: %s", part, error)
+        logger.info(
+            "HAWebSocket: Ready %.0f ms after connecting (%d states)",
+            (boot.stats.connect_to_ready or 0.0) * 1000,
+            len(states),
+        )
+        self.ready.set()
+        if self.on_ready:
+            self.on_ready()
+
+    # ---------- Low-power mode ----------
+
+    def _subscribe_states(self):
+        # Caller holds _pending_lock
+        future: Future = Future()
+        self._state_sub_id = self._dispatch_command(
+            {"type": "subscribe_events", "event_type": "state_changed"}, future
+        )
+
+    def _on_wake_trigger(self, event: Dict[str, Any]):
+        trigger = (event.get("variables") or {}).get("trigger") or {}
+        eid = trigger.get("entity_id")
+        if eid and self.low_power:
+            self._apply_update(eid, trigger.get("to_state"), trigger.get("from_state"))
+
+    def _on_resync(self, future: Future):
+        if future.exception() is not None:
+            # The next reconnect's bootstrap brings the states up to date instead.
+            logger.warning("HAWebSocket: Resync failed: %s", future.exception())
+            return
+        snapshot = {s.get("entity_id"): s for s in future.result() or [] if s.get("entity_id")}
+        changed = 0
+        for eid, state in snapshot.items():
+            if self.entities and eid not in self.entities:
+                continue
+            old = self.states.get(eid)
+            if old is not None and old == EntityState.from_dict(state, eid):
+                continue
+            self._apply_update(eid, state, old.to_dict() if old else None)
+            changed += 1
+        for eid in list(self.states):
+            if eid not in snapshot:
+                old = self.states.get(eid)
+                self._apply_update(eid, None, old.to_dict() if old else None)
+                changed += 1
+        logger.info("HAWebSocket: Resynced, %d of %d states changed", changed, len(snapshot))
+
+    # ---------- Catalog ----------
+
+    def _set_catalog_part(self, part: str, data: Any, fetched: bool = True):
+        data = data or ({} if part == "services" else [])
+        setattr(self, part, data)
+        if not fetched or not self.catalog:
+            return
+        if not self.catalog.store(part, data, self.ha_version):
+            logger.debug("HAWebSocket: %s unchanged", part)
+        self._schedule_catalog_save()
+
+    def _on_catalog_event(self, event: Dict[str, Any]):
+        part = CHANGE_EVENTS.get(event.get("event_type"))
+        data = event.get("data") or {}
+        if part == "entity_registry":
+            # A removal is applied as is; for the other actions fetch just that entry.
+            eid = data.get("entity_id")
+            if data.get("action") == "remove":
+                self.catalog.remove_entity(eid)
+            else:
+                if data.get("old_entity_id"):
+                    self.catalog.remove_entity(data["old_entity_id"])
+                if eid:
+                    future = self.send_command(
+                        {"type": "config/entity_registry/get", "entity_id": eid}
+                    )
+                    future.add_done_callback(self._on_registry_entry)
+            self.entity_registry = self.catalog.get("entity_registry") or []
+            self._schedule_catalog_save()
+            return
+        if part:
+            self.catalog.invalidate(part)
+            with self._pending_lock:
+                self._catalog_refetch.add(part)
+                if not self._catalog_refetch_timer:
+                    self._catalog_refetch_timer = self._loop.call_later(
+                        CATALOG_DELAY, self._refetch_catalog
+                    )
+
+    def _on_registry_entry(self, future: Future):
+        if future.exception() is None and self.catalog.upsert_entity(future.result()):
+            self.entity_registry = self.catalog.get("entity_registry") or []
+            self._schedule_catalog_save()
+
+    def _refetch_catalog(self):
+        with self._pending_lock:
+            parts, self._catalog_refetch = self._catalog_refetch, set()
+            self._catalog_refetch_timer = None
+        for part in parts:
+            future = self.send_command({"type": BOOTSTRAP_COMMANDS[part]})
+
+            def done(f: Future, part=part):
+                if f.exception() is None:
+                    self._set_catalog_part(part, f.result())
+                else:
+                    logger.warning("HAWebSocket: Refetching %s failed: %s", part, f.exception())
+
+            future.add_done_callback(done)
+
+    def _use_catalog(self, url: str):
+        # Before auth_ok is handled, so the bootstrap judges freshness by this one
+        if not self.catalogs or (self.catalog and self.catalog.instance == url):
+            return
+        if self.catalog:
+            self._save_catalog()
+        self.catalog = self.catalogs(url)
+        for part in CATALOG_PARTS:
+            cached = self.catalog.get(part)
+            setattr(
+                self, part, cached if cached is not None else ({} if part == "services" else [])
+            )
+
+    def _schedule_catalog_save(self):
+        # Debounced, and written from a thread of its own so the shared I/O loop never
+        # waits for the SD card. save() returns at once when nothing changed.
+        def save():
+            self._catalog_save_timer = None
+            self._save_catalog()
+
+        if not self._catalog_save_timer:
+            self._catalog_save_timer = self._loop.call_later(CATALOG_DELAY, save)
+
+    def _save_catalog(self):
+        # Not a daemon: a write started at exit is finished, not cut off halfway
+        threading.Thread(target=self.catalog.save, name="ha-catalog-save").start()
+
+    def _apply_update(
+        self, eid: str, new_state: Optional[Dict[str, Any]], old_state: Optional[Dict[str, Any]]
+    ):
+        self.states.update(eid, new_state)
+        if self._throttle:
+            self._throttle.submit(eid, new_state, old_state)
+        else:
+            self._deliver_update(eid, new_state, old_state)
+
+    def _deliver_update(
+        self, eid: str, new_state: Optional[Dict[str, Any]], old_state: Optional[Dict[str, Any]]
+    ):
+        if self.on_entity_update:
+            self.on_entity_update(eid, new_state, old_state)
+
+    def _flush_outbox(self):
+        # Pipelined: everything queued goes out back to back, results arrive by id.
+        with self._pending_lock:
+            self._authenticated = True
+            queued = self._outbox.drain()
+            for cmd in queued:
+                if self._dispatch_command(cmd.payload, cmd.future) is None:
+                    resolve(cmd.future, error=ConnectionError("Send failed"))
+        if queued:
+            logger.info("HAWebSocket: Flushed %d queued command(s)", len(queued))
+
+    def _renew_subscriptions(self):
+        with self._pending_lock:
+            for sub in self._subscriptions:
+                if sub.id is None:  # not already sent by a subscribe() racing auth_ok
+                    self._send_subscription(sub)
+
+    def _send_subscription(self, sub: Subscription):
+        # Caller holds _pending_lock
+        future: Future = Future()
+        mid = self._dispatch_command(sub.payload, future)
+        if mid is None:
+            return
+        sub.id = mid
+        self._sub_by_id[mid] = sub
+
+        def check(f: Future):
+            error = f.exception()
+            if isinstance(error, RuntimeError):
+                logger.warning("HAWebSocket: %s", error)
+
+        future.add_done_callback(check)
+
+    def _schedule_outbox_expiry(self):
+        # Caller holds _pending_lock. One timer, always aimed at the earliest TTL.
+        if self._outbox_timer:
+            self._outbox_timer.cancel()
+        expiry = self._outbox.next_expiry()
+        self._outbox_timer = (
+            None
+            if expiry is None
+            else self._loop.call_later(expiry - time.monotonic(), self._expire_outbox)
+        )
+
+    def _expire_outbox(self):
+        with self._pending_lock:
+            self._outbox.expire()
+            self._schedule_outbox_expiry()
+
+    def _dispatch_command(self, msg: Dict[str, Any], future: Future) -> Optional[int]:
+        # Caller holds _pending_lock. Returns the message id, None if sending failed.
+        mid = self._next_id()
+        self._pending[mid] = (msg["type"], future)
+        try:
+            data = encode_command(msg, mid)
+        except (TypeError, ValueError) as e:
+            logger.error("HAWebSocket: Send failed: %s", e)
+            data = None
+        if data is not None and self._send_text(data):
+            return mid
+        del self._pending[mid]
+        return None
+
+    def _send(self, payload: Dict[str, Any]) -> bool:
+        return self._send_text(json.dumps(payload))
 
-    def _send(self, payload: Dict[str, Any]):
+    def _send_text(self, data: str, ws=None) -> bool:
+        ws = ws or self._ws
         try:
-            if self._ws:
-                self._ws.send(json.dumps(payload))
+            if ws:
+                ws.send(data)
+                self.traffic.bytes_out += len(data)
+                return True
         except Exception as e:
             logger.error("HAWebSocket: Send failed: %s", e)
+        return False
 
     def _next_id(self) -> int:
         with self._id_lock:
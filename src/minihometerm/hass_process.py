@@ -0,0 +1,410 @@
+import multiprocessing
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+from kivy.config import ConfigParser
+from kivy.logger import Logger as logger
+
+from .core.models import StateCache
+from .core.statetable import StateTable
+from .hass_client import HAWebSocketClient, service_call
+
+# Delay before a crashed client process is started again
+RESTART_DELAY = 1.0
+
+# Exceptions a command future may fail with in the client process, rebuilt here
+_ERRORS = {"ConnectionError": ConnectionError, "TimeoutError": TimeoutError}
+
+
+class HAClientProcess:
+    """
+    ``HAWebSocketClient`` running in a child process.
+
+    The child does all socket I/O and JSON decoding, so bursts of events no longer
+    compete with the frame loop for the GIL. It writes the state of every watched
+    entity into a shared-memory ``StateTable``; ``poll`` (call it once per frame on
+    the UI thread) picks up the entities written since the previous call and hands
+    them to ``on_entity_update`` and ``states``. Several updates of one entity
+    between two polls arrive as the newest one.
+
+    Commands and their results, connection changes and ``set_entities`` go over a
+    pipe. Command futures and the ``on_connect``/``on_disconnect``/``on_ready``/
+    ``on_stale`` callbacks are resolved on a thread reading that pipe. A child that
+    dies is started again after ``RESTART_DELAY``, unless ``stop`` came first.
+
+    ``client_options`` are passed to the ``HAWebSocketClient`` in the child; with
+    ``config`` (sections of a parsed config file) it is built with ``from_config``.
+    Callbacks given here stay in this process.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        entities: Optional[Iterable[str]] = None,
+        on_entity_update: Optional[
+            Callable[[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]
+        ] = None,
+        on_connect: Optional[Callable[[], None]] = None,
+        on_disconnect: Optional[Callable[[Exception | None], None]] = None,
+        on_ready: Optional[Callable[[], None]] = None,
+        on_stale: Optional[Callable[[bool], None]] = None,
+        slots: int = 256,
+        slot_size: int = 2048,
+        client_options: Optional[Dict[str, Any]] = None,
+        config: Optional[Dict[str, Dict[str, str]]] = None,
+        start_method: str = "spawn",
+    ):
+        self.url = url
+        self.token = token
+        self.entities = list(entities or [])
+        self.on_entity_update = on_entity_update
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.on_ready = on_ready
+        self.on_stale = on_stale
+        self.slots = slots
+        self.slot_size = slot_size
+        self.client_options = dict(client_options or {})
+        self.config = config
+        self.states = StateCache()
+        self.ready = threading.Event()
+        self.restarts = 0
+
+        self._context = multiprocessing.get_context(start_method)
+        self._table: Optional[StateTable] = None
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        self._conn: Any = None
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()  # _running, _process, _conn, _table
+        self._stopped = threading.Event()  # cuts a pending restart short
+        self._running = False
+        self._connected = False
+        self._stale = True
+        self._id = 0
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: ConfigParser, **kwargs) -> "HAClientProcess":
+        kwargs.setdefault("slots", cfg.getint("connection", "state_slots"))
+        kwargs.setdefault("slot_size", cfg.getint("connection", "state_slot_size"))
+        kwargs.setdefault("config", {s: dict(cfg.items(s)) for s in cfg.sections()})
+        return cls(cfg.get("connection", "ws_url"), cfg.get("connection", "token"), **kwargs)
+
+    # ---------- Public API ----------
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    @property
+    def stale(self) -> bool:
+        return self._stale
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._stopped.clear()
+            self._table = StateTable.create(self.slots, self.slot_size)
+            self._spawn()
+
+    def stop(self, timeout: float = 2.0, wait: bool = False):
+        """
+        Ask the child to exit and fail pending commands. Never blocks unless ``wait``:
+        the child is joined (terminated after ``timeout``) and the state table freed
+        on a thread of its own.
+        """
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            self._stopped.set()
+            process, conn, table = self._process, self._conn, self._table
+            self._process = self._conn = self._table = None
+        if conn is not None:
+            self._post(("stop",), conn)
+        self._fail_pending()
+        reaper = threading.Thread(
+            target=self._reap, args=(process, conn, table, timeout), name="ha-client-stop"
+        )
+        reaper.start()
+        if wait:
+            reaper.join()
+
+    def poll(self) -> int:
+        """Deliver entities updated since the last call. Returns how many there were."""
+        table = self._table
+        if table is None:
+            return 0
+        changes = table.changes()
+        for entity_id, new_state in changes:
+            old = self.states.get(entity_id)
+            self.states.update(entity_id, new_state)
+            if self.on_entity_update:
+                self.on_entity_update(entity_id, new_state, old.to_dict() if old else None)
+        return len(changes)
+
+    def set_entities(self, entities: Iterable[str]):
+        self.entities = list(entities)
+        self._post(("entities", self.entities))
+
+    def resync(self):
+        # Entities beyond state_slots do not fit in the table and are dropped
+        self._post(("resync",))
+
+    def enter_low_power(self, wake_entities: Optional[Iterable[str]] = None):
+        self._post(("low_power", True, None if wake_entities is None else list(wake_entities)))
+
+    def exit_low_power(self):
+        self._post(("low_power", False, None))
+
+    def call_service(
+        self,
+        domain: str,
+        service: str,
+        service_data: Optional[Dict[str, Any]] = None,
+        target: Optional[Dict[str, Any]] = None,
+        timeout: float = 2.0,
+    ) -> Dict[str, Any]:
+        """
+        ``HAWebSocketClient.call_service`` in the child. Unlike there, a call that
+        times out is not withdrawn: it may still be queued in the child and run once
+        the connection is back.
+        """
+        future = self.call_service_async(domain, service, service_data, target)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise TimeoutError("Service call timed out") from None
+
+    def call_service_async(
+        self,
+        domain: str,
+        service: str,
+        service_data: Optional[Dict[str, Any]] = None,
+        target: Optional[Dict[str, Any]] = None,
+        ttl: Optional[float] = None,
+    ) -> Future:
+        return self.send_command(service_call(domain, service, service_data, target), ttl=ttl)
+
+    def cancel_command(self, future: Future) -> bool:
+        """Always False: a command handed to the child process can no longer be withdrawn."""
+        return False
+
+    def send_command(
+        self, msg: Dict[str, Any], ttl: Optional[float] = None, dedupe: bool = True
+    ) -> Future:
+        """``HAWebSocketClient.send_command`` in the child; fails if it is not running."""
+        future: Future = Future()
+        with self._pending_lock:
+            self._id += 1
+            rid = self._id
+            self._pending[rid] = future
+        if not self._post(("command", rid, msg, ttl, dedupe)):
+            with self._pending_lock:
+                self._pending.pop(rid, None)
+            future.set_exception(ConnectionError("HA client process is not running"))
+        return future
+
+    # ---------- Internals ----------
+
+    def _spawn(self):
+        # Called with _lock held
+        parent_conn, child_conn = self._context.Pipe()
+        self._conn = parent_conn
+        self._process = self._context.Process(
+            target=run_client,
+            args=(
+                child_conn,
+                self._table.name,
+                self.url,
+                self.token,
+                self.entities,
+                self.client_options,
+                self.config,
+            ),
+            name="ha-client",
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+        threading.Thread(
+            target=self._read_pipe, args=(parent_conn,), name="ha-client-pipe", daemon=True
+        ).start()
+
+    def _post(self, msg: tuple, conn: Any = None) -> bool:
+        conn = conn or self._conn
+        if conn is None:
+            return False
+        with self._send_lock:
+            try:
+                conn.send(msg)
+                return True
+            except (OSError, ValueError):
+                return False
+
+    def _read_pipe(self, conn):
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break
+            self._handle(msg)
+        self._child_exited(conn)
+
+    def _handle(self, msg: tuple):
+        kind = msg[0]
+        if kind == "result":
+            _kind, rid, error, value = msg
+            with self._pending_lock:
+                future = self._pending.pop(rid, None)
+            if future is None or future.done():
+                return
+            if error is None:
+                future.set_result(value)
+            else:
+                future.set_exception(_ERRORS.get(error[0], RuntimeError)(error[1]))
+        elif kind == "connected":
+            self._connected = True
+            if self.on_connect:
+                self.on_connect()
+        elif kind == "disconnected":
+            self._set_disconnected(ConnectionError(msg[1]) if msg[1] else None)
+        elif kind == "ready":
+            self.ready.set()
+            if self.on_ready:
+                self.on_ready()
+        elif kind == "stale":
+            self._stale = msg[1]
+            if self.on_stale:
+                self.on_stale(msg[1])
+
+    def _set_disconnected(self, error: Optional[Exception]):
+        was_connected, self._connected = self._connected, False
+        self.ready.clear()
+        self._stale = True
+        if was_connected and self.on_disconnect:
+            self.on_disconnect(error)
+
+    def _child_exited(self, conn):
+        with self._lock:
+            # A pipe closed by stop, or one of a child that was replaced already
+            if conn is not self._conn:
+                return
+            process = self._process
+        self._fail_pending()
+        self._set_disconnected(ConnectionError("HA client process exited"))
+        logger.error(
+            "HAWebSocket: Client process exited (code %s), restarting in %.0fs",
+            process.exitcode if process else None,
+            RESTART_DELAY,
+        )
+        if self._stopped.wait(RESTART_DELAY):
+            return
+        with self._lock:
+            # stop() (and maybe start()) ran meanwhile: that one owns the child now
+            if not self._running or conn is not self._conn:
+                return
+            conn.close()
+            self.restarts += 1
+            self._spawn()
+
+    @staticmethod
+    def _reap(process, conn, table: Optional[StateTable], timeout: float):
+        if process is not None:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout)
+        if conn is not None:
+            conn.close()
+        if table is not None:
+            table.close()
+
+    def _fail_pending(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("HA client process exited"))
+
+
+def run_client(
+    conn,
+    table_name: str,
+    url: str,
+    token: str,
+    entities: Iterable[str],
+    client_options: Dict[str, Any],
+    config: Optional[Dict[str, Dict[str, str]]],
+):
+    """Entry point of the child process started by ``HAClientProcess``."""
+    table = StateTable.attach(table_name)
+    send_lock = threading.Lock()
+
+    def send(*msg):
+        with send_lock:
+            try:
+                conn.send(msg)
+            except (OSError, ValueError):
+                pass
+
+    def reply(rid: int, future: Future):
+        error = future.exception()
+        if error is None:
+            send("result", rid, None, future.result())
+        else:
+            send("result", rid, (type(error).__name__, str(error)), None)
+
+    callbacks: Dict[str, Any] = {
+        "entities": entities,
+        "on_entity_update": lambda eid, new, old: table.write(eid, new),
+        "on_connect": lambda: send("connected"),
+        "on_disconnect": lambda error: send("disconnected", str(error) if error else None),
+        "on_ready": lambda: send("ready"),
+        "on_stale": lambda stale: send("stale", stale),
+    }
+    if config:
+        cfg = ConfigParser()
+        cfg.read_dict(config)
+        client = HAWebSocketClient.from_config(cfg, **callbacks)
+    else:
+        client = HAWebSocketClient(url, token, **callbacks, **client_options)
+    client.start()
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg[0] == "stop":
+                break
+            if msg[0] == "entities":
+                client.set_entities(msg[1])
+            elif msg[0] == "resync":
+                client.resync()
+            elif msg[0] == "low_power":
+                if msg[1]:
+                    client.enter_low_power(msg[2])
+                else:
+                    client.exit_low_power()
+            elif msg[0] == "command":
+                _kind, rid, command, ttl, dedupe = msg
+                future = client.send_command(command, ttl=ttl, dedupe=dedupe)
+                future.add_done_callback(lambda f, rid=rid: reply(rid, f))
+    finally:
+        client.stop()
+        table.close()
+        conn.close()
+
+
+def client_from_config(cfg: ConfigParser, **kwargs) -> Union[HAWebSocketClient, HAClientProcess]:
+    """The HA client selected by ``[connection] process``, built from ``cfg``."""
+    if cfg.getboolean("connection", "process"):
+        return HAClientProcess.from_config(cfg, **kwargs)
+    return HAWebSocketClient.from_config(cfg, **kwargs)
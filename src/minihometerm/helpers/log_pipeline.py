@@ -0,0 +1,225 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+from typing import Deque, Dict, List, Optional, Tuple
+
+from kivy.config import ConfigParser
+from kivy.logger import FileHandler as KivyFileHandler
+from kivy.logger import Logger
+
+# Queue item asking the listener thread to write out the ring buffers
+_FLUSH = object()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let at most ``burst`` records with the same logger, level and message template
+    through per ``period`` seconds. The first record of the next period carries the
+    number of records suppressed in between.
+
+    Keyed on the unformatted template, so "retrying in 1.0s" and "retrying in 2.0s"
+    count as the same message and nothing is formatted to decide.
+    """
+
+    def __init__(self, burst: int = 5, period: float = 60.0, max_keys: int = 1024):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self.max_keys = max_keys
+        self.suppressed = 0
+        # key -> [window start, records in window, suppressed in window]
+        self._windows: Dict[Tuple[str, int, str], List] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                if window is None and len(self._windows) >= self.max_keys:
+                    self._prune(now)
+                self._windows[key] = [now, 1, 0]
+                if window is not None and window[2]:
+                    record.msg = f"{record.msg} [{window[2]} similar messages suppressed]"
+                return True
+            window[1] += 1
+            if window[1] <= self.burst:
+                return True
+            window[2] += 1
+            self.suppressed += 1
+            return False
+
+    def _prune(self, now: float):
+        expired = [k for k, w in self._windows.items() if now - w[0] >= self.period]
+        for k in expired or list(self._windows)[: len(self._windows) // 2]:
+            del self._windows[k]
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keep the last ``capacity`` records in memory and hand them to ``target`` only
+    when a record at ``flush_level`` or above arrives, or on ``flush()``.
+
+    Routine records that are never followed by a problem never reach the disk; when
+    one is, the records leading up to it are written with it.
+    """
+
+    def __init__(
+        self, target: logging.Handler, capacity: int = 500, flush_level: int = logging.WARNING
+    ):
+        super().__init__()
+        self.target = target
+        self.flush_level = flush_level
+        self.buffer: Deque[logging.LogRecord] = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord):
+        self.buffer.append(record)
+        if record.levelno >= self.flush_level:
+            self._write_out()
+
+    def flush(self):
+        with self.lock:
+            self._write_out()
+
+    def close(self):
+        self.flush()
+        self.target.close()
+        super().close()
+
+    def _write_out(self):
+        while self.buffer:
+            self.target.handle(self.buffer.popleft())
+        self.target.flush()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hand records to the listener thread as they are; formatting happens there.
+
+    Never blocks the caller: when the queue is full the record is dropped and
+    counted. Arguments are formatted later, so they should not be mutated after
+    the logging call (true for the strings and numbers logged here).
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    def __init__(self, log_queue: queue.Queue, handlers, rings: List[RingBufferHandler]):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.rings = rings
+
+    def start(self):
+        self._thread = threading.Thread(target=self._monitor, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def enqueue_sentinel(self):
+        # Unlike records, the stop request must not be dropped on a full queue.
+        self.queue.put(self._sentinel, timeout=1.0)
+
+    def handle(self, record):
+        if record is _FLUSH:
+            for ring in self.rings:
+                ring.flush()
+            return
+        super().handle(record)
+
+
+class LogPipeline:
+    """
+    Move the handlers of a logger behind a queue served by a background thread.
+
+    Logging calls only build the record, run the rate limiter and enqueue it.
+    Formatting, console output and file writes happen on the "log-writer" thread,
+    and file handlers sit behind a ``RingBufferHandler``, so the SD card only sees
+    writes around warnings, on ``flush()`` and at ``stop()``.
+    """
+
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        ring_size: int = 500,
+        flush_level: int = logging.WARNING,
+        burst: int = 5,
+        period: float = 60.0,
+        queue_size: int = 10000,
+    ):
+        # Kivy attaches its handlers to the root logger, or to its own logger when
+        # KIVY_LOG_MODE=MIXED.
+        if logger is None:
+            logger = Logger if Logger.handlers else logging.root
+        self.logger = logger
+        self.ring_size = ring_size
+        self.flush_level = flush_level
+        self.rate_limit = RateLimitFilter(burst, period)
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.handler.addFilter(self.rate_limit)
+        self._original: List[logging.Handler] = []
+        self._listener: Optional[_Listener] = None
+
+    @classmethod
+    def from_config(cls, cfg: ConfigParser, **kwargs) -> "LogPipeline":
+        kwargs.setdefault("ring_size", cfg.getint("logging", "ring_size"))
+        kwargs.setdefault(
+            "flush_level", logging.getLevelName(cfg.get("logging", "flush_level").upper())
+        )
+        kwargs.setdefault("burst", cfg.getint("logging", "rate_limit_burst"))
+        kwargs.setdefault("period", cfg.getfloat("logging", "rate_limit_period"))
+        return cls(**kwargs)
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def start(self):
+        if self._listener:
+            return
+        self._original = list(self.logger.handlers)
+        handlers: List[logging.Handler] = []
+        rings: List[RingBufferHandler] = []
+        for h in self._original:
+            self.logger.removeHandler(h)
+            if isinstance(h, (KivyFileHandler, logging.FileHandler)):
+                ring = RingBufferHandler(h, self.ring_size, self.flush_level)
+                rings.append(ring)
+                h = ring
+            handlers.append(h)
+        self.logger.addHandler(self.handler)
+        self._listener = _Listener(self.queue, handlers, rings)
+        self._listener.start()
+
+    def flush(self):
+        """Write the buffered records to disk (asynchronously, after those queued)."""
+        if self._listener:
+            try:
+                self.queue.put_nowait(_FLUSH)
+            except queue.Full:
+                pass
+
+    def stop(self):
+        """Drain the queue, write the buffers and give the logger its handlers back."""
+        if not self._listener:
+            return
+        self.logger.removeHandler(self.handler)
+        self._listener.stop()
+        for ring in self._listener.rings:
+            ring.flush()
+        for h in self._original:
+            self.logger.addHandler(h)
+        self._listener = None
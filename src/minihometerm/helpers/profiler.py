@@ -0,0 +1,193 @@
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+from kivy.config import ConfigParser
+from kivy.logger import Logger as logger
+
+from ..config import CACHE_DIR
+
+# Thread name -> label used as the root frame of its stacks
+THREAD_LABELS = {
+    "MainThread": "ui",
+    "ha-ioloop": "websocket",
+    "ha-connect": "websocket",
+    "ha-dispatcher": "dispatcher",
+}
+
+
+def collapse(frame, label: str) -> str:
+    """``label;outer (file.py:12);...;inner (file.py:34)``, the collapsed-stack form."""
+    names: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    names.append(label)
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Sample the stacks of all threads ``rate`` times a second for ``duration`` seconds.
+
+    Nothing runs while idle; ``start`` spawns a sampling thread that reads
+    ``sys._current_frames`` and counts identical stacks. When it ends (or on ``stop``)
+    the counts are written to ``directory`` in the collapsed-stack format read by
+    ``flamegraph.pl``, speedscope and similar tools: one ``frames count`` line per
+    distinct stack. Each stack starts with its thread's label (``THREAD_LABELS``, or
+    the thread name), so UI, websocket and dispatcher time can be told apart.
+    """
+
+    def __init__(
+        self,
+        rate: float = 100.0,
+        duration: float = 30.0,
+        directory: Optional[Path] = None,
+    ):
+        self.rate = rate
+        self.duration = duration
+        self.directory = Path(directory) if directory else None
+        self.samples = 0
+        self.sampling_time = 0.0  # seconds spent taking samples
+        self.profiles: Deque[Path] = deque(maxlen=10)  # written files, newest last
+        self._stacks: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.RLock()  # also taken by the signal handler
+
+    @classmethod
+    def from_config(cls, cfg: ConfigParser, **kwargs) -> "SamplingProfiler":
+        kwargs.setdefault("rate", cfg.getfloat("diagnostics", "profile_rate"))
+        kwargs.setdefault("duration", cfg.getfloat("diagnostics", "profile_duration"))
+        kwargs.setdefault("directory", CACHE_DIR / "profiles")
+        return cls(**kwargs)
+
+    # ---------- Public API ----------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, duration: Optional[float] = None) -> bool:
+        """Start a profile; returns False if one is already running."""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._stop.clear()
+            self._stacks = Counter()
+            self.samples = 0
+            self.sampling_time = 0.0
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(self.duration if duration is None else duration,),
+                name="profiler",
+                daemon=True,
+            )
+            self._thread.start()
+        logger.info("Profiler: Sampling at %.0f Hz", self.rate)
+        return True
+
+    def stop(self, timeout: float = 2.0):
+        """End the running profile early; it is still written."""
+        thread = self._thread
+        self._stop.set()
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def toggle(self):
+        if not self.start():
+            self.stop(timeout=0)
+
+    def install_signal(self, signum: Optional[int] = None) -> bool:
+        """Toggle profiling on ``signum`` (SIGUSR1). Call from the main thread."""
+        if signum is None:
+            signum = getattr(signal, "SIGUSR1", None)
+        if signum is None:
+            return False
+        signal.signal(signum, lambda _signum, _frame: self.toggle())
+        return True
+
+    def collapsed(self) -> List[Tuple[str, int]]:
+        return sorted(self._stacks.items())
+
+    # ---------- Internals ----------
+
+    def _run(self, duration: float):
+        interval = 1.0 / self.rate
+        own = threading.get_ident()
+        labels: Dict[int, str] = {}
+        deadline = time.monotonic() + duration
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            started = time.perf_counter()
+            frames = sys._current_frames()
+            if any(ident not in labels for ident in frames):
+                labels = {
+                    t.ident: THREAD_LABELS.get(t.name, t.name)
+                    for t in threading.enumerate()
+                    if t.ident is not None
+                }
+            for ident, frame in frames.items():
+                if ident != own:
+                    self._stacks[collapse(frame, labels.get(ident, str(ident)))] += 1
+            del frames
+            self.samples += 1
+            self.sampling_time += time.perf_counter() - started
+        self._write()
+        with self._lock:
+            self._thread = None
+
+    def _write(self):
+        stacks = self.collapsed()
+        logger.info(
+            "Profiler: %d samples, %.1f ms spent sampling",
+            self.samples,
+            self.sampling_time * 1000,
+        )
+        if not self.directory or not stacks:
+            return
+        path = self.directory / time.strftime("profile-%Y%m%d-%H%M%S.txt")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in stacks:
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            logger.warning("Profiler: Could not write %s: %s", path, e)
+            return
+        self.profiles.append(path)
+        logger.info("Profiler: Wrote %s", path)
+
+
+class CornerTaps:
+    """
+    Hidden gesture: ``taps`` touches within ``within`` seconds in the top-left corner.
+
+    ``feed`` takes window coordinates (origin bottom left) and returns True on the
+    touch completing the gesture. The corner spans ``size`` of the shorter side.
+    """
+
+    def __init__(self, taps: int = 5, within: float = 3.0, size: float = 0.1):
+        self.taps = taps
+        self.within = within
+        self.size = size
+        self._times: Deque[float] = deque(maxlen=taps)
+
+    def feed(
+        self, x: float, y: float, width: float, height: float, now: Optional[float] = None
+    ) -> bool:
+        corner = min(width, height) * self.size
+        if x > corner or y < height - corner:
+            self._times.clear()
+            return False
+        now = time.monotonic() if now is None else now
+        self._times.append(now)
+        if len(self._times) == self.taps and now - self._times[0] <= self.within:
+            self._times.clear()
+            return True
+        return False
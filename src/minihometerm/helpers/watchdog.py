@@ -0,0 +1,220 @@
+import gc
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from kivy.config import ConfigParser
+from kivy.logger import Logger as logger
+
+from ..config import CACHE_DIR
+from ..core.metrics import RollingStats
+
+MetricsSource = Callable[[], Dict[str, Any]]
+
+
+@dataclass
+class WatchdogStats:
+    stalls: int = 0
+    longest: float = 0.0  # seconds
+    written: int = 0  # reports written to the file
+    write_errors: int = 0
+
+
+def format_stack(frame, limit: int = 40) -> List[str]:
+    """``"file.py:42 function"`` for each frame of a stack, outermost first."""
+    return [
+        f"{os.path.basename(fs.filename)}:{fs.lineno} {fs.name}"
+        for fs in traceback.extract_stack(frame, limit=limit)
+    ]
+
+
+class StallWatchdog:
+    """
+    Detect frames that run over ``budget`` seconds and record what the UI thread was doing.
+
+    ``beat`` runs once per frame on the UI thread (``start`` schedules it on the Kivy
+    ``Clock``) and only stores a timestamp. A watchdog thread checks that timestamp a
+    few times per budget; once a frame is late it grabs the UI thread's stack with
+    ``sys._current_frames``. When the UI thread beats again, a report is completed
+    with the stall's duration, the garbage collections that ran during it, recent
+    frame times and the output of ``metrics()``. It is logged and appended to the
+    last ``max_reports`` reports kept in ``path`` (one JSON object per line).
+
+    The stack is taken as soon as the stall is noticed, so for a stall made of several
+    slow steps it shows the first one still running at that moment.
+    """
+
+    def __init__(
+        self,
+        budget: float = 0.25,
+        path: Optional[Path] = None,
+        max_reports: int = 20,
+        metrics: Optional[MetricsSource] = None,
+        thread_id: Optional[int] = None,
+    ):
+        self.budget = budget
+        self.path = Path(path) if path else None
+        self.metrics = metrics
+        self.thread_id = thread_id
+        self.stats = WatchdogStats()
+        self.frame_times = RollingStats(window=120)  # between beats, seconds
+        self.reports: Deque[Dict[str, Any]] = deque(maxlen=max_reports)
+
+        self._last_beat: Optional[float] = None
+        self._stall: Optional[Dict[str, Any]] = None  # being recorded
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._event = None
+        # Garbage collections: start of the running one, (start, duration) of recent ones
+        self._gc_start: Optional[float] = None
+        self._gc_runs: Deque[tuple] = deque(maxlen=64)
+        if self.path:
+            self._load()
+
+    @classmethod
+    def from_config(cls, cfg: ConfigParser, **kwargs) -> "StallWatchdog":
+        kwargs.setdefault("budget", cfg.getfloat("diagnostics", "stall_budget"))
+        kwargs.setdefault("max_reports", cfg.getint("diagnostics", "stall_reports"))
+        kwargs.setdefault("path", CACHE_DIR / "stalls.jsonl")
+        return cls(**kwargs)
+
+    # ---------- Public API ----------
+
+    def start(self, schedule: bool = True):
+        """Start watching the calling thread; ``schedule=False`` leaves ``beat`` to the caller."""
+        if self._running or self.budget <= 0:
+            return
+        self._running = True
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        gc.callbacks.append(self._on_gc)
+        if schedule:
+            from kivy.clock import Clock
+
+            self._event = Clock.schedule_interval(self.beat, 0)
+        self._thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def beat(self, *_args):
+        now = time.monotonic()
+        last, self._last_beat = self._last_beat, now
+        if last is not None:
+            self.frame_times.add(now - last)
+        if self._stall is not None:
+            self._wake.set()
+
+    # ---------- Internals ----------
+
+    def _run(self):
+        interval = self.budget / 4
+        while self._running:
+            self._wake.wait(interval)
+            self._wake.clear()
+            if self._running:
+                self._check(time.monotonic())
+
+    def _check(self, now: float):
+        last = self._last_beat
+        if last is None:
+            return
+        stall = self._stall
+        if stall is None:
+            if now - last > self.budget:
+                self._stall = self._begin(last, now)
+        elif last > stall["_started"]:
+            self._stall = None
+            self._finish(stall, last)
+
+    def _begin(self, started: float, now: float) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self.thread_id)
+        return {
+            "_started": started,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "stack": format_stack(frame) if frame is not None else [],
+            "noticed_after": round(now - started, 3),
+        }
+
+    def _finish(self, stall: Dict[str, Any], ended: float):
+        started = stall.pop("_started")
+        duration = ended - started
+        runs = [d for s, d in list(self._gc_runs) if started <= s <= ended]
+        frames = self.frame_times.summary()
+        report = dict(stall)
+        report["duration"] = round(duration, 3)
+        report["gc"] = {"collections": len(runs), "seconds": round(sum(runs), 4)}
+        report["frames"] = {
+            k: v if k == "count" or v is None else round(v, 4) for k, v in frames.items()
+        }
+        if self.metrics:
+            try:
+                report["metrics"] = self.metrics()
+            except Exception as e:
+                report["metrics"] = {"error": repr(e)}
+        self.stats.stalls += 1
+        self.stats.longest = max(self.stats.longest, duration)
+        self.reports.append(report)
+        logger.warning(
+            "Watchdog: UI thread stalled for %.0f ms in %s",
+            duration * 1000,
+            report["stack"][-1] if report["stack"] else "?",
+        )
+        self._save()
+
+    def _on_gc(self, phase: str, _info: Dict[str, Any]):
+        now = time.monotonic()
+        if phase == "start":
+            self._gc_start = now
+        elif self._gc_start is not None:
+            # No lock: a collection can start inside any allocation, including one
+            # made while such a lock is held. deque.append is atomic.
+            self._gc_runs.append((self._gc_start, now - self._gc_start))
+            self._gc_start = None
+
+    def _save(self):
+        if not self.path:
+            return
+        lines = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in self.reports)
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(lines)
+            os.replace(tmp, self.path)
+            self.stats.written += 1
+        except OSError as e:
+            self.stats.write_errors += 1
+            logger.warning("Watchdog: Could not write %s: %s", self.path, e)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.reports.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.warning("Watchdog: Ignoring unreadable %s: %s", self.path, e)
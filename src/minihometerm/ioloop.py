@@ -0,0 +1,299 @@
+import heapq
+import itertools
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from kivy.logger import Logger as logger
+
+
+class TimerHandle:
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when: float, callback: Callable, args: Tuple[Any, ...]):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class IOLoop:
+    """
+    Selector-driven event loop running sockets and timers on a single thread.
+
+    Every method except ``run`` is thread-safe: callbacks scheduled from other threads
+    wake the loop through a socketpair, so ``stop`` and newly scheduled work take
+    effect immediately instead of after the current wait.
+
+    The loop also implements the custom dispatcher interface of ``websocket-client``
+    (``read``/``timeout``/``signal``/``abort``/``buffwrite``), so any number of
+    ``WebSocketApp`` connections can be passed ``run_forever(dispatcher=loop)`` and
+    share this one thread.
+    """
+
+    _instance: Optional["IOLoop"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, name: str = "ha-ioloop"):
+        self.name = name
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+
+        self._lock = threading.Lock()
+        self._ready: Deque[Tuple[Callable, Tuple[Any, ...]]] = deque()
+        self._timers: List[Tuple[float, int, TimerHandle]] = []
+        self._seq = itertools.count()
+        self._readers: Dict[Any, Callable[[], Any]] = {}
+        self._reader_errors: Dict[Any, Callable[[Exception], Any]] = {}
+        self._write_locks: Dict[int, threading.Lock] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    @classmethod
+    def instance(cls) -> "IOLoop":
+        """Process-wide shared loop, started on first use."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            cls._instance.start()
+            return cls._instance
+
+    # ---------- Lifecycle ----------
+
+    def start(self) -> None:
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Ask the loop to exit; only waits for it if ``timeout`` is given."""
+        with self._lock:
+            self._running = False
+        self._wake()
+        if timeout is not None and self._thread and not self.in_loop_thread():
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is threading.current_thread()
+
+    # ---------- Scheduling ----------
+
+    def call_soon(self, callback: Callable, *args: Any) -> None:
+        with self._lock:
+            self._ready.append((callback, args))
+        if not self.in_loop_thread():
+            self._wake()
+
+    def call_later(self, delay: float, callback: Callable, *args: Any) -> TimerHandle:
+        handle = TimerHandle(time.monotonic() + max(delay, 0.0), callback, args)
+        with self._lock:
+            heapq.heappush(self._timers, (handle.when, next(self._seq), handle))
+        if not self.in_loop_thread():
+            self._wake()
+        return handle
+
+    def add_reader(
+        self,
+        fileobj: Any,
+        callback: Callable[[], Any],
+        on_error: Optional[Callable[[Exception], Any]] = None,
+    ) -> None:
+        """
+        Call ``callback()`` whenever ``fileobj`` is readable. The reader is removed
+        when the callback returns a false value or the file object gets closed.
+
+        When the callback raises, the reader is removed, ``fileobj`` is closed and
+        ``on_error(exception)`` is called (see ``on_reader_error``).
+        """
+        if not self.in_loop_thread():
+            self.call_soon(self.add_reader, fileobj, callback, on_error)
+            return
+        if on_error is not None:
+            self.on_reader_error(fileobj, on_error)
+        self._purge_closed()
+        if fileobj not in self._readers:
+            self._selector.register(fileobj, selectors.EVENT_READ)
+        self._readers[fileobj] = callback
+
+    def on_reader_error(self, fileobj: Any, on_error: Callable[[Exception], Any]) -> None:
+        """
+        Set the ``on_error`` of ``fileobj``'s reader, also before it is added: readers
+        of ``websocket-client`` are registered through ``read``, which takes none.
+        """
+        with self._lock:
+            self._reader_errors[fileobj] = on_error
+
+    def remove_reader(self, fileobj: Any) -> None:
+        if not self.in_loop_thread():
+            self.call_soon(self.remove_reader, fileobj)
+            return
+        with self._lock:
+            self._reader_errors.pop(fileobj, None)
+        if self._readers.pop(fileobj, None) is not None:
+            try:
+                self._selector.unregister(fileobj)
+            except (KeyError, ValueError):
+                pass
+
+    # ---------- websocket-client dispatcher interface ----------
+
+    def read(self, sock: Any, callback: Callable[[], Any]) -> None:
+        self.add_reader(sock, callback)
+
+    def timeout(self, seconds: Optional[float], callback: Callable, *args: Any) -> None:
+        # Like rel: the callback repeats for as long as it returns a true value.
+        def fire():
+            if callback(*args) and seconds:
+                self.call_later(seconds, fire)
+
+        self.call_later(seconds or 0.0, fire)
+
+    def signal(self, sig: int, callback: Callable) -> None:
+        # Signal handlers belong to the main thread (Kivy); nothing to do here.
+        pass
+
+    def abort(self) -> None:
+        self.stop()
+
+    def buffwrite(self, sock: Any, data: bytes, send: Callable, disconnect: Callable) -> None:
+        # Frames are small and written straight from the calling thread; a per-socket
+        # lock keeps frames sent from different threads from interleaving.
+        with self._lock:
+            lock = self._write_locks.setdefault(id(sock), threading.Lock())
+        try:
+            with lock:
+                send(sock, data)
+        except Exception as e:
+            self.call_soon(disconnect, e)
+
+    # ---------- Loop ----------
+
+    def run(self) -> None:
+        self._thread = threading.current_thread()
+        while self._running:
+            self.run_once()
+
+    def run_once(self, max_wait: Optional[float] = None) -> None:
+        self._purge_closed()
+        events = self._selector.select(self._next_timeout(max_wait))
+        for key, _ in events:
+            if key.fileobj is self._wake_r:
+                self._drain_wakeups()
+            else:
+                self._dispatch_reader(key.fileobj)
+        self._run_due_timers()
+        self._run_ready()
+
+    def _next_timeout(self, max_wait: Optional[float]) -> Optional[float]:
+        with self._lock:
+            if self._ready or not self._running:
+                return 0
+            timeout = max_wait
+            while self._timers and self._timers[0][2].cancelled:
+                heapq.heappop(self._timers)
+            if self._timers:
+                due = max(self._timers[0][0] - time.monotonic(), 0.0)
+                timeout = due if timeout is None else min(timeout, due)
+            return timeout
+
+    def _dispatch_reader(self, fileobj: Any) -> None:
+        callback = self._readers.get(fileobj)
+        if callback is None:
+            return
+        while True:
+            try:
+                keep = callback()
+            except Exception as e:
+                logger.exception("IOLoop: Reader callback failed")
+                self._reader_failed(fileobj, e)
+                return
+            if not keep or self._is_closed(fileobj):
+                self.remove_reader(fileobj)
+                self._write_locks.pop(id(fileobj), None)
+                return
+            # SSL sockets may hold decrypted data the selector cannot see.
+            pending = getattr(fileobj, "pending", None)
+            if not pending or not pending():
+                return
+
+    def _reader_failed(self, fileobj: Any, error: Exception) -> None:
+        # Nobody reads ``fileobj`` any more: close it rather than leave its owner with
+        # a connection that looks alive, and let the owner know.
+        with self._lock:
+            on_error = self._reader_errors.get(fileobj)
+        self.remove_reader(fileobj)
+        self._write_locks.pop(id(fileobj), None)
+        try:
+            fileobj.close()
+        except OSError:
+            pass
+        if on_error is not None:
+            self._invoke(on_error, (error,))
+
+    def _purge_closed(self) -> None:
+        # Sockets closed behind our back (e.g. by another thread) must not linger in
+        # the selector, or their fd number could not be registered again.
+        for fileobj in [f for f in self._readers if self._is_closed(f)]:
+            self.remove_reader(fileobj)
+            self._write_locks.pop(id(fileobj), None)
+
+    @staticmethod
+    def _is_closed(fileobj: Any) -> bool:
+        try:
+            return fileobj.fileno() < 0
+        except (OSError, ValueError):
+            return True
+
+    def _run_due_timers(self) -> None:
+        now = time.monotonic()
+        due: List[TimerHandle] = []
+        with self._lock:
+            while self._timers and self._timers[0][0] <= now:
+                handle = heapq.heappop(self._timers)[2]
+                if not handle.cancelled:
+                    due.append(handle)
+        for handle in due:
+            if not handle.cancelled:
+                self._invoke(handle.callback, handle.args)
+
+    def _run_ready(self) -> None:
+        with self._lock:
+            ready, self._ready = self._ready, deque()
+        for callback, args in ready:
+            self._invoke(callback, args)
+
+    @staticmethod
+    def _invoke(callback: Callable, args: Tuple[Any, ...]) -> None:
+        try:
+            callback(*args)
+        except Exception:
+            logger.exception("IOLoop: Callback %r failed", callback)
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass  # a wake-up is already pending
+
+    def _drain_wakeups(self) -> None:
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except OSError:
+            pass
@@ -1,14 +1,41 @@
+import argparse
+import atexit
+from typing import List, Optional
+
 from kivy.logger import Logger as logger
 
 from .app import MiniHomeTerm
 from .config import load_config
+from .helpers.log_pipeline import LogPipeline
+from .helpers.profiler import SamplingProfiler
+from .helpers.watchdog import StallWatchdog
+
 
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="minihometerm")
+    parser.add_argument(
+        "--profile",
+        type=float,
+        metavar="SECONDS",
+        help="sample all thread stacks for the first SECONDS of the run",
+    )
+    args = parser.parse_args(argv)
 
-def main():
     cfg = load_config()
     logger.setLevel(cfg.get("logging", "level", fallback="INFO").upper())
+    pipeline = LogPipeline.from_config(cfg)
+    pipeline.start()
+    atexit.register(pipeline.stop)
+    watchdog = StallWatchdog.from_config(cfg)
+    watchdog.start()
+    atexit.register(watchdog.stop)
+    profiler = SamplingProfiler.from_config(cfg)
+    profiler.install_signal()
+    if args.profile:
+        profiler.start(args.profile)
+    atexit.register(profiler.stop)
 
-    MiniHomeTerm(cfg).run()
+    MiniHomeTerm(cfg, profiler=profiler, connect=True).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+from typing import Any, Dict, List, Optional
+
+from kivy.clock import Clock
+from kivy.metrics import dp
+from kivy.properties import NumericProperty, StringProperty
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.textinput import TextInput
+
+from ..core.models import StateCache
+from ..core.search import EntityIndex
+from .screens import BaseScreen
+
+
+def entity_row(entity_id: str, name: str, state: Any) -> Dict[str, Any]:
+    """RecycleView data item for one entity."""
+    return {"entity_id": entity_id, "text": f"{name or entity_id}\n{entity_id}  ·  {state}"}
+
+
+class EntityRow(RecycleDataViewBehavior, Label):
+    entity_id = StringProperty("")
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("halign", "left")
+        kwargs.setdefault("valign", "middle")
+        super().__init__(**kwargs)
+        self.fbind("size", lambda _w, size: setattr(self, "text_size", size))
+
+
+class EntityBrowserScreen(BaseScreen):
+    """
+    Searchable list of every entity in a ``StateCache``.
+
+    The search index is built once in ``set_states`` and then updated per entity by
+    ``entity_updated`` (``on_entity_update`` signature; call on the UI thread). Rows
+    live in a ``RecycleView``, so only the visible ones exist as widgets; typing
+    re-runs the query against the index on the next frame.
+    """
+
+    screen_name = "browser"
+
+    query = StringProperty("")
+    limit = NumericProperty(200)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.states: Optional[StateCache] = None
+        self.index = EntityIndex()
+        self._rows: Dict[str, int] = {}  # entity_id -> position in results.data
+        self._search_trigger = Clock.create_trigger(self._run_search)
+
+        box = BoxLayout(orientation="vertical", padding=dp(8), spacing=dp(8))
+        self.search_input = TextInput(
+            hint_text="Search entities", multiline=False, size_hint_y=None, height=dp(40)
+        )
+        self.search_input.fbind("text", lambda _w, text: setattr(self, "query", text))
+        self.results = RecycleView()
+        layout = RecycleBoxLayout(
+            orientation="vertical",
+            default_size=(None, dp(48)),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+        )
+        layout.bind(minimum_height=layout.setter("height"))
+        self.results.add_widget(layout)
+        self.results.viewclass = EntityRow
+        box.add_widget(self.search_input)
+        box.add_widget(self.results)
+        self.add_widget(box)
+
+    def set_states(self, states: StateCache):
+        self.states = states
+        self.index = EntityIndex.from_states(states)
+        self._search_trigger()
+
+    def entity_updated(
+        self,
+        entity_id: str,
+        new_state: Optional[Dict[str, Any]],
+        old_state: Optional[Dict[str, Any]] = None,
+    ):
+        if new_state is None:
+            self.index.remove(entity_id)
+            if entity_id in self._rows:
+                self._search_trigger()
+            return
+        name = (new_state.get("attributes") or {}).get("friendly_name")
+        if self.index.update(entity_id, name):
+            self._search_trigger()
+            return
+        row = self._rows.get(entity_id)
+        if row is not None:
+            self.results.data[row] = entity_row(entity_id, name, new_state.get("state"))
+
+    def on_query(self, _instance, _value):
+        self._search_trigger()
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        rows = []
+        for entity_id in self.index.search(query, int(self.limit)):
+            state = self.states.get(entity_id) if self.states is not None else None
+            rows.append(
+                entity_row(entity_id, self.index.name(entity_id), state.state if state else "")
+            )
+        return rows
+
+    def _run_search(self, *_args):
+        rows = self.search(self.query)
+        self._rows = {row["entity_id"]: i for i, row in enumerate(rows)}
+        self.results.data = rows
@@ -0,0 +1,238 @@
+from typing import Any, Dict, List, Optional
+
+from kivy.clock import Clock
+from kivy.graphics import Color, Rectangle
+from kivy.metrics import dp
+from kivy.properties import BooleanProperty, NumericProperty, OptionProperty, StringProperty
+from kivy.uix.behaviors import ButtonBehavior
+from kivy.uix.label import Label
+from kivy.uix.recyclegridlayout import RecycleGridLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+
+from ..config import ButtonConfig
+from .theme import Theme
+
+# Entity states shown as "on"
+ACTIVE_STATES = frozenset({"on", "open", "unlocked", "playing", "home"})
+
+# Theme keys of the tile background
+TILE_STYLE = "surface"
+TILE_ACTIVE_STYLE = "surface_active"
+TILE_PRESSED_STYLE = "surface_pressed"
+
+
+def button_data(buttons: List[ButtonConfig]) -> List[Dict[str, Any]]:
+    """One RecycleView data item per button, in display order."""
+    return [
+        {"index": i, "text": b.label, "icon": b.icon, "entity_state": ""}
+        for i, b in enumerate(buttons)
+    ]
+
+
+def entity_index(buttons: List[ButtonConfig]) -> Dict[str, List[int]]:
+    """``state_entity`` -> indices of the buttons showing it."""
+    index: Dict[str, List[int]] = {}
+    for i, b in enumerate(buttons):
+        if b.state_entity:
+            index.setdefault(b.state_entity, []).append(i)
+    return index
+
+
+def apply_state(
+    data: List[Dict[str, Any]], index: Dict[str, List[int]], entity_id: str, state: str
+) -> List[int]:
+    """
+    Write ``state`` into the data items of the buttons bound to ``entity_id``.
+
+    Items are changed in place, so the RecycleView does not see a data change and
+    does not lay out the grid again. Returns the indices that actually changed.
+    """
+    changed = []
+    for i in index.get(entity_id, ()):
+        item = data[i]
+        if item["entity_state"] != state:
+            item["entity_state"] = state
+            changed.append(i)
+    return changed
+
+
+class ButtonTile(RecycleDataViewBehavior, ButtonBehavior, Label):
+    index = NumericProperty(-1)
+    icon = StringProperty("")
+    entity_state = StringProperty("")
+    active = BooleanProperty(False)
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("halign", "center")
+        kwargs.setdefault("valign", "middle")
+        super().__init__(**kwargs)
+        self._grid: Optional["ButtonGrid"] = None
+        self._armed = None  # (button, touch, clock event) of a press waiting to act
+        self._theme = Theme.instance()
+        with self.canvas.before:
+            self._bg_color = Color()
+            self._bg = Rectangle(pos=self.pos, size=self.size)
+        self._bg_style = TILE_STYLE
+        self._theme.bind(TILE_STYLE, self._bg_color)
+        self._theme.bind("text", self, "color")
+        self.fbind("pos", self._update_bg)
+        self.fbind("size", self._update_bg)
+        self.fbind("state", self._update_color)
+        self.fbind("active", self._update_color)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self._grid = rv
+        super().refresh_view_attrs(rv, index, data)
+
+    def on_entity_state(self, _instance, value):
+        self.active = value in ACTIVE_STATES
+
+    def on_press(self):
+        button = self._button()
+        if button is None or self._grid.trigger_of(button) != "press":
+            return
+        self._disarm()
+        touch = self.last_touch
+        if self._grid.arm_delay <= 0:
+            self._grid.dispatch("on_action", button, touch)
+            return
+        event = Clock.schedule_once(lambda _dt: self._fire(), self._grid.arm_delay)
+        self._armed = (button, touch, event)
+
+    def on_release(self):
+        if self._armed is not None:
+            # Lifted on the tile before the arming delay ran out: act now
+            self._fire()
+            return
+        button = self._button()
+        if button is not None and self._grid.trigger_of(button) == "release":
+            self._grid.dispatch("on_action", button, self.last_touch)
+
+    def on_touch_move(self, touch):
+        if (
+            touch.grab_current is self
+            and self.state == "down"
+            and not touch.ud.get("slid_off")
+            and not self.collide_point(*touch.pos)
+        ):
+            touch.ud["slid_off"] = True
+            if self._armed is not None and self._armed[1] is touch:
+                # Still arming: nothing was sent, so there is nothing to withdraw
+                self._disarm()
+            else:
+                button = self._button()
+                if button is not None and self._grid.trigger_of(button) == "press":
+                    self._grid.dispatch("on_action_cancel", button)
+        return super().on_touch_move(touch)
+
+    def _button(self) -> Optional[ButtonConfig]:
+        if self._grid is None or self.index < 0:
+            return None
+        return self._grid.buttons[self.index]
+
+    def _fire(self):
+        armed, self._armed = self._armed, None
+        if armed is None:
+            return
+        button, touch, event = armed
+        event.cancel()
+        if not touch.ud.get("slid_off"):
+            self._grid.dispatch("on_action", button, touch)
+
+    def _disarm(self):
+        if self._armed is not None:
+            self._armed[2].cancel()
+            self._armed = None
+
+    def _update_bg(self, *_args):
+        self._bg.pos = self.pos
+        self._bg.size = self.size
+        self.text_size = self.size
+
+    def _update_color(self, *_args):
+        if self.state == "down":
+            style = TILE_PRESSED_STYLE
+        else:
+            style = TILE_ACTIVE_STYLE if self.active else TILE_STYLE
+        if style != self._bg_style:
+            self._theme.unbind(self._bg_style, self._bg_color)
+            self._theme.bind(style, self._bg_color)
+            self._bg_style = style
+
+
+class ButtonGrid(RecycleView):
+    """
+    Grid of action buttons backed by a ``RecycleView``.
+
+    Only the tiles that fit on screen exist as widgets, whatever the number of buttons.
+    ``set_state`` changes the data of the affected buttons in place and refreshes their
+    tiles if they are visible; the rest of the grid is left alone. Pressing a tile
+    dispatches ``on_action(button, touch)`` with its ``ButtonConfig``: on touch-down
+    for buttons whose ``trigger`` is ``"press"``, else when released on the tile.
+
+    A touch-down acts only once the finger has stayed on the tile for ``arm_delay``
+    seconds (or is lifted on it sooner); sliding off before that acts not at all.
+    Sliding off a tile that already acted on touch-down dispatches
+    ``on_action_cancel(button)``, which can only withdraw a call still queued.
+    """
+
+    cols = NumericProperty(2)
+    tile_height = NumericProperty(96)  # dp
+    trigger = OptionProperty("release", options=["press", "release"])
+    arm_delay = NumericProperty(0.1)  # seconds
+
+    __events__ = ("on_action", "on_action_cancel")
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.buttons: List[ButtonConfig] = []
+        self._index: Dict[str, List[int]] = {}
+        layout = RecycleGridLayout(
+            cols=int(self.cols),
+            default_size=(None, dp(self.tile_height)),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=dp(8),
+            padding=dp(8),
+        )
+        layout.bind(minimum_height=layout.setter("height"))
+        self.fbind("cols", lambda _w, value: setattr(layout, "cols", int(value)))
+        self.fbind(
+            "tile_height", lambda _w, value: setattr(layout, "default_size", (None, dp(value)))
+        )
+        self.add_widget(layout)
+        # Set once the layout manager exists; it keeps the view class.
+        self.viewclass = ButtonTile
+
+    def set_buttons(self, buttons: List[ButtonConfig]):
+        self.buttons = list(buttons)
+        self._index = entity_index(self.buttons)
+        self.data = button_data(self.buttons)
+
+    def entities(self) -> List[str]:
+        return list(self._index)
+
+    def set_state(self, entity_id: str, state: Optional[str]):
+        """Show ``state`` on the buttons bound to ``entity_id``. Call on the UI thread."""
+        for i in apply_state(self.data, self._index, entity_id, state or ""):
+            view = self.view_adapter.get_visible_view(i)
+            if view is not None:
+                view.entity_state = self.data[i]["entity_state"]
+
+    def bind_entities(self, registry):
+        """Feed ``set_state`` from a ``BindingRegistry`` (state value of each entity)."""
+        for entity_id in self._index:
+            registry.bind(entity_id, self._on_binding)
+
+    def trigger_of(self, button: ButtonConfig) -> str:
+        return button.trigger if button.trigger in ("press", "release") else self.trigger
+
+    def on_action(self, button: ButtonConfig, touch=None):
+        pass
+
+    def on_action_cancel(self, button: ButtonConfig):
+        pass
+
+    def _on_binding(self, entity_id: str, value: Any, _state: Optional[Dict[str, Any]]):
+        self.set_state(entity_id, None if value is None else str(value))
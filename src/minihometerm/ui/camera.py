@@ -0,0 +1,351 @@
+import io
+import threading
+import urllib.request
+from dataclasses import dataclass
+from typing import IO, Any, Callable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from kivy.clock import Clock
+from kivy.graphics.texture import Texture
+from kivy.logger import Logger as logger
+from kivy.properties import BooleanProperty, NumericProperty, StringProperty
+from kivy.uix.image import Image
+
+from .screens import BaseScreen
+
+BYTES_PER_PIXEL = {"rgb": 3, "rgba": 4, "bgr": 3, "bgra": 4, "luminance": 1}
+
+
+def camera_url(ws_url: str, entity_id: str, stream: bool = False) -> str:
+    """HA ``camera_proxy`` (snapshot) or ``camera_proxy_stream`` (MJPEG) URL of a camera."""
+    parts = urlsplit(ws_url)
+    scheme = {"ws": "http", "wss": "https"}.get(parts.scheme, parts.scheme)
+    endpoint = "camera_proxy_stream" if stream else "camera_proxy"
+    return urlunsplit((scheme, parts.netloc, f"/api/{endpoint}/{entity_id}", "", ""))
+
+
+@dataclass
+class CameraStats:
+    decoded: int = 0
+    shown: int = 0
+    dropped: int = 0  # decoded but replaced before the UI picked it up
+    skipped: int = 0  # not even decoded because the UI was still behind
+
+
+class Frame:
+    """One decoded picture in a buffer that is reused while the size stays the same."""
+
+    __slots__ = ("data", "width", "height", "colorfmt")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.width = 0
+        self.height = 0
+        self.colorfmt = "rgb"
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    def fill(self, width: int, height: int, colorfmt: str, pixels: bytes, rowlength: int = 0):
+        stride = width * BYTES_PER_PIXEL[colorfmt]
+        if len(self.data) != stride * height:
+            self.data = bytearray(stride * height)
+        if not rowlength or rowlength == stride:
+            self.data[:] = pixels
+        else:
+            # Drop the row padding of the decoder so the buffer can be blitted as is.
+            view = memoryview(pixels)
+            for y in range(height):
+                dst = slice(y * stride, (y + 1) * stride)
+                src = slice(y * rowlength, y * rowlength + stride)
+                self.data[dst] = view[src]
+        self.width, self.height, self.colorfmt = width, height, colorfmt
+
+
+class FrameBuffer:
+    """
+    Triple buffer between the decoder thread and the UI.
+
+    The decoder fills its own frame and publishes it with ``write``; the UI takes the
+    latest published frame with ``take`` and owns it until the next ``take``. Nobody
+    waits on anybody and, once the size is known, no frame memory is allocated.
+    """
+
+    def __init__(self):
+        self.stats = CameraStats()
+        self._lock = threading.Lock()
+        self._back = Frame()  # decoder
+        self._ready = Frame()  # published, not yet taken
+        self._front = Frame()  # UI
+        self._pending = False
+
+    @property
+    def pending(self) -> bool:
+        """True while the last published frame has not been taken by the UI."""
+        return self._pending
+
+    def write(self, width: int, height: int, colorfmt: str, pixels: bytes, rowlength: int = 0):
+        self._back.fill(width, height, colorfmt, pixels, rowlength)
+        with self._lock:
+            self._back, self._ready = self._ready, self._back
+            if self._pending:
+                self.stats.dropped += 1
+            self._pending = True
+            self.stats.decoded += 1
+
+    def take(self) -> Optional[Frame]:
+        with self._lock:
+            if not self._pending:
+                return None
+            self._front, self._ready = self._ready, self._front
+            self._pending = False
+            self.stats.shown += 1
+            return self._front
+
+
+def decode_jpeg(data: bytes) -> Any:
+    """Decode a JPEG to an ``ImageData`` with SDL2_image, without touching GL."""
+    from kivy.core.image.img_sdl2 import ImageLoaderSDL2
+
+    loader = ImageLoaderSDL2(
+        "__inline__.jpg",
+        ext="jpg",
+        rawdata=io.BytesIO(data),
+        inline=True,
+        nocache=True,
+        keep_data=True,
+    )
+    return loader._data[0]  # no texture is created until .texture is read
+
+
+def iter_mjpeg(stream: IO[bytes], boundary: str) -> Iterator[bytes]:
+    """Yield the JPEG parts of a ``multipart/x-mixed-replace`` body."""
+    marker = b"--" + boundary.encode().lstrip(b"-")
+    line = stream.readline()
+    while line:
+        if not line.strip().startswith(marker):
+            line = stream.readline()
+            continue
+        length = None
+        while True:
+            header = stream.readline()
+            if not header:
+                return
+            if not header.strip():
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        if length is not None:
+            yield stream.read(length)
+            line = stream.readline()
+            continue
+        # No length given: the part runs up to the next boundary line.
+        chunks = []
+        line = stream.readline()
+        while line and not line.strip().startswith(marker):
+            chunks.append(line)
+            line = stream.readline()
+        yield b"".join(chunks).rstrip(b"\r\n")
+
+
+class CameraFeed:
+    """
+    Fetch and decode camera frames on a worker thread into a ``FrameBuffer``.
+
+    Polls a snapshot URL every ``interval`` seconds, or follows an MJPEG stream. A
+    frame is only fetched/decoded while the UI has taken the previous one; parts of
+    an MJPEG stream arriving meanwhile are skipped. While paused the feed makes no
+    requests at all (a stream is disconnected).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        frames: FrameBuffer,
+        token: Optional[str] = None,
+        mjpeg: bool = False,
+        interval: float = 1.0,
+        timeout: float = 10.0,
+        decode: Callable[[bytes], Any] = decode_jpeg,
+    ):
+        self.url = url
+        self.frames = frames
+        self.token = token
+        self.mjpeg = mjpeg
+        self.interval = interval
+        self.timeout = timeout
+        self.decode = decode
+        self._stopped = threading.Event()
+        self._resumed = threading.Event()
+        self._resumed.set()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- Public API ----------
+
+    @property
+    def paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="camera-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Ask the worker to exit; does not wait for a request in flight."""
+        self._stopped.set()
+        self._resumed.set()
+
+    def pause(self):
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    # ---------- Internals ----------
+
+    def _active(self) -> bool:
+        return self._resumed.is_set() and not self._stopped.is_set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._resumed.wait()
+            if self._stopped.is_set():
+                return
+            try:
+                if self.mjpeg:
+                    self._follow_stream()
+                else:
+                    self._poll_snapshot()
+            except Exception as e:
+                logger.warning("Camera: Fetching %s failed: %s", self.url, e)
+            # Next snapshot, or reconnect once the stream ended or failed
+            self._stopped.wait(self.interval)
+
+    def _open(self):
+        req = urllib.request.Request(self.url)
+        if self.token:
+            req.add_header("Authorization", f"Bearer {self.token}")
+        return urllib.request.urlopen(req, timeout=self.timeout)  # nosec - configured HA URL
+
+    def _poll_snapshot(self):
+        if self.frames.pending:
+            self.frames.stats.skipped += 1
+            return
+        with self._open() as resp:
+            data = resp.read()
+        self._show(data)
+
+    def _follow_stream(self):
+        with self._open() as resp:
+            boundary = resp.headers.get_param("boundary") or "frame"
+            for part in iter_mjpeg(resp, boundary):
+                if not self._active():
+                    return
+                if self.frames.pending:
+                    self.frames.stats.skipped += 1
+                    continue
+                self._show(part)
+
+    def _show(self, data: bytes):
+        image = self.decode(data)
+        self.frames.write(
+            image.width, image.height, image.fmt, image.data, getattr(image, "rowlength", 0)
+        )
+
+
+class CameraView(Image):
+    """
+    Image widget showing a camera entity.
+
+    Decoding happens on the feed's thread; the UI only uploads the newest frame into
+    a single reused texture with ``blit_buffer``. Set ``active`` to False while the
+    display is off (or the widget is hidden) to stop fetching altogether.
+    """
+
+    url = StringProperty("")
+    token = StringProperty("")
+    mjpeg = BooleanProperty(False)
+    interval = NumericProperty(1.0)  # snapshot polling period, seconds
+    fps = NumericProperty(15.0)  # how often the UI looks for a new frame
+    active = BooleanProperty(True)
+
+    def __init__(self, **kwargs):
+        self.frames = FrameBuffer()
+        self._feed: Optional[CameraFeed] = None
+        self._tick = None
+        super().__init__(**kwargs)
+        self.fbind("url", self._restart)
+        self.fbind("token", self._restart)
+        self.fbind("mjpeg", self._restart)
+        self.fbind("active", self._on_active)
+        self._restart()
+
+    def stop(self):
+        if self._feed:
+            self._feed.stop()
+            self._feed = None
+        if self._tick:
+            self._tick.cancel()
+            self._tick = None
+
+    def _restart(self, *_):
+        self.stop()
+        if not self.url:
+            return
+        self._feed = CameraFeed(
+            self.url, self.frames, self.token or None, self.mjpeg, self.interval
+        )
+        self._on_active()
+        self._feed.start()
+
+    def _on_active(self, *_):
+        if not self._feed:
+            return
+        if self.active:
+            self._feed.resume()
+            if not self._tick:
+                self._tick = Clock.schedule_interval(self._upload, 1.0 / self.fps)
+        else:
+            self._feed.pause()
+            if self._tick:
+                self._tick.cancel()
+                self._tick = None
+
+    def _upload(self, _dt):
+        frame = self.frames.take()
+        if frame is None:
+            return
+        texture = self.texture
+        if texture is None or texture.size != frame.size or texture.colorfmt != frame.colorfmt:
+            texture = Texture.create(size=frame.size, colorfmt=frame.colorfmt)
+            texture.flip_vertical()
+            self.texture = texture
+        texture.blit_buffer(frame.data, colorfmt=frame.colorfmt, bufferfmt="ubyte")
+        self.canvas.ask_update()
+
+
+class CameraScreen(BaseScreen):
+    """
+    Full-screen ``CameraView`` of the camera configured in ``[camera]``.
+
+    The view only fetches while the screen is shown: it is activated on
+    ``on_pre_enter`` and paused again on ``on_leave``.
+    """
+
+    screen_name = "camera"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.view = CameraView(active=False, fit_mode="contain")
+        self.add_widget(self.view)
+
+    def on_pre_enter(self, *_args):
+        self.view.active = True
+
+    def on_leave(self, *_args):
+        self.view.active = False
@@ -0,0 +1,106 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from kivy.clock import Clock
+from kivy.properties import NumericProperty, StringProperty
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+
+# HA weather conditions -> short display text
+CONDITION_LABELS = {
+    "clear-night": "Clear",
+    "cloudy": "Cloudy",
+    "exceptional": "Exceptional",
+    "fog": "Fog",
+    "hail": "Hail",
+    "lightning": "Storm",
+    "lightning-rainy": "Storm",
+    "partlycloudy": "Partly cloudy",
+    "pouring": "Heavy rain",
+    "rainy": "Rain",
+    "snowy": "Snow",
+    "snowy-rainy": "Sleet",
+    "sunny": "Sunny",
+    "windy": "Windy",
+    "windy-variant": "Windy",
+}
+
+
+def _format_temp(value: Any) -> str:
+    if value is None:
+        return "–"
+    try:
+        return f"{round(float(value))}°"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def forecast_rows(
+    forecast: List[Dict[str, Any]], limit: int = 5, forecast_type: str = "daily"
+) -> List[Dict[str, str]]:
+    """Turn HA forecast entries into the texts shown for each column of the panel."""
+    rows = []
+    for entry in forecast[:limit]:
+        when = ""
+        stamp = entry.get("datetime")
+        if stamp:
+            try:
+                dt = datetime.fromisoformat(stamp).astimezone()
+                when = dt.strftime("%H:%M" if forecast_type == "hourly" else "%a")
+            except ValueError:
+                when = str(stamp)
+        condition = entry.get("condition") or ""
+        rows.append(
+            {
+                "when": when,
+                "condition": CONDITION_LABELS.get(condition, condition.replace("-", " ").title()),
+                "high": _format_temp(entry.get("temperature")),
+                "low": _format_temp(entry.get("templow")) if "templow" in entry else "",
+            }
+        )
+    return rows
+
+
+class ForecastDay(BoxLayout):
+    when = StringProperty("")
+    condition = StringProperty("")
+    high = StringProperty("")
+    low = StringProperty("")
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("orientation", "vertical")
+        super().__init__(**kwargs)
+        for name in ("when", "condition", "high", "low"):
+            label = Label(text=getattr(self, name))
+            self.fbind(name, lambda _w, value, lbl=label: setattr(lbl, "text", value))
+            self.add_widget(label)
+
+
+class ForecastPanel(BoxLayout):
+    """
+    Row of forecast columns. ``push`` has the ``ForecastFeed.on_change`` signature
+    and may be called from any thread; columns are reused between updates.
+    """
+
+    days = NumericProperty(5)
+    forecast_type = StringProperty("daily")
+
+    def push(self, entity_id: str, forecast_type: str, forecast: List[Dict[str, Any]]):
+        def apply(_dt):
+            self.forecast_type = forecast_type
+            self.set_forecast(forecast)
+
+        Clock.schedule_once(apply, 0)
+
+    def set_forecast(self, forecast: Optional[List[Dict[str, Any]]]):
+        rows = forecast_rows(forecast or [], int(self.days), self.forecast_type)
+        columns = list(reversed(self.children))
+        while len(columns) < len(rows):
+            column = ForecastDay()
+            self.add_widget(column)
+            columns.append(column)
+        while len(columns) > len(rows):
+            self.remove_widget(columns.pop())
+        for column, row in zip(columns, rows):
+            for name, text in row.items():
+                setattr(column, name, text)
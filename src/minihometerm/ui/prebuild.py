@@ -0,0 +1,149 @@
+import inspect
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from kivy.clock import Clock
+from kivy.logger import Logger as logger
+
+# A task is a factory (one step) or a generator function: each ``next()`` is one step
+# and its ``return`` value is the result.
+Task = Callable[[], Any]
+
+
+@dataclass
+class PrebuildStats:
+    steps: int = 0
+    built: int = 0
+    forced: int = 0  # finished by ensure() because they were needed before idle time came
+    failed: int = 0
+    paused: int = 0  # frames skipped because of recent input
+
+
+class _Pending:
+    __slots__ = ("task", "on_done", "gen")
+
+    def __init__(self, task: Task, on_done: Optional[Callable[[Any], None]]):
+        self.task = task
+        self.on_done = on_done
+        self.gen: Optional[Iterator] = None
+
+
+class IdleBuilder:
+    """
+    Run construction work (screens, heavy widget trees) in idle frames, a slice at a time.
+
+    Tasks run in the order added. Every frame, while no input arrived during the last
+    ``quiet`` seconds, steps are taken until ``budget`` seconds of the frame are
+    used (at least one step, so split big tasks into generator steps). Input resets
+    the quiet period, so building stops from the very next frame; bind
+    ``notify_input`` to the window's touch and key events (``bind_window``).
+
+    ``ensure(name)`` finishes a task right away when its result is needed before it
+    was built in the background, e.g. navigating to a screen early.
+    """
+
+    def __init__(self, budget: float = 0.004, quiet: float = 0.3):
+        self.budget = budget
+        self.quiet = quiet
+        self.stats = PrebuildStats()
+        self._tasks: "OrderedDict[str, _Pending]" = OrderedDict()
+        self._results: Dict[str, Any] = {}
+        self._last_input = float("-inf")
+        self._event = None
+
+    # ---------- Public API ----------
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def add(self, name: str, task: Task, on_done: Optional[Callable[[Any], None]] = None):
+        if name in self._tasks or name in self._results:
+            return
+        self._tasks[name] = _Pending(task, on_done)
+        if self._event is not None:
+            self._event()
+
+    def result(self, name: str) -> Any:
+        return self._results.get(name)
+
+    def ensure(self, name: str) -> Any:
+        """The result of ``name``, building (the rest of) it now if needed."""
+        pending = self._tasks.get(name)
+        if pending is not None:
+            self.stats.forced += 1
+            while name in self._tasks:
+                self._advance(name, pending)
+        return self._results.get(name)
+
+    def notify_input(self, *_args) -> bool:
+        self._last_input = time.monotonic()
+        return False  # let the event through
+
+    def bind_window(self, window):
+        window.bind(
+            on_touch_down=self.notify_input,
+            on_touch_move=self.notify_input,
+            on_key_down=self.notify_input,
+        )
+
+    def start(self):
+        """Work through the tasks on the ``Clock``, one slice per frame."""
+        if self._event is None:
+            self._event = Clock.create_trigger(self._tick, 0, interval=True)
+        if self._tasks:
+            self._event()
+
+    def stop(self):
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    def step(self, now: Optional[float] = None) -> int:
+        """Run one frame's slice. Returns the number of steps taken."""
+        now = time.monotonic() if now is None else now
+        if now - self._last_input < self.quiet:
+            self.stats.paused += 1
+            return 0
+        deadline = time.perf_counter() + self.budget
+        steps = 0
+        while self._tasks:
+            name, pending = next(iter(self._tasks.items()))
+            self._advance(name, pending)
+            steps += 1
+            if time.perf_counter() >= deadline:
+                break
+        return steps
+
+    # ---------- Internals ----------
+
+    def _tick(self, _dt):
+        self.step()
+        if not self._tasks and self._event is not None:
+            self._event.cancel()
+
+    def _advance(self, name: str, pending: _Pending):
+        self.stats.steps += 1
+        try:
+            if pending.gen is None:
+                out = pending.task()
+                if not inspect.isgenerator(out):
+                    self._finish(name, pending, out)
+                    return
+                pending.gen = out
+            next(pending.gen)
+        except StopIteration as done:
+            self._finish(name, pending, done.value)
+        except Exception:
+            logger.exception("Prebuild: Building %s failed", name)
+            self.stats.failed += 1
+            del self._tasks[name]
+
+    def _finish(self, name: str, pending: _Pending, result: Any):
+        del self._tasks[name]
+        self._results[name] = result
+        self.stats.built += 1
+        if pending.on_done:
+            pending.on_done(result)
@@ -1,5 +1,9 @@
+from typing import Optional
+
 from kivy.uix.screenmanager import Screen
 
 
 class BaseScreen(Screen):
-    pass
+    # Screens found by ``discover_screens`` that set a name are added to the app
+    # under that name.
+    screen_name: Optional[str] = None
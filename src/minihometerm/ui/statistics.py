@@ -0,0 +1,204 @@
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from kivy.clock import Clock
+from kivy.graphics import Color, InstructionGroup, Line, Rectangle
+from kivy.metrics import dp
+from kivy.properties import NumericProperty, OptionProperty
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.widget import Widget
+
+from ..core.statistics import (
+    AGGREGATES,
+    PERIODS,
+    Buckets,
+    StatisticsStore,
+    local_offset,
+)
+from .screens import BaseScreen
+from .theme import Theme
+
+Rect = Tuple[float, float, float, float]
+# Chart resolutions; weeks are left out as epoch weeks start on a Thursday
+BUCKETS = ("5minute", "hour", "day")
+
+
+def value_range(*columns: Iterable[float]) -> Tuple[float, float]:
+    """Smallest and largest finite value, widened to include 0."""
+    lo, hi = 0.0, 0.0
+    for column in columns:
+        for value in column:
+            if math.isfinite(value):
+                lo, hi = min(lo, value), max(hi, value)
+    return (lo, hi) if hi > lo else (lo, lo + 1.0)
+
+
+def bar_rects(
+    tops: Sequence[float],
+    bottoms: Optional[Sequence[float]],
+    box: Rect,
+    lo: float,
+    hi: float,
+    gap: float = 0.2,
+) -> List[Optional[Rect]]:
+    """
+    One bar per bucket, from ``bottoms`` (or 0) to ``tops``, inside ``box``
+    (x, y, width, height) scaled to ``[lo, hi]``. None where a value is missing.
+    """
+    x, y, width, height = box
+    if not tops:
+        return []
+    slot = width / len(tops)
+    scale = height / (hi - lo)
+    rects: List[Optional[Rect]] = []
+    for i, top in enumerate(tops):
+        bottom = bottoms[i] if bottoms is not None else 0.0
+        if not (math.isfinite(top) and math.isfinite(bottom)):
+            rects.append(None)
+            continue
+        y0 = y + (min(top, bottom) - lo) * scale
+        y1 = y + (max(top, bottom) - lo) * scale
+        rects.append((x + (i + gap / 2) * slot, y0, slot * (1 - gap), max(y1 - y0, 1.0)))
+    return rects
+
+
+def line_points(values: Sequence[float], box: Rect, lo: float, hi: float) -> List[float]:
+    """Flat ``[x0, y0, x1, y1, ...]`` through the middle of each bucket's slot."""
+    x, y, width, height = box
+    if not values:
+        return []
+    slot = width / len(values)
+    scale = height / (hi - lo)
+    points: List[float] = []
+    for i, value in enumerate(values):
+        if math.isfinite(value):
+            points += (x + (i + 0.5) * slot, y + (value - lo) * scale)
+    return points
+
+
+def chart_geometry(buckets: Buckets, column: str, box: Rect, gap: float = 0.2) -> Dict:
+    """
+    What a ``StatisticsChart`` draws for ``column`` of ``buckets``: ``change`` and
+    ``sum`` (energy) as bars from 0; ``mean``/``min``/``max`` as a line over the
+    buckets' min–max range bars (temperature).
+    """
+    if column in ("change", "sum"):
+        lo, hi = value_range(buckets[column])
+        return {"bars": bar_rects(buckets[column], None, box, lo, hi, gap), "points": []}
+    lo, hi = value_range(buckets["min"], buckets["max"], buckets[column])
+    return {
+        "bars": bar_rects(buckets["max"], buckets["min"], box, lo, hi, gap),
+        "points": line_points(buckets[column], box, lo, hi),
+    }
+
+
+class StatisticsChart(Widget):
+    """
+    Bars and/or a line drawn from precomputed ``Buckets`` (``set_buckets``).
+
+    The canvas instructions are created once and reused: a redraw only moves the
+    rectangles and replaces the line's points, whatever the number of buckets was.
+    """
+
+    column = OptionProperty("mean", options=AGGREGATES)
+    gap = NumericProperty(0.2)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.buckets: Optional[Buckets] = None
+        self._rects: List[Rectangle] = []
+        self._redraw_trigger = Clock.create_trigger(self._redraw)
+        theme = Theme.instance()
+        self._bar_color = Color()
+        self._bars = InstructionGroup()
+        self._line_color = Color()
+        self._line = Line(points=[], width=dp(1.5))
+        for instruction in (self._bar_color, self._bars, self._line_color, self._line):
+            self.canvas.add(instruction)
+        theme.bind("surface_active", self._bar_color)
+        theme.bind("text", self._line_color)
+        self.fbind("pos", self._redraw_trigger)
+        self.fbind("size", self._redraw_trigger)
+        self.fbind("column", self._redraw_trigger)
+
+    def set_buckets(self, buckets: Buckets):
+        self.buckets = buckets
+        self._redraw_trigger()
+
+    def _redraw(self, *_args):
+        if self.buckets is None:
+            return
+        box = (self.x, self.y, self.width, self.height)
+        geometry = chart_geometry(self.buckets, self.column, box, self.gap)
+        bars = geometry["bars"]
+        while len(self._rects) < len(bars):
+            rect = Rectangle()
+            self._bars.add(rect)
+            self._rects.append(rect)
+        for rect, bar in zip(self._rects, bars + [None] * (len(self._rects) - len(bars))):
+            if bar is None:
+                rect.size = (0, 0)
+            else:
+                rect.pos, rect.size = bar[:2], bar[2:]
+        self._line.points = geometry["points"]
+
+
+class StatisticsScreen(BaseScreen):
+    """
+    Charts of long-term statistics from a ``StatisticsStore``.
+
+    ``set_store`` lays out one chart per ``(statistic_id, column)``; ``push`` (the
+    ``StatisticsFeed.on_change`` signature, any thread) re-aggregates the charts of
+    the statistics that got new rows into ``bucket``s over the last ``days``.
+    """
+
+    screen_name = "statistics"
+
+    bucket = OptionProperty("day", options=BUCKETS)
+    days = NumericProperty(7)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.store: Optional[StatisticsStore] = None
+        self.period = "hour"
+        self.charts: List[Tuple[str, StatisticsChart]] = []
+        self._box = BoxLayout(orientation="vertical", padding=dp(8), spacing=dp(8))
+        self.add_widget(self._box)
+
+    def set_store(
+        self,
+        store: StatisticsStore,
+        charts: Iterable[Tuple[str, str]],
+        period: str = "hour",
+    ):
+        self.store = store
+        self.period = period
+        self.charts = []
+        self._box.clear_widgets()
+        for statistic_id, column in charts:
+            self._box.add_widget(
+                Label(text=f"{statistic_id} · {column}", size_hint_y=None, height=dp(24))
+            )
+            chart = StatisticsChart(column=column)
+            self._box.add_widget(chart)
+            self.charts.append((statistic_id, chart))
+        self.update()
+
+    def push(self, statistic_ids: List[str]):
+        Clock.schedule_once(lambda _dt: self.update(statistic_ids), 0)
+
+    def update(self, statistic_ids: Optional[Iterable[str]] = None, now: Optional[float] = None):
+        if self.store is None:
+            return
+        now = time.time() if now is None else now
+        wanted = None if statistic_ids is None else set(statistic_ids)
+        size, offset = PERIODS[self.bucket], local_offset(now)
+        # From the start of the bucket ``days`` ago, so the first one is complete
+        since = math.floor((now - float(self.days) * 86400 + offset) / size) * size - offset
+        for statistic_id, chart in self.charts:
+            if wanted is None or statistic_id in wanted:
+                chart.set_buckets(
+                    self.store.aggregate(statistic_id, self.period, size, since, offset=offset)
+                )
@@ -0,0 +1,157 @@
+import threading
+import weakref
+from datetime import datetime
+from datetime import time as dtime
+from typing import Any, Dict, List, Optional, Tuple
+
+from kivy.config import ConfigParser
+from kivy.logger import Logger as logger
+from kivy.utils import get_color_from_hex
+from kivy.weakproxy import WeakProxy
+
+# Style keys of every theme: "#rrggbb[aa]" strings are colours, anything else (e.g.
+# "15sp") is passed as is to the property it is bound to.
+THEMES: Dict[str, Dict[str, Any]] = {
+    "dark": {
+        "background": "#121214",
+        "surface": "#2e2e33",
+        "surface_active": "#f29e24",
+        "surface_pressed": "#595966",
+        "text": "#f2f2f2",
+        "text_muted": "#9a9aa0",
+        "font_body": "15sp",
+        "font_title": "24sp",
+    },
+    "light": {
+        "background": "#f4f4f6",
+        "surface": "#dcdce2",
+        "surface_active": "#f29e24",
+        "surface_pressed": "#b4b4bf",
+        "text": "#1c1c1f",
+        "text_muted": "#5f5f66",
+        "font_body": "15sp",
+        "font_title": "24sp",
+    },
+}
+
+StyleTable = Dict[str, Any]
+
+
+def compile_theme(definition: Dict[str, Any]) -> StyleTable:
+    """Flat table of ready-to-assign values: colours become RGBA tuples."""
+    table: StyleTable = {}
+    for key, value in definition.items():
+        if isinstance(value, str) and value.startswith("#"):
+            value = tuple(get_color_from_hex(value))
+        table[key] = value
+    return table
+
+
+def parse_clock(text: str) -> dtime:
+    hours, _, minutes = text.strip().partition(":")
+    return dtime(int(hours), int(minutes or 0))
+
+
+def theme_for_time(now: dtime, dark_from: dtime, dark_until: dtime) -> str:
+    """``"dark"`` between ``dark_from`` and ``dark_until`` (may span midnight)."""
+    if dark_from <= dark_until:
+        night = dark_from <= now < dark_until
+    else:
+        night = now >= dark_from or now < dark_until
+    return "dark" if night else "light"
+
+
+def configured_theme(cfg: ConfigParser, now: Optional[datetime] = None) -> str:
+    """The theme ``[ui] theme`` asks for at ``now``; ``auto`` follows the clock."""
+    name = cfg.get("ui", "theme", fallback="dark").strip().lower()
+    if name != "auto":
+        return name
+    now = datetime.now() if now is None else now
+    return theme_for_time(
+        now.time(),
+        parse_clock(cfg.get("ui", "dark_from", fallback="20:00")),
+        parse_clock(cfg.get("ui", "dark_until", fallback="07:00")),
+    )
+
+
+class Theme:
+    """
+    Current theme as a flat style table, and the targets bound to its keys.
+
+    Every theme is compiled once, the first time it is used. ``bind(key, target,
+    attr)`` sets ``target.attr`` to the key's value now and on every switch; targets
+    are canvas instructions (``Color``, attr ``rgba``) or widgets (e.g. ``color``,
+    ``font_size``) and are held weakly. ``switch`` only assigns keys whose value
+    differs between the two themes, so a switch costs one attribute write per bound
+    target of a changed key: no widget is rebuilt and no KV rule runs again.
+    """
+
+    _instance: Optional["Theme"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, name: str = "dark", themes: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.themes = dict(THEMES if themes is None else themes)
+        self._tables: Dict[str, StyleTable] = {}
+        self._bindings: Dict[str, List[Tuple[weakref.ref, str]]] = {}
+        self.name = name if name in self.themes else next(iter(self.themes))
+        if self.name != name:
+            logger.warning("Theme: Unknown theme %r, using %r", name, self.name)
+        self.table = self._compiled(self.name)
+
+    @classmethod
+    def instance(cls) -> "Theme":
+        """The theme shared by the app's widgets."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __getitem__(self, key: str) -> Any:
+        return self.table[key]
+
+    def bind(self, key: str, target: Any, attr: str = "rgba"):
+        setattr(target, attr, self.table[key])
+        refs = self._bindings.setdefault(key, [])
+        refs.append((_weakref(target), attr))
+
+    def unbind(self, key: str, target: Any, attr: str = "rgba"):
+        refs = self._bindings.get(key)
+        if refs:
+            target = _weakref(target)()
+            refs[:] = [(ref, a) for ref, a in refs if not (ref() is target and a == attr)]
+
+    def switch(self, name: str) -> int:
+        """Apply theme ``name``. Returns the number of attributes assigned."""
+        if name == self.name:
+            return 0
+        if name not in self.themes:
+            raise KeyError(f"Unknown theme: {name!r}")
+        new = self._compiled(name)
+        old, self.table, self.name = self.table, new, name
+        assigned = 0
+        for key, refs in self._bindings.items():
+            value = new.get(key)
+            if value == old.get(key):
+                continue
+            alive = []
+            for ref, attr in refs:
+                target = ref()
+                if target is not None:
+                    setattr(target, attr, value)
+                    alive.append((ref, attr))
+            refs[:] = alive
+            assigned += len(alive)
+        return assigned
+
+    def _compiled(self, name: str) -> StyleTable:
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables[name] = compile_theme(self.themes[name])
+        return table
+
+
+def _weakref(target: Any) -> weakref.ref:
+    # Widgets from KV ``ids`` are kivy WeakProxy objects, which hold their own weakref
+    if isinstance(target, WeakProxy):
+        return target.__ref__
+    return weakref.ref(target)
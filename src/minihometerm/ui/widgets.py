@@ -1,5 +1,49 @@
+from typing import Any
+
+from kivy.clock import Clock
+from kivy.properties import StringProperty
 from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
 
 
 class Card(BoxLayout):
     pass
+
+
+class TemplateLabel(Label):
+    """
+    Label showing a template that HA renders, e.g. ``"{{ states.light | selectattr(
+    'state', 'eq', 'on') | list | count }} lights on"``.
+
+    ``attach(client)`` subscribes through ``HAWebSocketClient.subscribe_template``;
+    HA pushes a result only when it changes, and ``fmt`` is applied to it on the UI
+    thread. Changing ``template`` while attached re-subscribes.
+    """
+
+    template = StringProperty("")
+    fmt = StringProperty("{}")
+
+    def __init__(self, **kwargs):
+        # Set before Label.__init__, which fires on_template for a template kwarg
+        self._client = None
+        self._subscription = None
+        super().__init__(**kwargs)
+
+    def attach(self, client):
+        self.detach()
+        self._client = client
+        if self.template:
+            self._subscription = client.subscribe_template(self.template, self.push)
+
+    def detach(self):
+        if self._subscription:
+            self._subscription.unsubscribe()
+            self._subscription = None
+        self._client = None
+
+    def push(self, result: Any):
+        Clock.schedule_once(lambda _dt: setattr(self, "text", self.fmt.format(result)), 0)
+
+    def on_template(self, _instance, _value):
+        if self._client is not None:
+            self.attach(self._client)
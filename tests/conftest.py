@@ -1,11 +1,17 @@
 import os
 
+import kivy
 import pytest
 from doubles import DummyWS
 from kivy.logger import Logger as logger
 
 from minihometerm.hass_client import HAWebSocketClient
 
+# Widgets showing text need a real window provider, which "mock" is not: they get
+# an offscreen SDL2 one, as in tools/bench_ui.py. Set before kivy.core.window loads.
+os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")
+kivy.kivy_options["window"] = ("sdl2",)
+
 
 @pytest.fixture(autouse=True, scope="session")
 def headless_kivy():
@@ -16,6 +22,16 @@ def headless_kivy():
     yield
 
 
+@pytest.fixture(scope="session")
+def window():
+    """The offscreen window, for tests that build widgets; skipped without SDL2."""
+    from kivy.core.window import Window
+
+    if Window is None:
+        pytest.skip("No offscreen window provider")
+    return Window
+
+
 @pytest.fixture
 def mock_cfg(monkeypatch, tmp_path):
     from minihometerm import config
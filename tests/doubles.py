@@ -8,8 +8,11 @@ class DummyWS:
     Minimal WebSocketApp-compatible double with deterministic lifecycle.
     """
 
-    def __init__(self, url, on_open=None, on_message=None, on_error=None, on_close=None):
+    def __init__(
+        self, url, header=None, on_open=None, on_message=None, on_error=None, on_close=None
+    ):
         self.url = url
+        self.header = header
         self.on_open = on_open
         self.on_message = on_message
         self.on_error = on_error
@@ -46,7 +49,7 @@ class DummyWS:
         if self.on_close:
             self.on_close(self, 1000, "dummy close")
 
-    def close(self):
+    def close(self, **kwargs):
         # Unblock run_forever and let it return
         self._closed.set()
 
@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import Future
+
+from minihometerm.actions import ActionPipeline, action_command
+from minihometerm.config import ButtonConfig
+
+GATE = ButtonConfig(key="1", action="script.toggle_gate", state_entity="input_boolean.gate_open")
+PORCH = ButtonConfig(key="porch", action="light.toggle", state_entity="light.porch")
+SCENE = ButtonConfig(key="movie", action="scene.turn_on")
+
+
+class FakeClient:
+    def __init__(self, queued=False):
+        self.queued = queued  # offline: commands wait and can be withdrawn
+        self.sent = []
+
+    def send_command(self, msg, ttl=None, dedupe=True):
+        future = Future()
+        self.sent.append((msg, future))
+        return future
+
+    def cancel_command(self, future):
+        return self.queued and future.cancel()
+
+
+def changed(pipeline, entity_id, old, new):
+    pipeline.observe(entity_id, {"state": new}, {"state": old})
+
+
+def test_action_command_is_serialized_once_and_targets_its_own_domain():
+    porch = action_command(PORCH)
+    assert porch == {
+        "type": "call_service",
+        "domain": "light",
+        "service": "toggle",
+        "target": {"entity_id": "light.porch"},
+    }
+    assert porch.encoded.startswith('"type":"call_service"')
+    # A script's state_entity is another domain: the script is called as is
+    assert "target" not in action_command(GATE)
+    assert action_command(ButtonConfig(key="x", action="nonsense")) is None
+    assert action_command(ButtonConfig(key="x")) is None
+
+
+def test_press_times_every_stage_from_the_touch():
+    client = FakeClient()
+    pipeline = ActionPipeline(client, [GATE, SCENE])
+
+    future = pipeline.press(GATE, touch_time=time.time() - 0.02)
+    assert client.sent[0][0] is pipeline._commands["1"]
+    future.set_result({})
+    changed(pipeline, "input_boolean.gate_open", "off", "on")
+
+    summary = pipeline.summary()
+    assert all(summary[stage]["count"] == 1 for stage in ("input", "send", "result", "confirm"))
+    assert summary["input"]["max"] >= 0.02
+    assert summary["confirm"]["max"] >= summary["input"]["max"]
+    assert not pipeline._inflight
+
+    # No state_entity: done with its result
+    pipeline.press(SCENE).set_result({})
+    assert not pipeline._inflight
+    assert pipeline.summary()["confirm"]["count"] == 1
+
+
+def test_unrelated_or_unchanged_states_do_not_confirm():
+    pipeline = ActionPipeline(FakeClient(), [GATE], confirm_timeout=0.05)
+    pipeline.press(GATE).set_result({})
+
+    changed(pipeline, "input_boolean.other", "off", "on")
+    changed(pipeline, "input_boolean.gate_open", "on", "on")
+    assert "1" in pipeline._inflight
+
+    time.sleep(0.06)
+    changed(pipeline, "input_boolean.other", "on", "off")
+    assert not pipeline._inflight
+    assert pipeline.stats.unconfirmed == 1
+    assert pipeline.summary()["confirm"]["count"] == 0
+
+
+def test_presses_are_debounced_per_button():
+    client = FakeClient()
+    pipeline = ActionPipeline(client, [GATE, PORCH], debounce=10)
+
+    assert pipeline.press(GATE) is not None
+    assert pipeline.press(GATE) is None
+    assert pipeline.press(PORCH) is not None
+    assert len(client.sent) == 2
+    assert pipeline.stats.debounced == 1
+
+
+def test_cancel_only_withdraws_calls_not_sent_yet():
+    online = ActionPipeline(FakeClient(), [GATE])
+    online.press(GATE)
+    assert not online.cancel(GATE)
+
+    offline = ActionPipeline(FakeClient(queued=True), [GATE])
+    future = offline.press(GATE)
+    assert offline.cancel(GATE)
+    assert future.cancelled()
+    assert offline.stats.cancelled == 1
+    assert offline.summary()["result"]["count"] == 0
+
+
+def test_failed_calls_are_counted_and_not_timed():
+    pipeline = ActionPipeline(FakeClient(), [GATE])
+    pipeline.press(GATE).set_exception(RuntimeError("Service call failed"))
+
+    assert pipeline.stats.failed == 1
+    assert pipeline.summary()["result"]["count"] == 0
+    assert not pipeline._inflight
+
+
+def test_from_config(mock_cfg):
+    mock_cfg.set("buttons", "button_action_timeout", "250")
+    pipeline = ActionPipeline.from_config(mock_cfg, FakeClient())
+
+    assert pipeline.debounce == 0.25
+    assert pipeline.confirm_timeout == 10.0
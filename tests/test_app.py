@@ -1,10 +1,89 @@
 import os
+import sys
+import time
 from contextlib import suppress
 
+import pytest
+
 # Must be set before importing kivy
 os.environ["KIVY_WINDOW"] = "mock"
 os.environ["KIVY_GL_BACKEND"] = "mock"
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools"))
+
+from fake_ha import FakeHomeAssistant, make_state  # noqa: E402
+
+STATES = [make_state("light.kitchen", "on"), make_state("sensor.power", "12")]
+FORECAST = [{"datetime": "2024-01-01T12:00:00+00:00", "condition": "sunny", "temperature": 21}]
+
+
+class HomeAssistant(FakeHomeAssistant):
+    """Fake HA with a few entities that answers forecast subscriptions with an event."""
+
+    def __init__(self):
+        super().__init__(compress=False, handlers={"get_states": lambda msg: STATES})
+
+    def _dispatch(self, conn, msg):
+        super()._dispatch(conn, msg)
+        if msg["type"] == "weather/subscribe_forecast":
+            event = {"type": msg["forecast_type"], "forecast": FORECAST}
+            conn.send_json({"id": msg["id"], "type": "event", "event": event})
+
+
+def spin_until(predicate, timeout=5.0):
+    """Run the Kivy clock until ``predicate()`` holds."""
+    from kivy.clock import Clock
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        Clock.tick()
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def server():
+    ha = HomeAssistant().start()
+    yield ha
+    ha.close()
+
+
+@pytest.fixture
+def start_app(window, mock_cfg, server, monkeypatch, tmp_path):
+    """``start_app(section={key: value})`` builds and starts an app talking to ``server``."""
+    from kivy.lang import Builder
+
+    from minihometerm import app as app_module
+    from minihometerm import hass_client
+
+    monkeypatch.setattr(app_module, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(hass_client, "CACHE_DIR", tmp_path)
+    mock_cfg.set("connection", "ws_url", server.url)
+    rules = list(Builder.rules)
+    apps = []
+
+    def start(**sections):
+        for section, options in sections.items():
+            if not mock_cfg.has_section(section):
+                mock_cfg.add_section(section)
+            for key, value in options.items():
+                mock_cfg.set(section, key, value)
+        app = app_module.MiniHomeTerm(cfg=mock_cfg, connect=True)
+        app.root = app.build()
+        app.on_start()
+        apps.append(app)
+        return app
+
+    yield start
+    for app in apps:
+        # Dispatched, so KV's ``app`` proxy lets go of it too
+        app.dispatch("on_stop")
+    # The app's KV rules are added again by every build
+    Builder.rules[:] = rules
+    Builder._clear_matchcache()
+
 
 def test_app_title(mock_cfg):
     from minihometerm.app import MiniHomeTerm
@@ -37,3 +116,104 @@ def test_on_click_me_prints(caplog, mock_cfg):
     assert any("Button clicked!" in message for message in caplog.messages)
 
     assert any("Button clicked!" in message for message in caplog.messages)
+
+
+def test_stale_connection_is_shown_until_connected(start_app, server):
+    app = start_app()
+    assert app.status_label.text
+
+    assert spin_until(lambda: not app.status_label.text)
+    assert any(m["type"] == "subscribe_events" for m in server.received)
+
+
+def test_configured_camera_screen_shows_the_entity(start_app, server):
+    from minihometerm.ui.camera import CameraView
+
+    app = start_app(camera={"entity": "camera.front_door", "stream": "1"})
+    app.show_screen("camera")
+    view = app.root.get_screen("camera").view
+    assert isinstance(view, CameraView)
+    assert view.url == f"http://127.0.0.1:{server.port}/api/camera_proxy_stream/camera.front_door"
+    assert view.mjpeg and view.token == app.client.token
+    assert view.active
+
+    app.show_screen("home")
+    assert spin_until(lambda: not view.active)
+
+
+def test_forecast_is_subscribed_and_shown(start_app, server):
+    app = start_app(conditions={"weather_entity": "weather.home", "forecast_type": "daily"})
+    panel = app.root.get_screen("home").ids.forecast
+
+    assert spin_until(lambda: len(panel.children) == 1)
+    subscribed = [m for m in server.received if m["type"] == "weather/subscribe_forecast"]
+    assert [(m["entity_id"], m["forecast_type"]) for m in subscribed] == [("weather.home", "daily")]
+
+
+def test_entity_browser_follows_every_entity_while_open(start_app, server):
+    buttons = {
+        "button1_label": "Kitchen",
+        "button1_state_entity": "light.kitchen",
+        "button1_action": "light.toggle",
+    }
+    app = start_app(buttons=buttons)
+    assert spin_until(lambda: "light.kitchen" in app.client.states)
+    assert "sensor.power" not in app.client.states
+
+    app.show_screen("browser")
+    browser = app.root.get_screen("browser")
+    # Opening it widens the client to all entities and refetches their states
+    assert spin_until(lambda: browser.search("power"))
+    assert browser.search("power")[0]["entity_id"] == "sensor.power"
+    assert app.client.entities == set()
+
+    app.show_screen("home")
+    assert spin_until(lambda: app.client.entities == {"light.kitchen"})
+
+
+def test_sliding_off_a_press_button_sends_no_call(start_app, server, window):
+    app = start_app(
+        buttons={
+            "trigger": "press",
+            "press_delay": "1000",
+            "button1_label": "Kitchen",
+            "button1_action": "light.toggle",
+            "button1_state_entity": "light.kitchen",
+        }
+    )
+    assert spin_until(lambda: not app.status_label.text)
+    window.add_widget(app.root)
+    try:
+        slide_off_then_hold(app, server)
+    finally:
+        window.remove_widget(app.root)
+
+
+def slide_off_then_hold(app, server):
+    from kivy.tests.common import UnitTestTouch
+
+    grid = app.root.get_screen("home").ids.buttons
+
+    def tile_on_screen():
+        view = grid.view_adapter.get_visible_view(0)
+        return view is not None and grid.collide_point(*view.to_window(*view.center))
+
+    assert spin_until(tile_on_screen)
+    tile = grid.view_adapter.get_visible_view(0)
+
+    def calls():
+        return [m for m in server.received if m["type"] == "call_service"]
+
+    touch = UnitTestTouch(*tile.to_window(*tile.center))
+    touch.touch_down()
+    assert spin_until(lambda: tile.state == "down")
+    touch.touch_move(*tile.to_window(tile.right + 50, tile.center_y))
+    touch.touch_up()
+    assert not spin_until(calls, timeout=1.5)
+
+    # Held on the tile: the call goes out once the delay has passed
+    touch = UnitTestTouch(*tile.to_window(*tile.center))
+    touch.touch_down()
+    assert spin_until(calls)
+    touch.touch_up()
+    assert calls()[0]["domain"] == "light" and calls()[0]["service"] == "toggle"
@@ -0,0 +1,88 @@
+from minihometerm.core.bindings import BindingRegistry, resolve_field
+
+
+def make_state(state, last_updated="2024-01-01T00:00:00", **attributes):
+    return {"state": state, "attributes": attributes, "last_updated": last_updated}
+
+
+def test_resolve_field_paths():
+    st = make_state("on", brightness=128, forecast=[{"temperature": 21.5}])
+
+    assert resolve_field(st, None) == "on"
+    assert resolve_field(st, "brightness") == 128
+    assert resolve_field(st, "forecast.0.temperature") == 21.5
+    assert resolve_field(st, "forecast.5.temperature") is None
+    assert resolve_field(st, "nope", default="n/a") == "n/a"
+    assert resolve_field(None, None) is None
+
+
+def test_first_update_fires_then_only_on_change():
+    reg = BindingRegistry()
+    calls = []
+    reg.bind("light.kitchen", lambda eid, value, st: calls.append((eid, value)))
+
+    assert reg.dispatch("light.kitchen", make_state("on")) == 1
+    assert reg.dispatch("light.kitchen", make_state("on", last_updated="later")) == 0
+    assert reg.dispatch("light.kitchen", make_state("off")) == 1
+
+    assert calls == [("light.kitchen", "on"), ("light.kitchen", "off")]
+
+
+def test_late_binding_gets_the_current_value():
+    reg = BindingRegistry()
+    early, late = [], []
+    reg.bind("light.kitchen", lambda eid, value, st: early.append(value))
+    reg.dispatch("light.kitchen", make_state("on"))
+
+    reg.bind("light.kitchen", lambda eid, value, st: late.append((value, st["state"])))
+    assert late == [("on", "on")]
+    # Nothing changed for the first one
+    assert reg.dispatch("light.kitchen", make_state("on", last_updated="later")) == 0
+    reg.dispatch("light.kitchen", make_state("off"))
+    assert early == ["on", "off"]
+    assert late == [("on", "on"), ("off", "off")]
+
+
+def test_attribute_binding_ignores_unrelated_churn():
+    reg = BindingRegistry()
+    state_calls, brightness_calls = [], []
+    reg.bind("light.kitchen", lambda eid, v, st: state_calls.append(v))
+    reg.bind("light.kitchen", lambda eid, v, st: brightness_calls.append(v), "brightness")
+
+    reg.dispatch("light.kitchen", make_state("on", brightness=10, power=1.0))
+    reg.dispatch("light.kitchen", make_state("on", brightness=10, power=2.0))
+    reg.dispatch("light.kitchen", make_state("on", brightness=20, power=3.0))
+
+    assert state_calls == ["on"]
+    assert brightness_calls == [10, 20]
+
+
+def test_unbound_entity_is_ignored_and_unbind_cleans_up():
+    reg = BindingRegistry()
+    calls = []
+
+    def cb(eid, value, st):
+        calls.append(value)
+
+    reg.bind("switch.a", cb)
+    reg.bind("switch.a", cb)  # duplicate bind is a no-op
+    assert reg.dispatch("switch.other", make_state("on")) == 0
+
+    reg.dispatch("switch.a", make_state("on"))
+    reg.unbind("switch.a", cb)
+    reg.dispatch("switch.a", make_state("off"))
+
+    assert calls == ["on"]
+    assert reg.entities() == []
+
+
+def test_clear_forces_refresh():
+    reg = BindingRegistry()
+    calls = []
+    reg.bind("sensor.t", lambda eid, v, st: calls.append(v))
+
+    reg.dispatch("sensor.t", make_state("20"))
+    reg.clear()
+    reg.dispatch("sensor.t", make_state("20"))
+
+    assert calls == ["20", "20"]
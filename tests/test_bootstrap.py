@@ -0,0 +1,36 @@
+from concurrent.futures import Future
+
+from minihometerm.core.bootstrap import Bootstrap
+
+
+def test_done_once_every_part_answered_in_any_order():
+    finished = []
+    boot = Bootstrap(["states", "config", "services"], finished.append)
+    futures = {part: Future() for part in boot.parts}
+    for part, future in futures.items():
+        boot.track(part, future)
+
+    futures["services"].set_result({"light": {}})
+    futures["states"].set_result([])
+    assert finished == [] and not boot.done
+
+    futures["config"].set_exception(RuntimeError("unauthorized"))
+    assert finished == [boot] and boot.done
+    assert boot.results == {"services": {"light": {}}, "states": []}
+    assert boot.stats.errors == {"config": "unauthorized"}
+    assert set(boot.stats.timings) == {"states", "config", "services"}
+    assert boot.stats.total is not None and boot.stats.connect_to_ready >= boot.stats.total
+    assert not boot.aborted
+
+
+def test_disconnect_aborts():
+    finished = []
+    boot = Bootstrap(["states", "config"], finished.append)
+    first, second = Future(), Future()
+    boot.track("states", first)
+    boot.track("config", second)
+
+    first.set_exception(ConnectionError("gone"))
+    second.set_exception(ConnectionError("gone"))
+
+    assert finished == [boot] and boot.aborted
@@ -0,0 +1,136 @@
+import pytest
+
+from minihometerm.config import ButtonConfig
+from minihometerm.ui.buttons import apply_state, button_data, entity_index
+
+
+def make_buttons(count):
+    return [
+        ButtonConfig(key=str(i), label=f"B{i}", state_entity=f"light.l{i % 3}")
+        for i in range(count)
+    ]
+
+
+def test_button_data_has_one_item_per_button():
+    data = button_data(make_buttons(40))
+
+    assert len(data) == 40
+    assert data[7] == {"index": 7, "text": "B7", "icon": "", "entity_state": ""}
+
+
+def test_apply_state_touches_only_the_bound_items():
+    buttons = make_buttons(6)
+    data = button_data(buttons)
+    index = entity_index(buttons)
+    before = [item for item in data]
+
+    assert apply_state(data, index, "light.l1", "on") == [1, 4]
+    assert [item["entity_state"] for item in data] == ["", "on", "", "", "on", ""]
+    # Same item dicts, changed in place: the RecycleView sees no data change.
+    assert all(a is b for a, b in zip(before, data))
+
+    assert apply_state(data, index, "light.l1", "on") == []
+    assert apply_state(data, index, "light.unknown", "on") == []
+
+
+@pytest.fixture
+def grid(window):
+    """A two-button ``ButtonGrid`` filling the window, recording its events."""
+    from kivy.clock import Clock
+
+    from minihometerm.ui.buttons import ButtonGrid
+
+    grid = ButtonGrid(size=window.size, pos=(0, 0), size_hint=(None, None))
+    grid.set_buttons(
+        [
+            ButtonConfig(key="1", label="Gate", action="script.gate"),
+            ButtonConfig(key="2", label="Light", action="light.toggle", trigger="press"),
+        ]
+    )
+    grid.events = []
+    grid.bind(
+        on_action=lambda _grid, button, touch: grid.events.append(("action", button.key)),
+        on_action_cancel=lambda _grid, button: grid.events.append(("cancel", button.key)),
+    )
+    window.add_widget(grid)
+    for _ in range(3):
+        Clock.tick()
+    yield grid
+    window.remove_widget(grid)
+
+
+def settle(grid):
+    """Let the grid's ScrollView hand a held touch-down over to the tile."""
+    import time
+
+    from kivy.clock import Clock
+
+    deadline = time.monotonic() + grid.scroll_timeout / 1000 + 0.1
+    while time.monotonic() < deadline:
+        Clock.tick()
+
+
+def tile(grid, index):
+    view = grid.view_adapter.get_visible_view(index)
+    assert view is not None
+    return view
+
+
+def test_release_trigger_acts_when_released_on_the_tile(grid):
+    from kivy.tests.common import UnitTestTouch
+
+    gate = tile(grid, 0)
+    touch = UnitTestTouch(*gate.to_window(*gate.center))
+    touch.touch_down()
+    assert grid.events == []
+    touch.touch_up()
+    assert grid.events == [("action", "1")]
+
+    # Released elsewhere: nothing
+    touch = UnitTestTouch(*gate.to_window(*gate.center))
+    touch.touch_down()
+    settle(grid)
+    touch.touch_move(*gate.to_window(gate.right + 50, gate.center_y))
+    touch.touch_up()
+    assert grid.events == [("action", "1")]
+
+
+def test_press_trigger_acts_on_touch_down_and_cancels_on_slide_off(grid):
+    from kivy.tests.common import UnitTestTouch
+
+    light = tile(grid, 1)
+    touch = UnitTestTouch(*light.to_window(*light.center))
+    touch.touch_down()
+    settle(grid)
+    assert grid.events == [("action", "2")]
+    touch.touch_up()
+    assert grid.events == [("action", "2")]
+
+    touch = UnitTestTouch(*light.to_window(*light.center))
+    touch.touch_down()
+    settle(grid)
+    touch.touch_move(*light.to_window(light.x - 50, light.center_y))
+    touch.touch_move(*light.to_window(light.x - 60, light.center_y))
+    touch.touch_up()
+    assert grid.events == [("action", "2"), ("action", "2"), ("cancel", "2")]
+
+
+def test_press_trigger_sliding_off_while_arming_never_acts(grid):
+    from kivy.tests.common import UnitTestTouch
+
+    grid.arm_delay = 5
+    light = tile(grid, 1)
+    touch = UnitTestTouch(*light.to_window(*light.center))
+    touch.touch_down()
+    settle(grid)
+    touch.touch_move(*light.to_window(light.x - 50, light.center_y))
+    touch.touch_up()
+    assert grid.events == []
+
+    # Lifted on the tile before the delay ran out: acts at once
+    touch = UnitTestTouch(*light.to_window(*light.center))
+    touch.touch_down()
+    settle(grid)
+    assert grid.events == []
+    touch.touch_up()
+    assert grid.events == [("action", "2")]
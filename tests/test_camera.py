@@ -0,0 +1,158 @@
+import io
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import kivy
+import pytest
+
+from minihometerm.ui.camera import (
+    CameraFeed,
+    Frame,
+    FrameBuffer,
+    camera_url,
+    iter_mjpeg,
+)
+
+JPEG_PATH = os.path.join(os.path.dirname(kivy.__file__), "data", "images", "background.jpg")
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+@pytest.fixture
+def camera_server():
+    """Stand-in for HA's camera_proxy / camera_proxy_stream endpoints."""
+    with open(JPEG_PATH, "rb") as f:
+        jpeg = f.read()
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            requests.append((self.path, self.headers.get("Authorization")))
+            if self.path.startswith("/api/camera_proxy_stream/"):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace;boundary=frame")
+                self.end_headers()
+                for _ in range(10):
+                    self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                    self.wfile.write(b"Content-Length: %d\r\n\r\n" % len(jpeg))
+                    self.wfile.write(jpeg + b"\r\n")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(jpeg)))
+            self.end_headers()
+            self.wfile.write(jpeg)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.requests = requests
+    server.ws_url = f"ws://127.0.0.1:{server.server_address[1]}/api/websocket"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_camera_url_from_websocket_url():
+    assert (
+        camera_url("wss://ha.local:8123/api/websocket", "camera.door")
+        == "https://ha.local:8123/api/camera_proxy/camera.door"
+    )
+    assert camera_url("ws://ha:8123/api/websocket", "camera.door", stream=True).endswith(
+        "/api/camera_proxy_stream/camera.door"
+    )
+
+
+def test_frame_fill_strips_row_padding():
+    frame = Frame()
+    # 2x2 rgb rows padded to 8 bytes
+    frame.fill(2, 2, "rgb", b"abcdefXXghijklYY", rowlength=8)
+
+    assert bytes(frame.data) == b"abcdefghijkl"
+    assert frame.size == (2, 2)
+
+
+def test_frame_buffer_keeps_latest_and_reuses_memory():
+    fb = FrameBuffer()
+    fb.write(1, 1, "rgb", b"\x01\x01\x01")
+    fb.write(1, 1, "rgb", b"\x02\x02\x02")
+
+    frame = fb.take()
+    assert bytes(frame.data) == b"\x02\x02\x02"
+    assert fb.take() is None
+    assert fb.stats.dropped == 1 and fb.stats.shown == 1
+
+    def cycle():
+        for i in range(3):
+            fb.write(1, 1, "rgb", bytes([i] * 3))
+            fb.take()
+        return {id(f.data) for f in (fb._back, fb._ready, fb._front)}
+
+    # Once every buffer has the frame size, nothing is allocated any more.
+    assert cycle() == cycle()
+
+
+def test_iter_mjpeg_with_and_without_length():
+    body = (
+        b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: 3\r\n\r\nabc\r\n"
+        b"--frame\r\nContent-Type: image/jpeg\r\n\r\ndef\r\n"
+        b"--frame\r\n\r\nghi\r\n"
+    )
+
+    assert list(iter_mjpeg(io.BytesIO(body), "frame")) == [b"abc", b"def", b"ghi"]
+
+
+def test_snapshot_is_decoded_off_thread(camera_server):
+    fb = FrameBuffer()
+    feed = CameraFeed(camera_url(camera_server.ws_url, "camera.door"), fb, token="tok")
+    feed.start()
+    try:
+        assert wait_until(lambda: fb.pending)
+    finally:
+        feed.stop()
+
+    frame = fb.take()
+    assert frame.size == (1024, 768)
+    assert len(frame.data) == 1024 * 768 * 3
+    assert camera_server.requests[0] == ("/api/camera_proxy/camera.door", "Bearer tok")
+
+
+def test_stream_skips_frames_while_ui_is_behind(camera_server):
+    fb = FrameBuffer()
+    url = camera_url(camera_server.ws_url, "camera.door", stream=True)
+    feed = CameraFeed(url, fb, mjpeg=True, interval=10.0)
+    feed.start()
+    try:
+        # Nobody takes frames: only the first part is decoded, the rest are skipped.
+        assert wait_until(lambda: fb.stats.skipped == 9)
+    finally:
+        feed.stop()
+
+    assert fb.stats.decoded == 1
+    assert fb.stats.dropped == 0
+
+
+def test_paused_feed_makes_no_requests(camera_server):
+    fb = FrameBuffer()
+    feed = CameraFeed(camera_url(camera_server.ws_url, "camera.door"), fb, interval=0.01)
+    feed.pause()
+    feed.start()
+    try:
+        time.sleep(0.1)
+        assert camera_server.requests == []
+
+        feed.resume()
+        assert wait_until(lambda: camera_server.requests)
+    finally:
+        feed.stop()
@@ -0,0 +1,102 @@
+import json
+import os
+
+from minihometerm.core.catalog import CatalogCache, content_hash
+
+
+def test_store_persists_and_skips_unchanged_content(tmp_path):
+    cache = CatalogCache(tmp_path, "ws://ha:8123/api/websocket")
+    services = {"light": {"turn_on": {}}}
+
+    assert cache.store("services", services, "2024.1.0") is True
+    assert cache.store("services", {"light": {"turn_on": {}}}, "2024.1.0") is False
+    assert not cache.path.exists()  # written by save() only
+    cache.save()
+
+    reloaded = CatalogCache(tmp_path, "ws://ha:8123/api/websocket")
+    assert reloaded.get("services") == services
+    assert reloaded.fresh("services", "2024.1.0")
+    # Another instance has its own file.
+    assert CatalogCache(tmp_path, "ws://other:8123/api/websocket").get("services") is None
+
+
+def test_freshness_rules(tmp_path):
+    cache = CatalogCache(tmp_path, "ws://ha", max_age=3600)
+    cache.store("area_registry", [{"area_id": "kitchen"}], "2024.1.0")
+
+    assert cache.fresh("area_registry", "2024.1.0")
+    assert not cache.fresh("area_registry", "2024.2.0")  # HA was upgraded
+    assert not cache.fresh("services", "2024.1.0")  # never fetched
+
+    cache.invalidate("area_registry")
+    assert not cache.fresh("area_registry", "2024.1.0")
+    cache.store("area_registry", [{"area_id": "kitchen"}], "2024.1.0")
+    assert cache.fresh("area_registry", "2024.1.0")
+
+    cache.max_age = 0
+    assert not cache.fresh("area_registry", "2024.1.0")
+
+
+def test_entity_registry_patches(tmp_path):
+    cache = CatalogCache(tmp_path, "ws://ha")
+    cache.store("entity_registry", [{"entity_id": "light.a"}, {"entity_id": "light.b"}], "1")
+
+    cache.remove_entity("light.a")
+    cache.upsert_entity({"entity_id": "light.b", "name": "Desk"})
+    cache.upsert_entity({"entity_id": "light.c"})
+    cache.save()
+
+    expected = [{"entity_id": "light.b", "name": "Desk"}, {"entity_id": "light.c"}]
+    assert cache.get("entity_registry") == expected
+    assert CatalogCache(tmp_path, "ws://ha").get("entity_registry") == expected
+
+
+def test_extended_entry_is_stored_in_the_list_format(tmp_path):
+    cache = CatalogCache(tmp_path, "ws://ha")
+    cache.store("entity_registry", [{"entity_id": "light.a", "name": None}], "1")
+
+    cache.upsert_entity(
+        {
+            "entity_id": "light.a",
+            "name": "Desk",
+            "aliases": ["desk lamp"],
+            "capabilities": {"supported_color_modes": ["onoff"]},
+            "device_class": None,
+            "original_device_class": None,
+            "original_icon": "mdi:lamp",
+        }
+    )
+
+    assert cache.get("entity_registry") == [{"entity_id": "light.a", "name": "Desk"}]
+
+
+def test_corrupt_part_is_dropped(tmp_path):
+    cache = CatalogCache(tmp_path, "ws://ha")
+    cache.store("services", {"light": {}}, "1")
+    cache.store("area_registry", [], "1")
+    cache.save()
+    data = json.loads(cache.path.read_text())
+    data["services"]["data"] = {"light": {}, "tampered": {}}
+    cache.path.write_text(json.dumps(data))
+
+    reloaded = CatalogCache(tmp_path, "ws://ha")
+
+    assert reloaded.get("services") is None
+    assert reloaded.get("area_registry") == []
+    assert data["area_registry"]["hash"] == content_hash([])
+
+
+def test_unchanged_refetch_does_not_rewrite_the_file(tmp_path):
+    cache = CatalogCache(tmp_path, "ws://ha", max_age=3600)
+    cache.store("services", {"light": {"turn_on": {}}}, "2024.1.0")
+    cache.save()
+    os.utime(cache.path, (1_000_000, 1_000_000))
+
+    assert cache.store("services", {"light": {"turn_on": {}}}, "2024.1.0") is False
+    cache.save()
+    assert cache.path.stat().st_mtime == 1_000_000
+
+    # A new HA version is worth remembering, even with the same content
+    assert cache.store("services", {"light": {"turn_on": {}}}, "2024.2.0") is False
+    cache.save()
+    assert cache.path.stat().st_mtime != 1_000_000
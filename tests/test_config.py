@@ -134,3 +134,33 @@ def test_override_with_env_variables(clean_env, caplog, tmp_path, monkeypatch):
 
     assert cfg.get("connection", "ws_url") == "ws://env:8123/api/websocket"
     assert cfg.get("connection", "token") == "env_token"
+
+
+def test_parse_buttons_from_numbered_keys_and_sections(clean_env, tmp_path, monkeypatch):
+    cfg_path = tmp_path / "config.ini"
+    cfg_path.write_text(
+        "[buttons]\n"
+        "button10_label = Ten\n"
+        "button10_action = script.ten\n"
+        "button2_label = Two\n"
+        "button2_state_entity = light.two\n"
+        "button2_action = light.toggle\n"
+        "[button.garage]\n"
+        "icon = garage\n"
+        "action = script.garage\n"
+    )
+    monkeypatch.setattr(config, "GLOBAL_CONFIG_PATH", cfg_path)
+    monkeypatch.setattr(config, "USER_CONFIG_PATH", tmp_path / "doesnotexist.ini")
+
+    buttons = config.parse_buttons(config.load_config())
+
+    assert [b.key for b in buttons] == ["2", "10", "garage"]
+    assert buttons[0] == config.ButtonConfig(
+        key="2", label="Two", state_entity="light.two", action="light.toggle"
+    )
+    # Without a label the action is shown.
+    assert buttons[2].label == "script.garage" and buttons[2].icon == "garage"
+
+
+def test_no_buttons_by_default(mock_cfg):
+    assert config.parse_buttons(mock_cfg) == []
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from minihometerm.core.endpoints import EndpointRanking, split_urls
+
+LOCAL = "ws://192.168.1.10:8123/api/websocket"
+MDNS = "ws://homeassistant.local:8123/api/websocket"
+BACKUP = "wss://backup.example.org/api/websocket"
+
+
+def test_split_urls():
+    assert split_urls(f"{LOCAL}, {MDNS},{LOCAL}") == [LOCAL, MDNS]
+    assert split_urls([MDNS, " ", BACKUP]) == [MDNS, BACKUP]
+    with pytest.raises(ValueError):
+        EndpointRanking(" , ")
+
+
+def test_measured_endpoints_come_first_and_failures_last():
+    ranking = EndpointRanking([MDNS, LOCAL, BACKUP])
+    assert ranking.ordered() == [MDNS, LOCAL, BACKUP]  # nothing known: configured order
+
+    ranking.succeeded(LOCAL, 0.05)
+    ranking.succeeded(MDNS, 1.5)
+    assert ranking.ordered() == [LOCAL, MDNS, BACKUP]
+
+    ranking.failed(LOCAL)
+    assert ranking.ordered() == [MDNS, BACKUP, LOCAL]
+    ranking.succeeded(LOCAL, 0.15)
+    assert ranking.get(LOCAL) == {"connect": pytest.approx(0.08), "failures": 0}
+    assert ranking.ordered()[0] == LOCAL
+
+
+def test_ranking_survives_restarts(tmp_path):
+    path = tmp_path / "endpoints.json"
+    ranking = EndpointRanking([MDNS, LOCAL], path)
+    ranking.succeeded(LOCAL, 0.05)
+    ranking.failed(MDNS)
+    # Written later, off the caller's thread
+    assert not path.exists()
+    ranking.flush()
+
+    assert EndpointRanking([MDNS, LOCAL], path).ordered() == [LOCAL, MDNS]
+    # Endpoints no longer configured are forgotten; garbage is ignored
+    assert EndpointRanking([MDNS, BACKUP], path).get(MDNS)["failures"] == 1
+    assert EndpointRanking([BACKUP], path).get(LOCAL) is None
+    path.write_text(json.dumps({LOCAL: {"connect": "soon", "failures": None}}))
+    assert EndpointRanking([LOCAL], path).get(LOCAL) == {"connect": None, "failures": 0}
+    path.write_text("{")
+    assert EndpointRanking([LOCAL], path).ordered() == [LOCAL]
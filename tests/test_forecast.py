@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from minihometerm.core.forecast import ForecastCache, ForecastFeed
+from minihometerm.ui.forecast import forecast_rows
+
+DAILY = [
+    {"datetime": "2024-01-01T12:00:00+00:00", "condition": "sunny", "temperature": 21.4},
+    {
+        "datetime": "2024-01-02T12:00:00+00:00",
+        "condition": "lightning-rainy",
+        "temperature": 18.6,
+        "templow": 9.2,
+    },
+]
+
+
+class FakeClient:
+    def __init__(self):
+        self.subscriptions = []
+
+    def subscribe(self, payload, callback):
+        client = self
+
+        class Sub:
+            def unsubscribe(self):
+                client.subscriptions.remove((payload, callback))
+
+        self.subscriptions.append((payload, callback))
+        return Sub()
+
+
+def test_cache_detects_changes_and_persists(tmp_path):
+    path = tmp_path / "cache" / "forecast.json"
+    cache = ForecastCache(path)
+
+    assert cache.update("weather.home", "daily", DAILY)
+    assert not cache.update("weather.home", "daily", json.loads(json.dumps(DAILY)))
+    assert cache.get("weather.home", "hourly") is None
+    # Written later, off the caller's thread
+    assert not path.exists()
+
+    cache.flush()
+    warm = ForecastCache(path)
+    assert warm.get("weather.home", "daily") == DAILY
+
+
+def test_cache_ignores_corrupt_file(tmp_path):
+    path = tmp_path / "forecast.json"
+    path.write_text("{not json")
+
+    assert ForecastCache(path).get("weather.home") is None
+
+
+def test_feed_subscribes_and_pushes_only_changes(tmp_path):
+    cache = ForecastCache(tmp_path / "forecast.json")
+    cache.update("weather.home", "daily", DAILY[:1])
+    client = FakeClient()
+    pushed = []
+    feed = ForecastFeed(
+        client, "weather.home", cache=cache, on_change=lambda *args: pushed.append(args)
+    )
+
+    feed.start()
+    # Warm start: the cached forecast is shown before HA answers.
+    assert pushed == [("weather.home", "daily", DAILY[:1])]
+    payload, callback = client.subscriptions[0]
+    assert payload == {
+        "type": "weather/subscribe_forecast",
+        "entity_id": "weather.home",
+        "forecast_type": "daily",
+    }
+
+    callback({"type": "daily", "forecast": DAILY})
+    callback({"type": "daily", "forecast": DAILY})
+    assert pushed[1:] == [("weather.home", "daily", DAILY)]
+    assert feed.forecast == DAILY
+
+    feed.stop()
+    assert client.subscriptions == []
+
+
+def test_feed_rejects_unknown_type():
+    with pytest.raises(ValueError):
+        ForecastFeed(FakeClient(), "weather.home", forecast_type="weekly")
+
+
+def test_forecast_rows_formatting():
+    rows = forecast_rows(DAILY, limit=5)
+
+    assert [r["condition"] for r in rows] == ["Sunny", "Storm"]
+    assert [(r["high"], r["low"]) for r in rows] == [("21°", ""), ("19°", "9°")]
+    assert all(r["when"] for r in rows)
+    assert len(forecast_rows(DAILY, limit=1)) == 1
@@ -4,7 +4,13 @@ import time
 
 import pytest
 
-from minihometerm.hass_client import HAWebSocketClient
+from minihometerm.core.endpoints import EndpointRanking
+from minihometerm.hass_client import (
+    HAWebSocketClient,
+    PreparedCommand,
+    encode_command,
+    service_call,
+)
 
 
 def test_auth_and_subscription(client):
@@ -97,6 +103,7 @@ def test_service_call_success(client):
     c.start()
     time.sleep(0.1)
     ws = ws_getter()
+    ws.server_send({"type": "auth_ok"})
 
     def respond():
         time.sleep(0.05)
@@ -117,22 +124,46 @@ def test_service_call_success(client):
 
 
 def test_service_call_timeout(client):
-    c, _, _ = client
+    c, ws_getter, _ = client
     c.start()
     time.sleep(0.1)
 
     with pytest.raises(TimeoutError):
         c.call_service("light", "toggle", target={"entity_id": "light.kitchen"}, timeout=0.2)
 
+    # The caller gave up: the queued call is not sent once the connection is back
+    ws = ws_getter()
+    ws.server_send({"type": "auth_ok"})
+    assert not any(m["type"] == "call_service" for m in ws.sent)
+
     c.stop()
 
 
+def test_timed_out_caller_leaves_a_shared_call_to_the_others(client):
+    c, ws_getter, _ = client
+    c.start()
+    ws = ws_getter()
+    assert ws._started.wait(timeout=1.0)
+
+    waiting = c.call_service_async("light", "toggle")
+    with pytest.raises(TimeoutError):
+        c.call_service("light", "toggle", timeout=0.1)
+    assert not waiting.cancelled()
+
+    ws.server_send({"type": "auth_ok"})
+    calls = [m for m in ws.sent if m["type"] == "call_service"]
+    assert len(calls) == 1
+    ws.server_send({"id": calls[0]["id"], "type": "result", "success": True, "result": "ok"})
+    assert waiting.result(timeout=1.0) == "ok"
+
+
 def test_service_call_failure(client):
     """Simulate HA responding with success=False."""
     c, ws_getter, _ = client
     c.start()
     time.sleep(0.05)
     ws = ws_getter()
+    ws.server_send({"type": "auth_ok"})
 
     def respond():
         time.sleep(0.05)
@@ -286,7 +317,7 @@ def test_reconnect_after_failure(monkeypatch):
         def send(self, msg):
             self.sent.append(json.loads(msg))
 
-        def close(self):
+        def close(self, **kwargs):
             self.closed = True
 
         def run_forever(self, **kw):
@@ -314,6 +345,7 @@ def test_pending_future_rejected_on_disconnect(client):
     c, ws_getter, _ = client
     c.start()
     time.sleep(0.05)
+    ws_getter().server_send({"type": "auth_ok"})
 
     def call_in_thread():
         with pytest.raises(ConnectionError):
@@ -346,7 +378,7 @@ def test_send_error(monkeypatch):
             self.on_message(self, json.dumps({"type": "auth_ok"}))
             time.sleep(0.05)
 
-        def close(self):
+        def close(self, **kwargs):
             pass
 
     monkeypatch.setattr("minihometerm.hass_client.websocket.WebSocketApp", BrokenWS)
@@ -410,6 +442,7 @@ def test_result_sets_pending(client):
     c.start()
     time.sleep(0.05)
     ws = ws_getter()
+    ws.server_send({"type": "auth_ok"})
 
     # start service call in thread
     def do_call():
@@ -441,7 +474,7 @@ def test_send_failure(monkeypatch):
             self.on_message(self, json.dumps({"type": "auth_ok"}))
             time.sleep(0.05)
 
-        def close(self):
+        def close(self, **kwargs):
             pass
 
     monkeypatch.setattr("minihometerm.hass_client.websocket.WebSocketApp", BrokenWS)
@@ -467,3 +500,694 @@ def test_reconnect_triggers_on_disconnect(monkeypatch):
     c.stop()
     t.join()
     assert "err" in called
+
+
+def test_throttled_updates_leave_websocket_thread(monkeypatch):
+    from doubles import DummyWS
+
+    monkeypatch.setattr("minihometerm.hass_client.websocket.WebSocketApp", DummyWS)
+    delivered = []
+    c = HAWebSocketClient(
+        "ws://fake",
+        "tok",
+        on_entity_update=lambda eid, new, old: delivered.append(
+            (eid, new["state"], threading.current_thread().name)
+        ),
+        min_update_interval=0.0,
+    )
+    c.start()
+    try:
+        time.sleep(0.05)
+        ws = c._ws
+        for state in ("1", "2"):
+            event = {
+                "type": "event",
+                "event": {
+                    "event_type": "state_changed",
+                    "data": {"entity_id": "sensor.power", "new_state": {"state": state}},
+                },
+            }
+            ws.on_message(ws, json.dumps(event))
+
+        for _ in range(100):
+            if delivered and delivered[-1][1] == "2":
+                break
+            time.sleep(0.01)
+    finally:
+        c.stop()
+
+    assert delivered[-1] == ("sensor.power", "2", "ha-dispatcher")
+    assert c.update_stats.received == 2
+
+
+def test_from_config_reads_update_settings(mock_cfg):
+    mock_cfg.set("updates", "min_interval", "0.5")
+    mock_cfg.set("updates", "intervals", "sensor: 2")
+
+    c = HAWebSocketClient.from_config(mock_cfg)
+
+    assert c.url == "ws://homeassistant.local:8123/api/websocket"
+    assert c._throttle.interval_for("sensor.power") == 2.0
+    assert c._throttle.interval_for("light.kitchen") == 0.5
+
+
+def test_compression_offer_and_traffic_counters(client):
+    c, ws_getter, _ = client
+    c.compression = True
+    c.start()
+    ws = ws_getter()
+    assert ws._started.wait(timeout=1.0)
+    for _ in range(100):
+        if ws.sent:
+            break
+        time.sleep(0.01)
+
+    assert ws.header == ["Sec-WebSocket-Extensions: permessage-deflate; client_no_context_takeover"]
+    # The double has no real socket, so nothing can be negotiated.
+    assert c.compression_active is False
+    assert c.traffic.bytes_out == len(ws.raw_sent[0])
+
+
+def test_offline_calls_are_queued_and_flushed_after_auth(client):
+    c, ws_getter, _ = client
+    c.start()
+    ws = ws_getter()
+    assert ws._started.wait(timeout=1.0)
+
+    # Not authenticated yet: nothing blocks and nothing is sent.
+    gate = c.call_service_async("script", "toggle_gate")
+    gate_again = c.call_service_async("script", "toggle_gate")
+    light = c.call_service_async("light", "toggle", target={"entity_id": "light.kitchen"})
+    assert gate is gate_again
+    assert not any(m["type"] == "call_service" for m in ws.sent)
+
+    ws.server_send({"type": "auth_ok"})
+
+    calls = [m for m in ws.sent if m["type"] == "call_service"]
+    assert [m["service"] for m in calls] == ["toggle_gate", "toggle"]
+    assert c.outbox_stats.collapsed == 1
+
+    # Results arrive out of order and still reach the original futures.
+    for m, result in reversed(list(zip(calls, ["gate", "light"]))):
+        ws.server_send({"id": m["id"], "type": "result", "success": True, "result": result})
+    assert gate.result(timeout=1.0) == "gate"
+    assert light.result(timeout=1.0) == "light"
+
+
+def test_queued_call_expires_after_ttl(client):
+    c, _, _ = client
+    c.start()
+
+    fut = c.call_service_async("script", "toggle_gate", ttl=0.0)
+
+    # Expired commands are pruned whenever the queue is touched.
+    c.call_service_async("script", "other")
+    with pytest.raises(TimeoutError):
+        fut.result(timeout=0)
+
+
+def wait_until(predicate, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_heartbeat_measures_latency(client):
+    c, ws_getter, _ = client
+    stale_signals = []
+    c.heartbeat_interval = 0.02
+    c.on_stale = stale_signals.append
+    c.start()
+    ws = ws_getter()
+    assert ws._started.wait(timeout=1.0)
+    ws.server_send({"type": "auth_ok"})
+
+    def ping():
+        return next((m for m in reversed(ws.sent) if m["type"] == "ping"), None)
+
+    assert wait_until(lambda: ping() is not None)
+    ws.server_send({"id": ping()["id"], "type": "pong"})
+
+    assert len(c.latency) == 1
+    assert 0 <= c.latency.last < 1.0
+    assert not c.stale
+    assert stale_signals == [False]
+
+
+def test_missed_heartbeats_mark_stale_and_force_reconnect(client):
+    c, ws_getter, _ = client
+    stale_signals = []
+    c.heartbeat_interval = 0.02
+    c.heartbeat_misses = 2
+    c.on_stale = stale_signals.append
+    c.start()
+    first = ws_getter()
+    assert first._started.wait(timeout=1.0)
+    first.server_send({"type": "auth_ok"})
+
+    # Nobody answers the pings: stale first, then the socket gets closed.
+    assert wait_until(lambda: first.closed)
+    assert stale_signals[:2] == [False, True]
+    assert wait_until(lambda: ws_getter() is not first, timeout=3.0)
+
+
+def test_stop_during_backoff_returns_immediately(monkeypatch):
+    def fake_wsapp(*a, **k):
+        raise RuntimeError("unreachable")
+
+    monkeypatch.setattr("minihometerm.hass_client.websocket.WebSocketApp", fake_wsapp)
+    c = HAWebSocketClient("ws://fake", "tok")
+    c._backoff = 30.0
+    c.start()
+
+    t0 = time.monotonic()
+    c.stop()
+
+    assert time.monotonic() - t0 < 0.1
+    assert c._reconnect_timer.cancelled
+
+
+def test_clients_share_one_loop_thread(monkeypatch):
+    from doubles import DummyWS
+
+    from minihometerm.ioloop import IOLoop
+
+    monkeypatch.setattr("minihometerm.hass_client.websocket.WebSocketApp", DummyWS)
+    loop = IOLoop(name="shared-test-loop")
+    clients = [HAWebSocketClient("ws://fake", "tok", loop=loop) for _ in range(3)]
+    try:
+        for c in clients:
+            c.start()
+            assert c._ws._started.wait(timeout=1.0)
+            c._ws.server_send({"type": "auth_ok"})
+
+        loops = [t for t in threading.enumerate() if t.name == "shared-test-loop"]
+        assert len(loops) == 1
+        assert all(c.connected for c in clients)
+        # Keepalive timers of all three connections live on that one loop.
+        assert all(c._hb_timer is not None for c in clients)
+    finally:
+        for c in clients:
+            c.stop()
+        loop.stop(timeout=1.0)
+
+
+def test_state_cache_tracks_filtered_entities(client):
+    c, ws_getter, _ = client
+    c.start()
+    ws = ws_getter()
+    ws.server_send({"type": "auth_ok"})
+    for eid in ("input_boolean.test_toggle_1", "switch.other"):
+        ws.server_send(
+            {
+                "type": "event",
+                "event": {
+                    "event_type": "state_changed",
+                    "data": {"entity_id": eid, "new_state": {"entity_id": eid, "state": "on"}},
+                },
+            }
+        )
+
+    assert c.states.get("input_boolean.test_toggle_1").state == "on"
+    assert "switch.other" not in c.states
+
+
+def test_subscription_is_sent_after_auth_and_renewed_on_reconnect(client):
+    c, ws_getter, _ = client
+    events = []
+    sub = c.subscribe(
+        {"type": "weather/subscribe_forecast", "entity_id": "weather.home"}, events.append
+    )
+    c.start()
+    first = ws_getter()
+    assert not any(m["type"] == "weather/subscribe_forecast" for m in first.sent)
+
+    first.server_send({"type": "auth_ok"})
+    sent = [m for m in first.sent if m["type"] == "weather/subscribe_forecast"]
+    assert len(sent) == 1 and sub.id == sent[0]["id"]
+    first.server_send({"id": sub.id, "type": "event", "event": {"forecast": [1]}})
+    assert events == [{"forecast": [1]}]
+
+    first.close()
+    assert wait_until(lambda: ws_getter() is not first, timeout=3.0)
+    second = ws_getter()
+    assert sub.id is None
+    second.server_send({"type": "auth_ok"})
+    renewed = [m for m in second.sent if m["type"] == "weather/subscribe_forecast"]
+    assert len(renewed) == 1 and sub.id == renewed[0]["id"]
+
+    sub.unsubscribe()
+    assert second.sent[-1] == {
+        "type": "unsubscribe_events",
+        "subscription": renewed[0]["id"],
+        "id": second.sent[-1]["id"],
+    }
+
+
+def test_template_results_are_pushed_only_when_they_change(client, caplog):
+    c, ws_getter, _ = client
+    results = []
+    c.subscribe_template(
+        "{{ states.light | selectattr('state', 'eq', 'on') | list | count }}", results.append
+    )
+    c.start()
+    ws = ws_getter()
+    ws.server_send({"type": "auth_ok"})
+    sent = [m for m in ws.sent if m["type"] == "render_template"]
+    assert len(sent) == 1 and sent[0]["report_errors"] is True
+    mid = sent[0]["id"]
+
+    ws.server_send({"id": mid, "type": "event", "event": {"result": 3, "listeners": {}}})
+    ws.server_send({"id": mid, "type": "event", "event": {"result": 3, "listeners": {}}})
+    ws.server_send({"id": mid, "type": "event", "event": {"result": 4, "listeners": {}}})
+    with caplog.at_level("WARNING"):
+        ws.server_send({"id": mid, "type": "event", "event": {"error": "boom", "level": "ERROR"}})
+    assert results == [3, 4]
+    assert any("boom" in m for m in caplog.messages)
+
+    # Renewed after a reconnect; the unchanged first render is not repeated.
+    ws.close()
+    assert wait_until(lambda: ws_getter() is not ws, timeout=3.0)
+    second = ws_getter()
+    second.server_send({"type": "auth_ok"})
+    renewed = [m for m in second.sent if m["type"] == "render_template"]
+    assert len(renewed) == 1
+    second.server_send({"id": renewed[0]["id"], "type": "event", "event": {"result": 4}})
+    second.server_send({"id": renewed[0]["id"], "type": "event", "event": {"result": 5}})
+    assert results == [3, 4, 5]
+
+
+def test_template_label_subscribes_and_renders(client, window):
+    from kivy.clock import Clock
+
+    from minihometerm.ui.widgets import TemplateLabel
+
+    c, ws_getter, _ = client
+    label = TemplateLabel(template="{{ states.light | count }}", fmt="{} lights")
+    label.attach(c)
+    c.start()
+    ws = ws_getter()
+    ws.server_send({"type": "auth_ok"})
+    sent = [m for m in ws.sent if m["type"] == "render_template"]
+    assert [m["template"] for m in sent] == ["{{ states.light | count }}"]
+
+    ws.server_send({"id": sent[0]["id"], "type": "event", "event": {"result": 3}})
+    Clock.tick()
+    assert label.text == "3 lights"
+
+    # A new template replaces the subscription
+    label.template = "{{ 1 }}"
+    assert ws.sent[-2]["type"] == "unsubscribe_events"
+    assert ws.sent[-1]["template"] == "{{ 1 }}"
+
+
+def test_bootstrap_is_pipelined_and_signals_ready(client):
+    c, ws_getter, updates = client
+    ready = []
+    c.on_ready = lambda: ready.append(True)
+    c.start()
+    ws = ws_getter()
+    ws.server_send({"type": "auth_ok"})
+
+    commands = {
+        m["type"]: m["id"]
+        for m in ws.sent
+        if m["type"] in ("get_states", "get_config", "get_services")
+        or m["type"].startswith("config/")
+    }
+    # All requests are out before any result arrives.
+    assert set(commands) == {
+        "get_states",
+        "get_config",
+        "get_services",
+        "config/entity_registry/list",
+        "config/device_registry/list",
+        "config/area_registry/list",
+    }
+
+    def result(mtype, value, success=True):
+        msg = {"id": commands[mtype], "type": "result", "success": success}
+        if success:
+            msg["result"] = value
+        else:
+            msg["error"] = {"code": "unauthorized", "message": "Unauthorized"}
+        ws.server_send(msg)
+
+    result("config/area_registry/list", None, success=False)
+    result("get_services", {"light": {"turn_on": {}}})
+    result("get_config", {"version": "2024.1.0"})
+    result("config/entity_registry/list", [{"entity_id": "input_boolean.test_toggle_1"}])
+    result("config/device_registry/list", [])
+    assert not c.ready.is_set() and ready == []
+
+    eid = "input_boolean.test_toggle_1"
+    result("get_states", [{"entity_id": eid, "state": "on"}, {"entity_id": "x.y", "state": "1"}])
+    assert c.ready.is_set() and ready == [True]
+    assert c.config["version"] == "2024.1.0"
+    assert "light" in c.services and c.area_registry == []
+    assert c.states.get(eid).state == "on" and "x.y" not in c.states
+    assert updates == [(eid, {"entity_id": eid, "state": "on"}, None)]
+    assert set(c.bootstrap_stats.timings) == set(c.bootstrap_parts)
+    assert "config/area_registry/list" not in c.bootstrap_stats.errors
+    assert "area_registry" in c.bootstrap_stats.errors
+
+    ws.close()
+    assert wait_until(lambda: not c.ready.is_set(), timeout=3.0)
+
+
+def test_catalog_parts_come_from_cache_and_follow_change_events(monkeypatch, tmp_path):
+    from doubles import DummyWS
+
+    from minihometerm import hass_client
+    from minihometerm.core.catalog import CatalogCache
+
+    monkeypatch.setattr(hass_client.websocket, "WebSocketApp", DummyWS)
+    monkeypatch.setattr(hass_client, "CATALOG_DELAY", 0.01)
+    catalog = CatalogCache(tmp_path, "ws://ha")
+    catalog.store("services", {"light": {"turn_on": {}}}, "2024.1.0")
+    catalog.store("entity_registry", [{"entity_id": "light.a"}], "2024.1.0")
+    c = HAWebSocketClient("ws://ha", "t", catalog=catalog)
+    assert c.services == {"light": {"turn_on": {}}}  # before connecting
+    c.start()
+    try:
+        assert wait_until(lambda: c._ws is not None and c._ws._started.is_set())
+        ws = c._ws
+        ws.server_send({"type": "auth_ok", "ha_version": "2024.1.0"})
+        types = [m["type"] for m in ws.sent]
+        assert "get_services" not in types and "config/entity_registry/list" not in types
+        assert "config/device_registry/list" in types
+        assert sorted(c._bootstrap.stats.cached) == ["entity_registry", "services"]
+
+        subs = {
+            m["event_type"]: m["id"]
+            for m in ws.sent
+            if m["type"] == "subscribe_events" and m["event_type"] != "state_changed"
+        }
+
+        def event(event_type, data):
+            ws.server_send(
+                {
+                    "id": subs[event_type],
+                    "type": "event",
+                    "event": {"event_type": event_type, "data": data},
+                }
+            )
+
+        # A new entity: only that entry is fetched.
+        event("entity_registry_updated", {"action": "create", "entity_id": "light.b"})
+        get = ws.sent[-1]
+        assert get["type"] == "config/entity_registry/get" and get["entity_id"] == "light.b"
+        ws.server_send(
+            {"id": get["id"], "type": "result", "success": True, "result": {"entity_id": "light.b"}}
+        )
+        assert [e["entity_id"] for e in c.entity_registry] == ["light.a", "light.b"]
+        event("entity_registry_updated", {"action": "remove", "entity_id": "light.a"})
+        assert [e["entity_id"] for e in c.entity_registry] == ["light.b"]
+
+        # A burst of service registrations: one refetch of the catalog.
+        event("service_registered", {"domain": "fan", "service": "turn_on"})
+        event("service_registered", {"domain": "fan", "service": "turn_off"})
+        assert wait_until(lambda: ws.sent[-1]["type"] == "get_services")
+        assert [m["type"] for m in ws.sent].count("get_services") == 1
+        ws.server_send(
+            {
+                "id": ws.sent[-1]["id"],
+                "type": "result",
+                "success": True,
+                "result": {"fan": {"turn_on": {}, "turn_off": {}}},
+            }
+        )
+        assert "fan" in c.services
+        assert assert_saved(catalog, "services", {"fan": {"turn_on": {}, "turn_off": {}}})
+    finally:
+        c.stop()
+
+
+def assert_saved(catalog, part, expected):
+    from minihometerm.core.catalog import CatalogCache
+
+    return wait_until(lambda: CatalogCache(catalog.path.parent, "ws://ha").get(part) == expected)
+
+
+def test_low_power_mode_narrows_to_wake_entities_and_resyncs(monkeypatch):
+    from doubles import DummyWS
+
+    monkeypatch.setattr("minihometerm.hass_client.websocket.WebSocketApp", DummyWS)
+    updates = []
+    c = HAWebSocketClient(
+        "ws://ha",
+        "t",
+        on_entity_update=lambda eid, new, old: updates.append(
+            (eid, new and new["state"], old and old["state"])
+        ),
+        bootstrap=("states",),
+    )
+    c.start()
+    try:
+        assert wait_until(lambda: c._ws is not None and c._ws._started.is_set())
+        ws = c._ws
+        ws.server_send({"type": "auth_ok", "ha_version": "2024.1.0"})
+
+        def sent(mtype):
+            return [m for m in ws.sent if m["type"] == mtype]
+
+        def answer(msg, result):
+            ws.server_send({"id": msg["id"], "type": "result", "success": True, "result": result})
+
+        def state(eid, value):
+            return {"entity_id": eid, "state": value, "attributes": {}, "last_changed": "t0"}
+
+        def state_changed(eid, old, new):
+            ws.server_send(
+                {
+                    "id": sent("subscribe_events")[-1]["id"],
+                    "type": "event",
+                    "event": {
+                        "event_type": "state_changed",
+                        "data": {"entity_id": eid, "old_state": old, "new_state": new},
+                    },
+                }
+            )
+
+        answer(
+            sent("get_states")[0],
+            [state("light.a", "on"), state("sensor.b", "1"), state("sensor.c", "x")],
+        )
+        state_sub = sent("subscribe_events")[0]["id"]
+        updates.clear()
+
+        c.enter_low_power(["binary_sensor.doorbell"])
+        assert sent("unsubscribe_events")[-1]["subscription"] == state_sub
+        (trigger,) = sent("subscribe_trigger")
+        assert trigger["trigger"] == {"platform": "state", "entity_id": ["binary_sensor.doorbell"]}
+
+        state_changed("light.a", state("light.a", "on"), state("light.a", "off"))
+        assert updates == []  # in flight before the unsubscribe took effect: dropped
+        ws.server_send(
+            {
+                "id": trigger["id"],
+                "type": "event",
+                "event": {
+                    "variables": {
+                        "trigger": {
+                            "platform": "state",
+                            "entity_id": "binary_sensor.doorbell",
+                            "from_state": state("binary_sensor.doorbell", "off"),
+                            "to_state": state("binary_sensor.doorbell", "on"),
+                        }
+                    }
+                },
+            }
+        )
+        assert updates == [("binary_sensor.doorbell", "on", "off")]
+        updates.clear()
+
+        c.exit_low_power()
+        assert sent("subscribe_events")[-1]["id"] != state_sub
+        assert sent("unsubscribe_events")[-1]["subscription"] == trigger["id"]
+        answer(
+            sent("get_states")[-1],
+            [
+                state("light.a", "off"),
+                state("sensor.b", "1"),
+                state("binary_sensor.doorbell", "on"),
+            ],
+        )
+        assert sorted(updates) == [("light.a", "off", "on"), ("sensor.c", None, "x")]
+
+        updates.clear()
+        state_changed("sensor.b", state("sensor.b", "1"), state("sensor.b", "2"))
+        assert updates == [("sensor.b", "2", "1")]
+    finally:
+        c.stop()
+
+
+def test_prepared_command_splices_in_the_id_and_can_be_withdrawn_offline(client):
+    c, ws_getter, _ = client
+    c.start()
+    ws = ws_getter()
+    assert ws._started.wait(timeout=1.0)
+
+    gate = PreparedCommand(service_call("script", "toggle_gate"))
+    assert encode_command(gate, 7) == (
+        '{"id":7,"type":"call_service","domain":"script","service":"toggle_gate"}'
+    )
+
+    # Offline: queued, so it can still be taken back
+    withdrawn = c.send_command(gate)
+    assert c.cancel_command(withdrawn)
+    assert withdrawn.cancelled()
+
+    ws.server_send({"type": "auth_ok"})
+    sent = c.send_command(gate)
+    assert not c.cancel_command(sent)
+    calls = [m for m in ws.sent if m["type"] == "call_service"]
+    assert len(calls) == 1 and calls[0]["service"] == "toggle_gate"
+    ws.server_send({"id": calls[0]["id"], "type": "result", "success": True, "result": {}})
+    assert sent.result(timeout=1.0) == {}
+
+
+def test_endpoints_are_raced_and_the_first_to_authenticate_is_kept(monkeypatch):
+    from doubles import DummyWS
+
+    opened = []
+
+    def fake_wsapp(*a, **k):
+        ws = DummyWS(*a, **k)
+        opened.append(ws)
+        return ws
+
+    monkeypatch.setattr("minihometerm.hass_client.websocket.WebSocketApp", fake_wsapp)
+    slow, fast, dead = "ws://slow/api/websocket", "ws://fast/api/websocket", "ws://dead"
+    ranking = EndpointRanking([dead, slow, fast])
+    connected = threading.Event()
+    c = HAWebSocketClient(
+        ranking.urls, "token123", race_delay=0.05, endpoints=ranking, on_connect=connected.set
+    )
+    c.start()
+
+    # The dead endpoint fails at once: the slow one opens without waiting for the delay,
+    # the fast one after it.
+    assert wait_until(lambda: len(opened) == 1)
+    opened[0].close()
+    assert wait_until(lambda: len(opened) == 3)
+    first, second = opened[1], opened[2]
+    assert [first.url, second.url] == [slow, fast]
+    assert wait_until(lambda: first.sent and second.sent)
+    assert all(ws.sent[0]["type"] == "auth" for ws in (first, second))
+
+    second.server_send({"type": "auth_ok", "ha_version": "2024.1.0"})
+    assert connected.wait(1.0)
+    assert c.url == fast and c.connected
+    assert first.closed and not second.closed
+    first.server_send({"type": "auth_ok"})  # the loser is ignored
+    assert ranking.ordered() == [fast, slow, dead]
+    assert ranking.get(dead)["failures"] == 1
+
+    # Failover: the next race starts with the endpoint that won this one
+    second.close()
+    assert wait_until(lambda: len(opened) == 4, timeout=3.0)
+    assert opened[3].url == fast
+    c.stop()
+
+
+def test_failed_read_drops_the_connection_and_reconnects():
+    import os
+    import struct
+    import sys
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools"))
+    from fake_ha import FakeHomeAssistant
+
+    def corrupt(conn, _sub_id):
+        # A compressed text frame that does not inflate
+        with conn.lock:
+            conn.sock.sendall(struct.pack("!BB", 0xC1, 4) + b"\xff\xff\xff\xff")
+
+    server = FakeHomeAssistant(compress=True, stream=corrupt).start()
+    connects = []
+    c = HAWebSocketClient(server.url, "token", bootstrap=(), on_connect=lambda: connects.append(1))
+    c.start()
+    try:
+        assert wait_until(lambda: len(connects) >= 2, timeout=5.0)
+        assert c.connected
+    finally:
+        c.stop()
+        server.close()
+
+
+def test_catalog_follows_the_endpoint_that_won_the_race(monkeypatch, tmp_path):
+    from doubles import DummyWS
+
+    from minihometerm.core.catalog import CatalogCache
+
+    opened = []
+
+    def fake_wsapp(*a, **k):
+        ws = DummyWS(*a, **k)
+        opened.append(ws)
+        return ws
+
+    monkeypatch.setattr("minihometerm.hass_client.websocket.WebSocketApp", fake_wsapp)
+    primary, backup = "ws://primary/api/websocket", "ws://backup/api/websocket"
+    CatalogCache(tmp_path, primary).store("services", {"light": {}}, "2024.1.0")
+    cache = CatalogCache(tmp_path, backup)
+    cache.store("services", {"fan": {}}, "2024.1.0")
+    cache.save()
+
+    c = HAWebSocketClient(
+        [primary, backup],
+        "t",
+        race_delay=0.01,
+        catalogs=lambda url: CatalogCache(tmp_path, url),
+    )
+    assert c.catalog.instance == primary
+    c.start()
+    try:
+        assert wait_until(lambda: len(opened) == 2 and opened[1].sent)
+        opened[1].server_send({"type": "auth_ok", "ha_version": "2024.1.0"})
+        assert wait_until(lambda: c.connected)
+        assert c.catalog.instance == backup
+        assert c.services == {"fan": {}}
+        assert "get_services" not in [m["type"] for m in opened[1].sent]
+    finally:
+        c.stop()
+
+
+def test_widened_filter_is_filled_by_a_resync(monkeypatch):
+    from doubles import DummyWS
+
+    monkeypatch.setattr("minihometerm.hass_client.websocket.WebSocketApp", DummyWS)
+    updates = []
+    c = HAWebSocketClient(
+        "ws://ha",
+        "t",
+        entities=["light.a"],
+        on_entity_update=lambda eid, new, old: updates.append(eid),
+        bootstrap=("states",),
+    )
+    states = [
+        {"entity_id": "light.a", "state": "on", "attributes": {}},
+        {"entity_id": "sensor.b", "state": "1", "attributes": {}},
+    ]
+    c.start()
+    try:
+        assert wait_until(lambda: c._ws is not None and c._ws._started.is_set())
+        ws = c._ws
+        ws.server_send({"type": "auth_ok", "ha_version": "2024.1.0"})
+        first = [m for m in ws.sent if m["type"] == "get_states"][0]
+        ws.server_send({"id": first["id"], "type": "result", "success": True, "result": states})
+        assert updates == ["light.a"]
+
+        c.set_entities(())
+        c.resync()
+        again = [m for m in ws.sent if m["type"] == "get_states"][-1]
+        assert again is not first
+        ws.server_send({"id": again["id"], "type": "result", "success": True, "result": states})
+        assert updates == ["light.a", "sensor.b"]  # light.a is unchanged
+        assert sorted(c.states) == ["light.a", "sensor.b"]
+    finally:
+        c.stop()
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+
+from minihometerm.hass_process import RESTART_DELAY, HAClientProcess, client_from_config
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools"))
+
+from fake_ha import FakeHomeAssistant, make_state, state_changed_event  # noqa: E402
+
+
+def wait_until(predicate, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_client_process_streams_states_and_relays_commands():
+    def stream(conn, sub_id):
+        for i in range(1, 51):
+            conn.send_json(state_changed_event(sub_id, "sensor.power", i))
+            conn.send_json(state_changed_event(sub_id, "sensor.ignored", i))
+
+    server = FakeHomeAssistant(
+        compress=False,
+        handlers={"call_service": lambda msg: {"context": {"id": "ctx"}}},
+        stream=stream,
+    ).start()
+    updates = []
+    client = HAClientProcess(
+        server.url,
+        "token",
+        entities=["sensor.power"],
+        on_entity_update=lambda eid, new, old: updates.append((eid, new["state"])),
+        client_options={"bootstrap": ()},
+    )
+    client.start()
+    try:
+        # Spawning the child and importing Kivy there takes a moment.
+        assert client.ready.wait(timeout=30)
+        assert wait_until(
+            lambda: client.poll() >= 0 and updates[-1:] == [("sensor.power", "50")], timeout=5
+        )
+        assert all(eid == "sensor.power" for eid, _ in updates)
+        assert (
+            client.states.get("sensor.power").attributes
+            == make_state("sensor.power", "50")["attributes"]
+        )
+
+        result = client.call_service("light", "toggle", target={"entity_id": "light.a"})
+        assert result == {"context": {"id": "ctx"}}
+        call = [m for m in server.received if m["type"] == "call_service"][0]
+        assert call["target"] == {"entity_id": "light.a"}
+    finally:
+        client.stop(wait=True)
+        server.close()
+    assert client.call_service_async("light", "toggle").exception(timeout=1)
+
+
+def test_stop_during_a_pending_restart_keeps_the_client_down():
+    server = FakeHomeAssistant(compress=False).start()
+    client = HAClientProcess(server.url, "token", client_options={"bootstrap": ()})
+    client.start()
+    try:
+        assert client.ready.wait(timeout=30)
+        child = client._process
+        child.kill()
+        assert wait_until(lambda: not client.connected, timeout=5)
+
+        # The pipe thread is now waiting RESTART_DELAY before spawning a new child
+        began = time.monotonic()
+        client.stop()
+        assert time.monotonic() - began < 0.5
+
+        time.sleep(RESTART_DELAY + 0.5)
+        assert client.restarts == 0
+        assert client._process is None
+        assert not child.is_alive()
+    finally:
+        client.stop(wait=True)
+        server.close()
+
+
+def test_client_from_config_picks_process_mode(mock_cfg):
+    from minihometerm.hass_client import HAWebSocketClient
+
+    assert isinstance(client_from_config(mock_cfg), HAWebSocketClient)
+    mock_cfg.set("connection", "process", "1")
+    mock_cfg.set("connection", "state_slots", "16")
+    client = client_from_config(mock_cfg)
+    assert isinstance(client, HAClientProcess)
+    assert client.slots == 16
+    assert client.config["connection"]["process"] == "1"
@@ -0,0 +1,131 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from minihometerm.ioloop import IOLoop
+
+
+@pytest.fixture
+def loop():
+    lp = IOLoop(name="test-ioloop")
+    lp.start()
+    yield lp
+    lp.stop(timeout=1.0)
+
+
+def test_call_soon_wakes_idle_loop(loop):
+    done = threading.Event()
+    ran_on = []
+
+    # Nothing scheduled: the loop sits in select() without a timeout.
+    time.sleep(0.05)
+    loop.call_soon(lambda: (ran_on.append(threading.current_thread().name), done.set()))
+
+    assert done.wait(timeout=0.5)
+    assert ran_on == ["test-ioloop"]
+
+
+def test_timers_fire_in_order_and_cancel(loop):
+    fired = []
+    done = threading.Event()
+
+    loop.call_later(0.03, fired.append, "late")
+    loop.call_later(0.01, fired.append, "early")
+    loop.call_later(0.02, fired.append, "cancelled").cancel()
+    loop.call_later(0.04, done.set)
+
+    assert done.wait(timeout=1.0)
+    assert fired == ["early", "late"]
+
+
+def test_reader_called_until_it_declines(loop):
+    a, b = socket.socketpair()
+    received = []
+    done = threading.Event()
+
+    def on_readable():
+        received.append(a.recv(16))
+        if len(received) == 2:
+            done.set()
+            return False
+        return True
+
+    loop.add_reader(a, on_readable)
+    b.send(b"one")
+    time.sleep(0.05)
+    b.send(b"two")
+    assert done.wait(timeout=1.0)
+
+    # Removed after returning False: further data is left alone.
+    b.send(b"three")
+    time.sleep(0.05)
+    assert received == [b"one", b"two"]
+    assert a.recv(16) == b"three"
+    a.close()
+    b.close()
+
+
+def test_closed_socket_is_dropped(loop):
+    a, b = socket.socketpair()
+    loop.add_reader(a, lambda: True)
+    time.sleep(0.02)
+    a.close()
+
+    # A new socket reusing the fd number can be registered again.
+    c, d = socket.socketpair()
+    done = threading.Event()
+    loop.add_reader(c, lambda: done.set())
+    d.send(b"x")
+    assert done.wait(timeout=1.0)
+    for s in (b, c, d):
+        s.close()
+
+
+def test_dispatcher_timeout_repeats_while_truthy(loop):
+    calls = []
+    done = threading.Event()
+
+    def check(tag):
+        calls.append(tag)
+        if len(calls) == 3:
+            done.set()
+            return False
+        return True
+
+    loop.timeout(0.01, check, "ping")
+
+    assert done.wait(timeout=1.0)
+    time.sleep(0.05)
+    assert calls == ["ping"] * 3
+
+
+def test_stop_is_prompt_with_far_timer():
+    lp = IOLoop()
+    lp.start()
+    lp.call_later(60.0, lambda: None)
+    time.sleep(0.02)
+
+    t0 = time.monotonic()
+    lp.stop(timeout=1.0)
+
+    assert time.monotonic() - t0 < 0.5
+    assert not lp.running
+
+
+def test_failing_reader_closes_its_socket_and_reports(loop):
+    a, b = socket.socketpair()
+    errors = []
+    done = threading.Event()
+
+    def on_readable():
+        raise ValueError("corrupt frame")
+
+    loop.add_reader(a, on_readable, on_error=lambda e: (errors.append(e), done.set()))
+    b.send(b"x")
+
+    assert done.wait(timeout=1.0)
+    assert isinstance(errors[0], ValueError)
+    assert a.fileno() == -1
+    b.close()
@@ -0,0 +1,137 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from minihometerm.helpers.log_pipeline import LogPipeline, RateLimitFilter, RingBufferHandler
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.messages = []
+        self.threads = set()
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.messages.append(self.format(record))
+        self.threads.add(threading.current_thread().name)
+
+
+@pytest.fixture
+def test_logger(request):
+    log = logging.getLogger(f"pipeline.{request.node.name}")
+    log.propagate = False
+    log.setLevel(logging.DEBUG)
+    yield log
+    log.handlers.clear()
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_rate_limit_counts_repeats_of_one_template():
+    limiter = RateLimitFilter(burst=2, period=0.05)
+
+    def record(wait):
+        return logging.LogRecord("x", logging.WARNING, "", 0, "retry in %.1fs", (wait,), None)
+
+    assert [limiter.filter(record(i)) for i in range(5)] == [True, True, False, False, False]
+    assert limiter.suppressed == 3
+
+    time.sleep(0.06)
+    summary = record(9)
+    assert limiter.filter(summary)
+    assert summary.getMessage() == "retry in 9.0s [3 similar messages suppressed]"
+
+
+def test_ring_buffer_writes_only_around_warnings():
+    target = ListHandler()
+    ring = RingBufferHandler(target, capacity=3)
+    log = logging.getLogger("ring.test")
+    log.propagate = False
+    log.setLevel(logging.DEBUG)
+    log.addHandler(ring)
+    try:
+        for i in range(5):
+            log.info("routine %d", i)
+        assert target.messages == []
+
+        log.warning("trouble")
+        # Only the last records before the warning survive the ring.
+        assert target.messages == ["routine 3", "routine 4", "trouble"]
+
+        log.info("after")
+        ring.flush()
+        assert target.messages[-1] == "after"
+    finally:
+        log.handlers.clear()
+
+
+def test_pipeline_moves_io_off_the_calling_thread(tmp_path, test_logger):
+    console = ListHandler(delay=0.05)
+    file_handler = logging.FileHandler(tmp_path / "app.log")
+    test_logger.addHandler(console)
+    test_logger.addHandler(file_handler)
+    before = list(test_logger.handlers)
+    pipeline = LogPipeline(test_logger, ring_size=100, burst=100)
+    pipeline.start()
+    try:
+        t0 = time.monotonic()
+        for i in range(10):
+            test_logger.info("message %d", i)
+        # Ten records at 50 ms each in the handler, but the caller does not wait.
+        assert time.monotonic() - t0 < 0.05
+
+        assert wait_until(lambda: len(console.messages) == 10)
+        assert console.threads == {"log-writer"}
+        assert (tmp_path / "app.log").read_text() == ""
+
+        pipeline.flush()
+        assert wait_until(lambda: "message 9" in (tmp_path / "app.log").read_text())
+    finally:
+        pipeline.stop()
+
+    assert test_logger.handlers == before
+
+
+def test_pipeline_flushes_file_on_warning_and_stop(tmp_path, test_logger):
+    test_logger.addHandler(logging.FileHandler(tmp_path / "app.log"))
+    pipeline = LogPipeline(test_logger)
+    pipeline.start()
+
+    test_logger.info("context")
+    test_logger.error("boom")
+    assert wait_until(lambda: "boom" in (tmp_path / "app.log").read_text())
+    assert (tmp_path / "app.log").read_text() == "context\nboom\n"
+
+    test_logger.info("late")
+    pipeline.stop()
+    assert (tmp_path / "app.log").read_text().endswith("late\n")
+
+
+def test_full_queue_drops_instead_of_blocking(test_logger):
+    blocker = threading.Event()
+
+    class Stuck(logging.Handler):
+        def emit(self, record):
+            blocker.wait()
+
+    test_logger.addHandler(Stuck())
+    pipeline = LogPipeline(test_logger, queue_size=2, burst=100)
+    pipeline.start()
+    try:
+        for i in range(10):
+            test_logger.info("message %d", i)
+        assert pipeline.dropped >= 7
+    finally:
+        blocker.set()
+        pipeline.stop()
@@ -0,0 +1,44 @@
+import math
+
+import pytest
+
+from minihometerm.core.metrics import Histogram, RollingStats, percentile
+
+
+def test_percentile_nearest_rank():
+    samples = list(range(1, 101))
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 95) == 95
+    assert percentile(samples, 100) == 100
+    assert percentile(samples, 0) == 1
+    assert percentile([], 50) is None
+
+
+def test_rolling_stats_window():
+    stats = RollingStats(window=3)
+    assert stats.last is None and stats.mean() is None
+
+    for v in (10.0, 1.0, 2.0, 3.0):
+        stats.add(v)
+
+    assert len(stats) == 3
+    assert stats.total == 4
+    assert stats.last == 3.0
+    assert stats.mean() == 2.0
+    assert stats.percentile(50) == 2.0
+    assert stats.summary() == {"count": 3.0, "min": 1.0, "p50": 2.0, "p95": 3.0, "max": 3.0}
+
+
+def test_histogram_buckets_and_percentiles():
+    hist = Histogram(bounds=(0.01, 0.1, 1.0))
+    assert hist.percentile(50) is None
+    assert hist.summary()["mean"] is None
+
+    for v in (0.005, 0.05, 0.06, 0.07, 3.0):
+        hist.add(v)
+
+    assert len(hist) == 5
+    assert hist.buckets() == [(0.01, 1), (0.1, 3), (1.0, 0), (math.inf, 1)]
+    assert hist.percentile(50) == 0.1
+    assert hist.percentile(100) == 3.0  # the unbounded bucket reports the largest sample
+    assert hist.summary()["mean"] == pytest.approx(3.185 / 5)
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from minihometerm.core.bindings import resolve_field
+from minihometerm.core.models import EntityState, StateCache
+
+
+def ha_state(eid, state, **attributes):
+    # Round-trip through JSON so strings are fresh objects, as off the wire.
+    return json.loads(
+        json.dumps(
+            {
+                "entity_id": eid,
+                "state": state,
+                "attributes": attributes,
+                "last_changed": "2024-01-01T00:00:00+00:00",
+                "last_updated": "2024-01-01T00:00:00+00:00",
+                "context": {"id": "01HXYZ", "parent_id": None, "user_id": None},
+            }
+        )
+    )
+
+
+def test_entity_state_interns_ids_and_values():
+    a = EntityState.from_dict(ha_state("light.kitchen_ceiling", "unavailable"))
+    b = EntityState.from_dict(ha_state("light.kitchen_ceiling", "unavailable"))
+
+    assert a.entity_id is b.entity_id
+    assert a.state is b.state
+    assert a.last_changed is a.last_updated
+    assert not hasattr(a, "__dict__")
+
+
+def test_attributes_are_parsed_on_read():
+    st = EntityState.from_dict(ha_state("sensor.power", "12.5", unit_of_measurement="W"))
+
+    assert st.raw_attributes == b'{"unit_of_measurement":"W"}'
+    assert st.attributes == {"unit_of_measurement": "W"}
+    stored = EntityState(
+        "sensor.power", "12.5", st.raw_attributes, st.last_changed, st.last_updated
+    )
+    assert stored.attributes == st.attributes and stored == st
+    assert st.attribute("unit_of_measurement") == "W"
+    assert st.attribute("missing", 0) == 0
+    assert EntityState("sensor.bare", "1").attributes == {}
+
+
+def test_entity_state_reads_like_a_state_dict():
+    raw = ha_state("weather.home", "sunny", forecast=[{"temperature": 21.5}])
+    st = EntityState.from_dict(raw)
+
+    assert st["state"] == "sunny"
+    assert resolve_field(st, None) == "sunny"
+    assert resolve_field(st, "forecast.0.temperature") == 21.5
+    assert st.get("context") is None
+    with pytest.raises(KeyError):
+        st["context"]
+    assert st.to_dict() == {k: v for k, v in raw.items() if k != "context"}
+
+
+def test_state_cache_updates_and_removes():
+    cache = StateCache()
+    first = cache.update("sensor.power", ha_state("sensor.power", "1", unit="W"))
+    second = cache.update("sensor.power", ha_state("sensor.power", "2", unit="W"))
+
+    assert cache.get("sensor.power") is second
+    assert second.attributes is first.attributes  # unchanged attributes shared
+    assert "sensor.power" in cache and len(cache) == 1
+    assert list(cache) == ["sensor.power"]
+
+    assert cache.update("sensor.power", None) is None
+    assert cache.get("sensor.power") is None
+    assert len(cache) == 0
+
+
+def test_updates_do_not_encode_attributes(monkeypatch):
+    from minihometerm.core import models
+
+    def fail(*args, **kwargs):
+        raise AssertionError("attributes encoded on update")
+
+    monkeypatch.setattr(models, "encode_attributes", fail)
+    cache = StateCache()
+    raw = ha_state("sensor.power", "1", unit="W")
+    state = cache.update("sensor.power", raw)
+    assert state.attributes is raw["attributes"]
+    assert cache.update("sensor.power", ha_state("sensor.power", "2", unit="W")).state == "2"
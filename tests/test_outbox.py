@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from minihometerm.core.outbox import CommandQueue, command_key, resolve
+
+TOGGLE = {"type": "call_service", "domain": "script", "service": "toggle_gate"}
+
+
+def test_command_key_is_order_independent():
+    assert command_key({"a": 1, "b": {"x": 1, "y": 2}}) == command_key(
+        {"b": {"y": 2, "x": 1}, "a": 1}
+    )
+
+
+def test_duplicates_collapse_into_first_future():
+    q = CommandQueue()
+
+    first = q.put(dict(TOGGLE))
+    second = q.put(dict(TOGGLE))
+    other = q.put({**TOGGLE, "service": "toggle_garage_gate"})
+    undeduped = q.put(dict(TOGGLE), dedupe=False)
+
+    assert first is second
+    assert other is not first and undeduped is not first
+    assert len(q) == 3
+    assert q.stats.collapsed == 1
+
+
+def test_drain_returns_live_commands_in_order():
+    q = CommandQueue()
+    f1 = q.put({"type": "a"})
+    f2 = q.put({"type": "b"})
+    q.put({"type": "c"}).cancel()
+
+    items = q.drain()
+
+    assert [cmd.payload["type"] for cmd in items] == ["a", "b"]
+    assert [cmd.future for cmd in items] == [f1, f2]
+    assert len(q) == 0
+    # After draining the same command queues again instead of collapsing
+    assert q.put({"type": "a"}) is not f1
+
+
+def test_expired_commands_fail_with_timeout():
+    q = CommandQueue(ttl=10.0)
+    short = q.put({"type": "short"}, ttl=0.01)
+    long = q.put({"type": "long"})
+    time.sleep(0.02)
+
+    assert q.expire() == 1
+    with pytest.raises(TimeoutError):
+        short.result(timeout=0)
+    assert not long.done()
+    assert q.stats.expired == 1
+    assert q.next_expiry() is not None
+
+
+def test_full_queue_rejects():
+    q = CommandQueue(max_size=1)
+    q.put({"type": "a"})
+
+    rejected = q.put({"type": "b"})
+
+    with pytest.raises(ConnectionError):
+        rejected.result(timeout=0)
+    assert q.stats.rejected == 1
+
+
+def test_resolve_ignores_done_futures():
+    q = CommandQueue()
+    fut = q.put({"type": "a"})
+
+    assert resolve(fut, 1)
+    assert not resolve(fut, 2)
+    assert fut.result() == 1
+
+
+def test_discard_withdraws_a_queued_command():
+    q = CommandQueue()
+    f1 = q.put(dict(TOGGLE))
+    f2 = q.put({"type": "b"})
+
+    assert q.discard(f1)
+    assert f1.cancelled()
+    assert not q.discard(f1)
+    assert [cmd.future for cmd in q.drain()] == [f2]
+    # Its key is free again
+    assert q.put(dict(TOGGLE)) is not f1
+
+
+def test_discard_keeps_a_command_other_callers_still_wait_on():
+    q = CommandQueue()
+    first = q.put(dict(TOGGLE))
+    second = q.put(dict(TOGGLE))
+
+    assert not q.discard(second)
+    assert not first.cancelled()
+    assert q.discard(first)
+    assert first.cancelled()
+    assert len(q) == 0
@@ -0,0 +1,39 @@
+import threading
+import time
+
+from minihometerm.core.persist import DeferredSave
+
+
+def wait_until(predicate, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_requests_are_merged_into_one_save_off_the_caller_thread():
+    threads = []
+    saver = DeferredSave(lambda: threads.append(threading.current_thread()), delay=0.05)
+
+    for _ in range(10):
+        saver.request()
+    assert saver.pending and threads == []
+
+    assert wait_until(lambda: threads)
+    time.sleep(0.1)
+    assert len(threads) == 1 and threads[0] is not threading.current_thread()
+    assert not saver.pending
+
+
+def test_flush_saves_a_pending_change_now():
+    saved = []
+    saver = DeferredSave(lambda: saved.append(threading.current_thread()), delay=10.0)
+
+    saver.flush()
+    assert saved == []
+    saver.request()
+    saver.flush()
+    assert saved == [threading.current_thread()]
+    assert not saver.pending
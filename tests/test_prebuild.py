@@ -0,0 +1,68 @@
+import time
+
+from minihometerm.ui.prebuild import IdleBuilder
+
+
+def slow_steps(log, name, steps, seconds=0.0):
+    def build():
+        for i in range(steps):
+            time.sleep(seconds)
+            log.append((name, i))
+            yield
+        return name.upper()
+
+    return build
+
+
+def test_tasks_run_in_order_within_the_frame_budget():
+    log, done = [], []
+    builder = IdleBuilder(budget=0.005, quiet=0)
+    builder.add("a", slow_steps(log, "a", 3, 0.003), on_done=done.append)
+    builder.add("b", lambda: "plain", on_done=done.append)
+
+    assert builder.step() == 2  # 3 ms steps, 5 ms budget
+    assert log == [("a", 0), ("a", 1)]
+    while builder.pending:
+        builder.step()
+
+    assert log == [("a", 0), ("a", 1), ("a", 2)]
+    assert done == ["A", "plain"]
+    assert builder.result("a") == "A"
+    assert builder.stats.built == 2
+
+
+def test_input_pauses_building():
+    log = []
+    builder = IdleBuilder(budget=1.0, quiet=0.3)
+    builder.add("a", slow_steps(log, "a", 2))
+
+    builder.notify_input()
+    assert builder.step() == 0
+    assert builder.step(now=time.monotonic() + 0.31) == 3  # two steps and the return
+    assert builder.stats.paused == 1
+
+
+def test_ensure_finishes_a_task_right_away():
+    log = []
+    builder = IdleBuilder(budget=0, quiet=0)
+    builder.add("a", slow_steps(log, "a", 2))
+    builder.add("b", slow_steps(log, "b", 2))
+    builder.step()
+
+    assert builder.ensure("b") == "B"
+    assert log == [("a", 0), ("b", 0), ("b", 1)]
+    assert builder.ensure("b") == "B"  # already built
+    assert builder.stats.forced == 1
+    assert builder.pending == 1
+
+
+def test_failing_task_is_dropped():
+    builder = IdleBuilder(budget=1.0, quiet=0)
+    builder.add("bad", lambda: 1 / 0)
+    builder.add("good", lambda: 1)
+
+    builder.step()
+
+    assert builder.pending == 0
+    assert builder.result("bad") is None and builder.result("good") == 1
+    assert builder.stats.failed == 1
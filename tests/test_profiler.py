@@ -0,0 +1,77 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from minihometerm.helpers.profiler import CornerTaps, SamplingProfiler
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def busy_dispatch(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_labels_threads_and_writes_collapsed_stacks(tmp_path):
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_dispatch, args=(stop,), name="ha-dispatcher")
+    worker.start()
+    profiler = SamplingProfiler(rate=200, duration=0.3, directory=tmp_path)
+    try:
+        assert profiler.start()
+        assert not profiler.start()  # already running
+        assert wait_until(lambda: not profiler.running)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profiler.samples > 10
+    (path,) = profiler.profiles
+    lines = path.read_text().splitlines()
+    stacks = dict(line.rsplit(" ", 1) for line in lines)
+    assert all(int(count) > 0 for count in stacks.values())
+    dispatcher = [s for s in stacks if s.startswith("dispatcher;")]
+    assert dispatcher and all("busy_dispatch (test_profiler.py:" in s for s in dispatcher)
+    assert any(s.startswith("ui;") for s in stacks)  # the test's own main thread
+    assert not any(s.startswith("profiler;") for s in stacks)
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="no SIGUSR1")
+def test_signal_toggles_profiling(tmp_path):
+    profiler = SamplingProfiler(rate=100, duration=60, directory=tmp_path)
+    previous = signal.getsignal(signal.SIGUSR1)
+    try:
+        assert profiler.install_signal()
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert wait_until(lambda: profiler.running)
+        time.sleep(0.05)
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert wait_until(lambda: not profiler.running)
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+        profiler.stop()
+    assert len(profiler.profiles) == 1
+
+
+def test_corner_taps():
+    taps = CornerTaps(taps=3, within=1.0, size=0.1)
+    # 800x480 window: the corner is the 48 px square at the top left.
+    assert not taps.feed(10, 470, 800, 480, now=0.0)
+    assert not taps.feed(10, 470, 800, 480, now=0.2)
+    assert taps.feed(40, 440, 800, 480, now=0.4)
+
+    assert not taps.feed(10, 470, 800, 480, now=1.0)
+    assert not taps.feed(10, 470, 800, 480, now=1.5)
+    assert not taps.feed(10, 470, 800, 480, now=2.5)  # too slow
+    assert not taps.feed(400, 240, 800, 480, now=2.6)  # elsewhere: starts over
+    assert not taps.feed(10, 470, 800, 480, now=2.7)
@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+import time
+
+from minihometerm.core.models import StateCache
+from minihometerm.core.search import EntityIndex
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools"))
+
+from bench_memory import make_states  # noqa: E402
+
+
+def make_index():
+    index = EntityIndex()
+    index.update("light.living_room", "Living room")
+    index.update("light.kitchen", "Kitchen ceiling")
+    index.update("sensor.kitchen_temperature", "Kitchen temperature")
+    index.update("switch.garage_door", "Garage")
+    return index
+
+
+def test_short_terms_match_word_prefixes():
+    index = make_index()
+
+    assert index.search("li") == ["light.kitchen", "light.living_room"]
+    # "it" is inside "kitchen" but starts no word
+    assert index.search("it") == []
+
+
+def test_longer_terms_match_substrings_ranked():
+    index = make_index()
+
+    assert index.search("kitchen") == ["light.kitchen", "sensor.kitchen_temperature"]
+    assert index.search("itch") == [
+        "light.kitchen",
+        "sensor.kitchen_temperature",
+        "switch.garage_door",
+    ]
+    assert index.search("light.kitchen") == ["light.kitchen"]
+    assert index.search("kitchen temp") == ["sensor.kitchen_temperature"]
+    assert index.search("ARAG") == ["switch.garage_door"]
+
+
+def test_updates_and_removals_are_incremental():
+    index = make_index()
+
+    assert index.update("light.kitchen", "Kitchen ceiling") is False
+    assert index.update("light.kitchen", "Pantry") is True
+    assert index.search("pantry") == ["light.kitchen"]
+    assert index.search("ceiling") == []
+
+    index.remove("switch.garage_door")
+    assert "switch.garage_door" not in index
+    assert index.search("gar") == []
+    assert len(index) == 3
+
+
+def test_from_states_uses_friendly_names():
+    states = StateCache()
+    states.update("light.x", {"state": "on", "attributes": {"friendly_name": "Desk lamp"}})
+
+    index = EntityIndex.from_states(states)
+
+    assert index.search("desk") == ["light.x"]
+    assert index.name("light.x") == "Desk lamp"
+
+
+def test_keystrokes_stay_fast_with_5000_entities():
+    states = StateCache()
+    for state in json.loads(make_states(5000)):
+        states.update(state["entity_id"], state)
+    index = EntityIndex.from_states(states)
+
+    query = "window 122"
+    worst = 0.0
+    for n in range(1, len(query) + 1):
+        t0 = time.perf_counter()
+        index.search(query[:n])
+        worst = max(worst, time.perf_counter() - t0)
+
+    assert index.search(query)[0] == "binary_sensor.window_122_contact"
+    # A few ms on a desktop; generous for slow CI runners.
+    assert worst < 0.05
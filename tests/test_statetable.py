@@ -0,0 +1,82 @@
+import pytest
+
+from minihometerm.core.statetable import StateTable
+
+
+def state(entity_id, value, **attributes):
+    return {
+        "entity_id": entity_id,
+        "state": value,
+        "attributes": attributes,
+        "last_changed": "2024-01-01T00:00:00+00:00",
+        "last_updated": "2024-01-01T00:00:00+00:00",
+    }
+
+
+@pytest.fixture
+def tables():
+    writer = StateTable.create(slots=4, slot_size=256)
+    reader = StateTable.attach(writer.name)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def test_reader_sees_only_slots_written_since_last_call(tables):
+    writer, reader = tables
+    assert reader.changes() == []
+
+    writer.write("light.a", state("light.a", "on", brightness=200))
+    writer.write("sensor.b", state("sensor.b", "1"))
+    writer.write("sensor.b", state("sensor.b", "2"))  # latest wins
+
+    assert reader.changes() == [
+        ("light.a", state("light.a", "on", brightness=200)),
+        ("sensor.b", state("sensor.b", "2")),
+    ]
+    assert reader.changes() == []
+
+    writer.write("light.a", None)
+    assert reader.changes() == [("light.a", None)]
+
+
+def test_slot_caught_mid_write_is_retried(tables):
+    writer, reader = tables
+    writer.write("light.a", state("light.a", "on"))
+    writer.write("sensor.b", state("sensor.b", "1"))
+    reader.changes()
+
+    writer.write("light.a", state("light.a", "off"))
+    writer.write("sensor.b", state("sensor.b", "2"))
+    writer._seqs[0] += 1  # the writer is in the middle of the next update of light.a
+
+    assert reader.changes() == [("sensor.b", state("sensor.b", "2"))]
+    assert reader.changes() == []  # still busy, and nothing else changed
+
+    writer._seqs[0] += 1
+    assert reader.changes() == [("light.a", state("light.a", "off"))]
+
+
+def test_oversized_states_and_full_table(tables):
+    writer, reader = tables
+
+    assert writer.write("sensor.big", state("sensor.big", "1", blob="x" * 500))
+    assert reader.changes() == [("sensor.big", state("sensor.big", "1"))]
+    assert not writer.write("sensor.huge", state("sensor.huge", "x" * 500))
+
+    for i in range(3):
+        assert writer.write(f"light.{i}", state(f"light.{i}", "on"))
+    assert not writer.write("light.extra", state("light.extra", "on"))
+    assert [eid for eid, _ in reader.changes()] == ["light.0", "light.1", "light.2"]
+
+
+def test_attach_rejects_other_segments():
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(create=True, size=64)
+    try:
+        with pytest.raises(ValueError):
+            StateTable.attach(shm.name)
+    finally:
+        shm.close()
+        shm.unlink()
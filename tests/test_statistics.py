@@ -0,0 +1,216 @@
+import math
+import time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+
+import pytest
+
+from minihometerm.core import statistics
+from minihometerm.core.statistics import (
+    Series,
+    StatisticsFeed,
+    StatisticsStore,
+    aggregate,
+    parse_charts,
+)
+from minihometerm.ui.statistics import bar_rects, chart_geometry, line_points
+
+HOUR = 3600
+DAY = 86400
+T0 = int(time.time()) // DAY * DAY - 30 * DAY  # a recent UTC midnight
+
+
+def rows(count, start=T0, temperature=True):
+    """Hourly recorder rows: temperature-like (mean/min/max) or energy-like (sum)."""
+    out = []
+    for i in range(count):
+        row = {"start": (start + i * HOUR) * 1000, "end": (start + (i + 1) * HOUR) * 1000}
+        if temperature:
+            row.update(mean=10.0 + i % 24, min=9.0 + i % 24, max=11.0 + i % 24)
+        else:
+            row["sum"] = 0.5 * (i + 1)
+        out.append(row)
+    return out
+
+
+class FakeClient:
+    def __init__(self):
+        self.sent = []
+
+    def send_command(self, msg, ttl=None, dedupe=True):
+        future = Future()
+        self.sent.append((msg, future))
+        return future
+
+
+def same(a, b):
+    assert len(a) == len(b)
+    for x, y in zip(a, b):
+        assert (math.isnan(x) and math.isnan(y)) or x == pytest.approx(y)
+
+
+def test_series_appends_only_newer_rows():
+    series = Series()
+    assert series.extend(rows(3)) == 3
+    assert series.last_start == T0 + 2 * HOUR
+    assert math.isnan(series.columns["sum"][0])
+
+    # Overlapping fetch: older rows are ignored, the last one is replaced
+    again = rows(5)
+    again[2]["mean"] = 99.0
+    assert series.extend(again) == 3
+    assert len(series) == 5
+    assert series.columns["mean"][2] == 99.0
+
+    iso = {"start": datetime.fromtimestamp(T0 + 5 * HOUR, timezone.utc).isoformat(), "mean": 1}
+    assert series.extend([iso]) == 1
+    assert series.last_start == T0 + 5 * HOUR
+
+    assert series.trim(T0 + 2 * HOUR) == 2
+    assert series.start[0] == T0 + 2 * HOUR
+    assert all(len(column) == len(series) for column in series.columns.values())
+
+
+def test_aggregate_daily_buckets():
+    series = Series()
+    series.extend(rows(48))
+    buckets = aggregate(series, DAY, since=T0)
+
+    assert list(buckets.start) == [T0, T0 + DAY]
+    assert list(buckets["mean"]) == [21.5, 21.5]
+    assert list(buckets["min"]) == [9.0, 9.0]
+    assert list(buckets["max"]) == [34.0, 34.0]
+    assert math.isnan(buckets["sum"][0])
+
+    energy = Series()
+    energy.extend(rows(48, temperature=False))
+    buckets = aggregate(energy, DAY, since=T0 + HOUR)
+    # The first bucket grows from the row before ``since``
+    same(buckets["change"], [11.5, 12.0])
+    same(buckets["sum"], [12.0, 24.0])
+    assert len(aggregate(energy, DAY, since=T0 + 10 * DAY)) == 0
+
+
+def test_aggregate_skips_gaps_and_aligns_to_offset():
+    series = Series()
+    data = rows(6, temperature=False)
+    del data[5]["sum"]
+    series.extend(data)
+    buckets = aggregate(series, 3 * HOUR, offset=HOUR)
+    assert list(buckets.start) == [T0 - HOUR, T0 + 2 * HOUR, T0 + 5 * HOUR]
+    # A bucket without a sum keeps the last known one
+    same(buckets["sum"], [1.0, 2.5, 2.5])
+    same(buckets["change"], [math.nan, 1.5, 0.0])
+
+
+@pytest.mark.parametrize("offset", [0, 2 * HOUR, -5 * HOUR])
+def test_numpy_and_python_aggregation_agree(monkeypatch, offset):
+    np = pytest.importorskip("numpy")
+    series = Series()
+    data = rows(24 * 10) + rows(24, start=T0 + 12 * DAY, temperature=False)
+    for i in range(0, len(data), 7):
+        data[i].pop("min", None)
+    series.extend(data)
+
+    fast = aggregate(series, DAY, since=T0 + 3 * HOUR, offset=offset)
+    monkeypatch.setattr(statistics, "np", None)
+    slow = aggregate(series, DAY, since=T0 + 3 * HOUR, offset=offset)
+    assert np is not None and len(fast) == len(slow)
+    same(fast.start, slow.start)
+    for name in statistics.AGGREGATES:
+        same(fast[name], slow[name])
+
+
+def test_store_persists_and_drops_old_rows(tmp_path):
+    path = tmp_path / "cache" / "statistics.json"
+    store = StatisticsStore(path, keep=2 * DAY)
+    assert store.next_start("sensor.t") is None
+    assert store.extend("sensor.t", "hour", rows(72), now=T0 + 3 * DAY) == 72
+    assert store.extend("sensor.t", "hour", rows(72), now=T0 + 3 * DAY) == 1
+    # Written later, off the caller's thread
+    assert not path.exists()
+    store.flush()
+
+    warm = StatisticsStore(path)
+    series = warm.series("sensor.t")
+    assert len(series) == 48
+    assert warm.next_start("sensor.t") == T0 + 72 * HOUR
+    same(series.columns["sum"], [math.nan] * 48)
+
+
+def test_store_ignores_corrupt_file(tmp_path):
+    path = tmp_path / "statistics.json"
+    path.write_text('{"hour": {"sensor.t": {"start": [1, 2], "mean": [1]}}, "month": 3}')
+    assert len(StatisticsStore(path).series("sensor.t")) == 0
+    path.write_text("{not json")
+    assert len(StatisticsStore(path).series("sensor.t")) == 0
+
+
+def test_store_readers_do_not_share_rows_with_extend():
+    store = StatisticsStore()
+    store.extend("sensor.t", "hour", rows(24), now=T0 + DAY)
+    copy = store.series("sensor.t")
+    buckets = store.aggregate("sensor.t", "hour", DAY, since=T0)
+
+    store.extend("sensor.t", "hour", rows(24, start=T0 + DAY), now=T0 + 2 * DAY)
+    assert len(copy) == 24 and len(buckets) == 1
+    assert len(store.series("sensor.t")) == 48
+    assert list(store.aggregate("sensor.t", "hour", DAY, since=T0).start) == [T0, T0 + DAY]
+    assert len(store.aggregate("sensor.none", "hour", DAY)) == 0
+
+
+def test_feed_fetches_only_what_is_missing():
+    client = FakeClient()
+    store = StatisticsStore()
+    changed = []
+    feed = StatisticsFeed(
+        client, ["sensor.t", "sensor.e"], store=store, history=DAY, on_change=changed.append
+    )
+
+    request = feed.request(now=T0 + DAY)
+    assert request["type"] == "recorder/statistics_during_period"
+    assert request["period"] == "hour"
+    assert request["types"] == ["mean", "min", "max", "sum"]
+    assert datetime.fromisoformat(request["start_time"]).timestamp() == T0
+
+    future = feed.refresh()
+    assert feed.refresh() is None  # one request at a time
+    future.set_result({"sensor.t": rows(24), "sensor.e": []})
+    assert changed == [["sensor.t"]]
+
+    store.extend("sensor.e", "hour", rows(2, temperature=False))
+    request = feed.request(now=T0 + DAY)
+    assert datetime.fromisoformat(request["start_time"]).timestamp() == T0 + 2 * HOUR
+
+    feed.refresh().set_exception(RuntimeError("Unknown command"))
+    assert changed == [["sensor.t"]]
+    assert len(client.sent) == 2
+
+    with pytest.raises(ValueError):
+        StatisticsFeed(client, ["sensor.t"], period="month")
+
+
+def test_parse_charts():
+    assert parse_charts(" sensor.energy:change, sensor.temp ,") == [
+        ("sensor.energy", "change"),
+        ("sensor.temp", "mean"),
+    ]
+    with pytest.raises(ValueError):
+        parse_charts("sensor.temp:median")
+
+
+def test_chart_geometry_scales_to_the_box():
+    box = (0.0, 0.0, 100.0, 50.0)
+    bars = bar_rects([1.0, math.nan, 4.0, -1.0], None, box, -1.0, 4.0, gap=0.2)
+    assert bars[0] == pytest.approx((2.5, 10.0, 20.0, 10.0))
+    assert bars[1] is None
+    assert bars[3] == pytest.approx((77.5, 0.0, 20.0, 10.0))
+    assert line_points([0.0, math.nan, 4.0], box, 0.0, 4.0) == pytest.approx(
+        [100 / 6, 0.0, 500 / 6, 50.0]
+    )
+
+    series = Series()
+    series.extend(rows(48))
+    geometry = chart_geometry(aggregate(series, DAY), "mean", box)
+    assert len(geometry["bars"]) == 2 and len(geometry["points"]) == 4
+    assert chart_geometry(aggregate(series, DAY), "change", box)["bars"] == [None, None]
@@ -0,0 +1,98 @@
+import gc
+import time
+from datetime import datetime
+from datetime import time as dtime
+
+import pytest
+from kivy.config import ConfigParser
+from kivy.graphics import Color
+from kivy.weakproxy import WeakProxy
+
+from minihometerm.ui.theme import THEMES, Theme, compile_theme, configured_theme, theme_for_time
+
+
+class Target:
+    font_size = None
+
+
+def test_compile_turns_hex_colours_into_rgba():
+    table = compile_theme({"a": "#ff000080", "b": "#00ff00", "size": "15sp"})
+    assert table["a"] == pytest.approx((1.0, 0.0, 0.0, 128 / 255))
+    assert table["b"] == (0.0, 1.0, 0.0, 1.0)
+    assert table["size"] == "15sp"
+
+
+def test_themes_define_the_same_keys():
+    keys = {name: set(definition) for name, definition in THEMES.items()}
+    assert keys["dark"] == keys["light"]
+
+
+def test_bind_applies_now_and_switch_updates_only_changed_keys():
+    theme = Theme("dark")
+    surface, active = Color(), Color()
+    target = Target()
+    theme.bind("surface", surface)
+    theme.bind("surface_active", active)  # same colour in both themes
+    theme.bind("font_body", target, "font_size")
+    assert tuple(surface.rgba) == pytest.approx(theme["surface"])
+    assert target.font_size == "15sp"
+
+    assert theme.switch("light") == 1
+    assert theme.name == "light"
+    assert tuple(surface.rgba) == pytest.approx(compile_theme(THEMES["light"])["surface"])
+    assert theme.switch("light") == 0
+    with pytest.raises(KeyError):
+        theme.switch("sepia")
+
+
+def test_unbound_and_collected_targets_are_left_alone():
+    theme = Theme("dark")
+    kept, dropped, collected = Color(), Color(), Color()
+    for color in (kept, dropped, collected):
+        theme.bind("surface", color)
+    theme.unbind("surface", dropped)
+    del color, collected
+    gc.collect()
+    before = tuple(dropped.rgba)
+    assert theme.switch("light") == 1
+    assert tuple(dropped.rgba) == before
+
+
+def test_switch_of_a_screenful_fits_in_a_frame():
+    theme = Theme("dark")
+    colors = [Color() for _ in range(1000)]
+    keys = list(THEMES["dark"])[:6]
+    for i, color in enumerate(colors):
+        theme.bind(keys[i % len(keys)], color)
+    started = time.perf_counter()
+    theme.switch("light")
+    elapsed = time.perf_counter() - started
+    assert elapsed < 1 / 60
+
+
+def test_theme_for_time_spans_midnight():
+    night, day = dtime(20, 0), dtime(7, 0)
+    assert theme_for_time(dtime(23, 30), night, day) == "dark"
+    assert theme_for_time(dtime(3, 0), night, day) == "dark"
+    assert theme_for_time(dtime(7, 0), night, day) == "light"
+    assert theme_for_time(dtime(12, 0), dtime(9, 0), dtime(17, 0)) == "dark"
+
+
+def test_configured_theme():
+    cfg = ConfigParser()
+    cfg.read_dict({"ui": {"theme": "auto", "dark_from": "21:30", "dark_until": "6:00"}})
+    assert configured_theme(cfg, datetime(2024, 1, 1, 21, 0)) == "light"
+    assert configured_theme(cfg, datetime(2024, 1, 1, 21, 45)) == "dark"
+    cfg.set("ui", "theme", "Light")
+    assert configured_theme(cfg, datetime(2024, 1, 1, 23, 0)) == "light"
+
+
+def test_kv_id_proxies_are_bound_to_their_widget():
+    theme = Theme("dark")
+    color = Color()
+    proxy = WeakProxy(color)
+    theme.bind("text", proxy)
+    assert theme.switch("light") == 1
+    assert tuple(color.rgba) == pytest.approx(theme["text"])
+    theme.unbind("text", proxy)
+    assert theme.switch("dark") == 0
@@ -0,0 +1,172 @@
+import threading
+import time
+
+import pytest
+
+from minihometerm.core.throttle import UpdateThrottle, parse_intervals
+
+
+def wait_for(predicate, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_parse_intervals():
+    assert parse_intervals("") == {}
+    assert parse_intervals("sensor: 1.0, sensor.power_meter:0.25") == {
+        "sensor": 1.0,
+        "sensor.power_meter": 0.25,
+    }
+    with pytest.raises(ValueError):
+        parse_intervals("sensor 1.0")
+
+
+def test_interval_lookup_prefers_entity_over_domain():
+    t = UpdateThrottle(lambda *a: None, min_interval=0.1, intervals={"sensor": 1.0, "sensor.x": 2})
+
+    assert t.interval_for("sensor.x") == 2
+    assert t.interval_for("sensor.y") == 1.0
+    assert t.interval_for("light.z") == 0.1
+
+
+def test_latest_wins_keeps_first_old_state():
+    delivered = []
+    t = UpdateThrottle(lambda eid, new, old: delivered.append((eid, new, old)))
+
+    # Not started yet: everything queues up and coalesces.
+    t.submit("sensor.power", {"state": "1"}, {"state": "0"})
+    t.submit("sensor.power", {"state": "2"}, {"state": "1"})
+    t.submit("sensor.power", {"state": "3"}, {"state": "2"})
+    assert t.pending() == 1
+
+    t.start()
+    try:
+        assert wait_for(lambda: delivered)
+    finally:
+        t.stop()
+
+    assert delivered == [("sensor.power", {"state": "3"}, {"state": "0"})]
+    assert t.stats.received == 3
+    assert t.stats.coalesced == 2
+    assert t.stats.delivered == 1
+
+
+def test_min_interval_rate_limits_per_entity():
+    delivered = []
+    t = UpdateThrottle(lambda eid, new, old: delivered.append(new["state"]), min_interval=0.2)
+    t.start()
+    try:
+        t.submit("sensor.power", {"state": "1"})
+        assert wait_for(lambda: delivered == ["1"])
+        for i in range(2, 20):
+            t.submit("sensor.power", {"state": str(i)})
+        # Still inside the interval: nothing else may be delivered yet.
+        time.sleep(0.05)
+        assert delivered == ["1"]
+        assert wait_for(lambda: len(delivered) == 2)
+    finally:
+        t.stop()
+
+    assert delivered == ["1", "19"]
+    assert t.stats.coalesced == 17
+
+
+def test_overflow_flushes_early_instead_of_dropping():
+    delivered = []
+    t = UpdateThrottle(
+        lambda eid, new, old: delivered.append((eid, new["state"])),
+        min_interval=10.0,
+        max_pending=1,
+    )
+    t.start()
+    try:
+        t.submit("sensor.a", {"state": "1"})
+        assert wait_for(lambda: delivered == [("sensor.a", "1")])
+        t.submit("sensor.a", {"state": "2"})  # rate limited for 10 s
+        time.sleep(0.05)
+        assert t.pending() == 1
+
+        # A new entity finds the queue full: both go out now
+        t.submit("sensor.b", {"state": "on"})
+        assert wait_for(lambda: len(delivered) == 3)
+    finally:
+        t.stop()
+
+    assert sorted(delivered[1:]) == [("sensor.a", "2"), ("sensor.b", "on")]
+    assert t.stats.overflow == 1
+    assert t.stats.delivered == 3
+
+
+def test_restart_right_after_stop_keeps_one_worker():
+    release = threading.Event()
+    delivered = []
+
+    def consumer(eid, new, old):
+        release.wait(timeout=2.0)
+        delivered.append(threading.current_thread())
+
+    t = UpdateThrottle(consumer)
+    t.start()
+    try:
+        t.submit("sensor.a", {"state": "0"})
+        assert wait_for(lambda: t.pending() == 0)
+        t.stop(0)  # the worker is still inside the consumer
+        t.start()
+        release.set()
+        assert wait_for(lambda: len(delivered) == 1)
+        for i in range(1, 20):
+            t.submit(f"sensor.s{i}", {"state": "on"})
+            time.sleep(0.002)
+        assert wait_for(lambda: len(delivered) == 20)
+    finally:
+        t.stop()
+    assert len(set(delivered[1:])) == 1 and delivered[1] is not delivered[0]
+
+
+def test_submit_does_not_block_on_slow_consumer():
+    release = threading.Event()
+    delivered = []
+
+    def slow_consumer(eid, new, old):
+        release.wait(timeout=2.0)
+        delivered.append(new["state"])
+
+    t = UpdateThrottle(slow_consumer)
+    t.start()
+    try:
+        t.submit("sensor.a", {"state": "0"})
+        assert wait_for(lambda: t.pending() == 0)
+
+        start = time.monotonic()
+        for i in range(1000):
+            t.submit("sensor.a", {"state": str(i)})
+        assert time.monotonic() - start < 0.5
+        assert t.pending() == 1
+
+        release.set()
+        assert wait_for(lambda: delivered == ["0", "999"])
+    finally:
+        release.set()
+        t.stop()
+
+
+def test_consumer_errors_are_logged_not_fatal():
+    delivered = []
+
+    def consumer(eid, new, old):
+        if eid == "bad.one":
+            raise RuntimeError("boom")
+        delivered.append(eid)
+
+    t = UpdateThrottle(consumer)
+    t.start()
+    try:
+        t.submit("bad.one", {})
+        t.submit("good.one", {})
+        assert wait_for(lambda: delivered == ["good.one"])
+    finally:
+        t.stop()
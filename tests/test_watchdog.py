@@ -0,0 +1,75 @@
+import gc
+import json
+import time
+
+from minihometerm.helpers.watchdog import StallWatchdog
+
+
+def wait_until(predicate, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def slow_handler(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def collecting_handler():
+    gc.collect()
+    slow_handler(0.12)
+
+
+def test_stall_is_reported_with_stack_gc_and_metrics(tmp_path):
+    path = tmp_path / "stalls.jsonl"
+    wd = StallWatchdog(budget=0.05, path=path, metrics=lambda: {"fps": 58.0})
+    wd.start(schedule=False)
+    try:
+        for _ in range(5):  # a few healthy frames
+            wd.beat()
+            time.sleep(0.01)
+        assert wd.stats.stalls == 0
+        collecting_handler()
+        wd.beat()
+        assert wait_until(lambda: wd.stats.stalls == 1)
+    finally:
+        wd.stop()
+
+    report = wd.reports[-1]
+    assert report["duration"] >= 0.12
+    assert any("collecting_handler" in line for line in report["stack"])
+    assert report["gc"]["collections"] >= 1
+    assert report["frames"]["count"] == 5
+    assert report["metrics"] == {"fps": 58.0}
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [report]
+
+
+def test_report_file_keeps_the_latest_stalls(tmp_path):
+    path = tmp_path / "stalls.jsonl"
+    wd = StallWatchdog(budget=0.03, path=path, max_reports=2)
+    wd.start(schedule=False)
+    try:
+        for i in range(3):
+            wd.beat()
+            slow_handler(0.06 + i * 0.03)
+            wd.beat()
+            assert wait_until(lambda i=i: wd.stats.stalls == i + 1)
+    finally:
+        wd.stop()
+
+    assert all(r["stack"][-1].endswith(" slow_handler") for r in wd.reports)
+    durations = [json.loads(line)["duration"] for line in path.read_text().splitlines()]
+    assert len(durations) == 2 and durations[0] < durations[1]
+    assert [r["duration"] for r in StallWatchdog(path=path).reports] == durations
+
+
+def test_disabled_with_zero_budget():
+    wd = StallWatchdog(budget=0)
+    wd.start(schedule=False)
+    assert wd._thread is None
+    wd.stop()
@@ -0,0 +1,125 @@
+import json
+import struct
+import zlib
+
+from websocket import ABNF
+
+from minihometerm.ext import ws_deflate
+from minihometerm.ext.ws_deflate import InflatingFrameBuffer, TrafficStats
+
+
+def server_frame(payload: bytes, opcode=ABNF.OPCODE_TEXT, fin=True, rsv1=False) -> bytes:
+    b1 = (0x80 if fin else 0) | (0x40 if rsv1 else 0) | opcode
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", b1, n)
+    elif n < 65536:
+        header = struct.pack("!BBH", b1, 126, n)
+    else:
+        header = struct.pack("!BBQ", b1, 127, n)
+    return header + payload
+
+
+def deflate(compressor, data: bytes) -> bytes:
+    out = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    assert out.endswith(b"\x00\x00\xff\xff")
+    return out[:-4]
+
+
+class Wire:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def recv(self, bufsize):
+        chunk, self.data = self.data[:bufsize], self.data[bufsize:]
+        return chunk
+
+
+def state_message(i):
+    return json.dumps(
+        {
+            "type": "event",
+            "event": {
+                "event_type": "state_changed",
+                "data": {
+                    "entity_id": "sensor.power_meter",
+                    "new_state": {"state": str(i), "attributes": {"unit": "W"}},
+                },
+            },
+        }
+    ).encode()
+
+
+def test_parse_extension_header():
+    assert ws_deflate.parse_extension_header(None) is None
+    assert ws_deflate.parse_extension_header("x-webkit-deflate-frame") is None
+    assert ws_deflate.parse_extension_header(
+        "permessage-deflate; server_no_context_takeover; client_max_window_bits=15"
+    ) == {"server_no_context_takeover": None, "client_max_window_bits": "15"}
+
+
+def test_inflates_compressed_messages_with_context_takeover():
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    messages = [state_message(i) for i in range(3)]
+    wire = Wire(b"".join(server_frame(deflate(compressor, m), rsv1=True) for m in messages))
+    stats = TrafficStats()
+    fb = InflatingFrameBuffer(wire.recv, False, stats, params={})
+
+    assert [fb.recv_frame().data for _ in messages] == messages
+    assert stats.messages_in == stats.compressed_messages_in == 3
+    assert stats.payload_bytes_in == sum(len(m) for m in messages)
+    # Later messages reuse the shared window, so the stream shrinks a lot.
+    assert stats.wire_bytes_in < stats.payload_bytes_in
+    assert stats.compression_ratio > 1.0
+
+
+def test_fragmented_and_uncompressed_messages():
+    message = state_message(42)
+    compressed = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    body = deflate(compressed, message)
+    half = len(body) // 2
+    wire = Wire(
+        server_frame(body[:half], fin=False, rsv1=True)
+        + server_frame(b"", opcode=ABNF.OPCODE_PING)
+        + server_frame(body[half:], opcode=ABNF.OPCODE_CONT)
+        + server_frame(b'{"type": "pong"}')
+    )
+    stats = TrafficStats()
+    fb = InflatingFrameBuffer(wire.recv, False, stats, params={"server_no_context_takeover": None})
+
+    first, ping, cont, plain = (fb.recv_frame() for _ in range(4))
+
+    assert ping.opcode == ABNF.OPCODE_PING
+    assert first.data + cont.data == message
+    assert plain.data == b'{"type": "pong"}'
+    assert stats.messages_in == 2
+    assert stats.compressed_messages_in == 1
+
+
+def test_accounting_only_without_negotiation():
+    message = state_message(1)
+    frame = server_frame(message)
+    stats = TrafficStats()
+    fb = InflatingFrameBuffer(Wire(frame).recv, False, stats)
+
+    assert fb.recv_frame().data == message
+    assert stats.wire_bytes_in == len(frame)
+    assert stats.payload_bytes_in == len(message)
+
+
+def test_install_checks_handshake_response():
+    class FakeSock:
+        def __init__(self, headers):
+            self.frame_buffer = ws_deflate.frame_buffer(Wire(b"").recv, True)
+            self.headers = headers
+
+        def getheaders(self):
+            return self.headers
+
+    accepted = FakeSock({"sec-websocket-extensions": "permessage-deflate"})
+    refused = FakeSock({})
+
+    assert ws_deflate.install(accepted, TrafficStats(), compression=True)
+    assert not ws_deflate.install(refused, TrafficStats(), compression=True)
+    assert isinstance(refused.frame_buffer, InflatingFrameBuffer)
+    assert not ws_deflate.install(object(), TrafficStats(), compression=True)
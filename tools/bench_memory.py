@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Measure how much memory the latest states of many entities take.
+
+Compares keeping the decoded HA state dicts (what ``get_states`` / ``state_changed``
+deliver) with keeping them in a ``StateCache`` of ``EntityState`` records. Sizes are
+traced allocations after the decoded payload itself has been released.
+
+    python tools/bench_memory.py --entities 5000
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from minihometerm.core.models import StateCache  # noqa: E402
+
+
+def make_states(count: int, seed: int = 1) -> bytes:
+    """A ``get_states`` result with a plausible mix of lights, switches and sensors."""
+    rnd = random.Random(seed)
+    states = []
+    for i in range(count):
+        stamp = f"2024-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}.123456+00:00"
+        kind = i % 4
+        if kind == 0:
+            eid = f"light.room_{i}_ceiling_lamp"
+            state = rnd.choice(["on", "off", "unavailable"])
+            attributes = {
+                "supported_color_modes": ["color_temp", "xy"],
+                "color_mode": "xy",
+                "brightness": rnd.randrange(256),
+                "hs_color": [rnd.uniform(0, 360), rnd.uniform(0, 100)],
+                "xy_color": [rnd.random(), rnd.random()],
+                "friendly_name": f"Room {i} ceiling lamp",
+                "supported_features": 40,
+            }
+        elif kind == 1:
+            eid = f"switch.outlet_{i}_power"
+            state = rnd.choice(["on", "off"])
+            attributes = {"friendly_name": f"Outlet {i} power", "icon": "mdi:power-socket-eu"}
+        elif kind == 2:
+            eid = f"binary_sensor.window_{i}_contact"
+            state = rnd.choice(["on", "off", "unavailable"])
+            attributes = {"device_class": "window", "friendly_name": f"Window {i} contact"}
+        else:
+            eid = f"sensor.meter_{i}_power"
+            state = f"{rnd.uniform(0, 3000):.1f}"
+            attributes = {
+                "state_class": "measurement",
+                "unit_of_measurement": "W",
+                "device_class": "power",
+                "friendly_name": f"Meter {i} power",
+            }
+        states.append(
+            {
+                "entity_id": eid,
+                "state": state,
+                "attributes": attributes,
+                "last_changed": stamp,
+                "last_reported": stamp,
+                "last_updated": stamp,
+                "context": {"id": f"01HXYZ{i:020d}", "parent_id": None, "user_id": None},
+            }
+        )
+    return json.dumps(states).encode()
+
+
+def traced(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def keep_dicts(payload: bytes):
+    return {st["entity_id"]: st for st in json.loads(payload)}
+
+
+def keep_cache(payload: bytes):
+    cache = StateCache()
+    for st in json.loads(payload):
+        cache.update(st["entity_id"], st)
+    return cache
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--entities", type=int, default=5000)
+    args = ap.parse_args()
+
+    payload = make_states(args.entities)
+    dicts = traced(lambda: keep_dicts(payload))
+    cache = traced(lambda: keep_cache(payload))
+
+    print(f"{args.entities} entities, {len(payload) / 1024:.0f} KiB of JSON")
+    print(f"{'':12} {'total KiB':>10} {'bytes/entity':>13}")
+    for name, size in (("state dicts", dicts), ("StateCache", cache)):
+        print(f"{name:12} {size / 1024:10.0f} {size / args.entities:13.0f}")
+    print(f"StateCache uses {cache / dicts:.0%} of the memory ({dicts / cache:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
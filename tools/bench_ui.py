@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Measure UI frame times without a display.
+
+Builds ``MiniHomeTerm``, every screen found in ``minihometerm.ui`` and a few widgets in
+a hidden window, drives synthetic entity updates and taps through them and reports
+per-frame event, layout and canvas-draw times plus widget and instruction counts.
+
+Frames are stepped by hand the way ``EventLoop.idle`` does, without the fps limiter:
+
+- events: ``Clock.tick`` (scheduled callbacks, property updates) and input dispatch
+- layout: ``Clock.tick_draw`` (layout triggers) and kv rule sync
+- draw: walking the canvas instruction tree (``Window.on_draw``); with the default
+  ``KIVY_GL_BACKEND=mock`` this is the CPU cost of issuing the instructions
+
+``--max-p95`` and ``--baseline`` make the exit status non-zero on a regression, so
+numbers from ``--save`` on one commit can gate the next:
+
+    python tools/bench_ui.py --frames 300 --save ui.json
+    python tools/bench_ui.py --frames 300 --baseline ui.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+os.environ.setdefault("KIVY_NO_CONFIG", "1")
+os.environ.setdefault("KIVY_GL_BACKEND", "mock")
+os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from kivy.config import Config  # noqa: E402
+
+# Step frames as fast as possible instead of sleeping to the fps limit.
+Config.set("graphics", "maxfps", "0")
+Config.set("graphics", "width", "720")
+Config.set("graphics", "height", "720")
+
+from kivy.base import EventLoop  # noqa: E402
+from kivy.clock import Clock  # noqa: E402
+from kivy.graphics import InstructionGroup  # noqa: E402
+from kivy.lang import Builder  # noqa: E402
+from kivy.tests.common import UnitTestTouch  # noqa: E402
+from kivy.uix.behaviors import ButtonBehavior  # noqa: E402
+from kivy.uix.gridlayout import GridLayout  # noqa: E402
+from kivy.uix.label import Label  # noqa: E402
+from kivy.uix.screenmanager import ScreenManager  # noqa: E402
+
+from minihometerm.config import load_config  # noqa: E402
+from minihometerm.core.bindings import BindingRegistry  # noqa: E402
+from minihometerm.core.metrics import percentile  # noqa: E402
+from minihometerm.ui.loader import discover_screens  # noqa: E402
+
+PHASES = ("events", "layout", "draw", "total")
+
+
+class Scenario:
+    """A widget tree plus what to do to it before each frame."""
+
+    def __init__(self, name: str, build: Callable, update: Optional[Callable] = None):
+        self.name = name
+        self.build = build
+        self.update = update
+
+
+def count_instructions(widget) -> int:
+    count = 0
+    for w in widget.walk(restrict=True):
+        stack = [c for c in (w.canvas.before, w.canvas, w.canvas.after) if c is not None]
+        while stack:
+            group = stack.pop()
+            for child in group.children:
+                count += 1
+                if isinstance(child, InstructionGroup):
+                    stack.append(child)
+    return count
+
+
+def tap_targets(root) -> List:
+    return [w for w in root.walk(restrict=True) if isinstance(w, ButtonBehavior)]
+
+
+def make_states(entities: int, seed: int = 1) -> Callable[[int], List]:
+    rnd = random.Random(seed)
+    ids = [f"sensor.bench_{i}" for i in range(entities)]
+
+    def states(count: int):
+        return [
+            (eid, {"entity_id": eid, "state": f"{rnd.uniform(0, 100):.1f}", "attributes": {}})
+            for eid in rnd.sample(ids, min(count, len(ids)))
+        ]
+
+    return states
+
+
+def entity_grid(entities: int, per_frame: int) -> Scenario:
+    """One label per entity, fed through a ``BindingRegistry`` like dashboard tiles."""
+    registry = BindingRegistry()
+    states = make_states(entities)
+
+    def build():
+        grid = GridLayout(cols=max(int(entities**0.5), 1))
+        for i in range(entities):
+            label = Label(text="–")
+            registry.bind(
+                f"sensor.bench_{i}", lambda _e, value, _s, lbl=label: setattr(lbl, "text", value)
+            )
+            grid.add_widget(label)
+        return grid
+
+    def update(_frame: int):
+        for eid, state in states(per_frame):
+            registry.dispatch(eid, state)
+
+    return Scenario("entities", build, update)
+
+
+def button_grid(count: int, per_frame: int) -> Scenario:
+    """``count`` action buttons in a ``ButtonGrid``, their state entities toggling."""
+    from minihometerm.config import ButtonConfig
+    from minihometerm.ui.buttons import ButtonGrid
+
+    registry = BindingRegistry()
+    rnd = random.Random(3)
+    ids = [f"input_boolean.bench_{i}" for i in range(count)]
+
+    def build():
+        grid = ButtonGrid(cols=4)
+        grid.set_buttons(
+            [
+                ButtonConfig(key=str(i), label=f"Button {i}", state_entity=eid)
+                for i, eid in enumerate(ids)
+            ]
+        )
+        grid.bind_entities(registry)
+        return grid
+
+    def update(_frame: int):
+        for eid in rnd.sample(ids, min(per_frame, count)):
+            registry.dispatch(eid, {"entity_id": eid, "state": rnd.choice(["on", "off"])})
+
+    return Scenario("buttons", build, update)
+
+
+def entity_browser(entities: int, query: str) -> Scenario:
+    """The browser screen over ``entities`` cached states, the query typed key by key."""
+    from bench_memory import make_states as make_state_dicts
+
+    from minihometerm.core.models import StateCache
+    from minihometerm.ui.browser import EntityBrowserScreen
+
+    states = StateCache()
+    for state in json.loads(make_state_dicts(entities)):
+        states.update(state["entity_id"], state)
+    screen: List = []
+
+    def build():
+        screen[:] = [EntityBrowserScreen(name="browser")]
+        screen[0].set_states(states)
+        return wrap(screen[0])
+
+    def update(frame: int):
+        # Type the query, then delete it again, one key per frame.
+        step = frame % (2 * len(query))
+        typed = step + 1 if step < len(query) else 2 * len(query) - step - 1
+        screen[0].search_input.text = query[:typed]
+
+    return Scenario("browser", build, update)
+
+
+def forecast_panel(days: int, every: int) -> Scenario:
+    from minihometerm.ui.forecast import ForecastPanel
+
+    rnd = random.Random(2)
+    panel: List = []
+
+    def build():
+        panel[:] = [ForecastPanel(days=days)]
+        return panel[0]
+
+    def update(frame: int):
+        if frame % every:
+            return
+        panel[0].set_forecast(
+            [
+                {
+                    "datetime": f"2024-01-{d + 1:02d}T12:00:00+00:00",
+                    "condition": rnd.choice(["sunny", "rainy", "cloudy"]),
+                    "temperature": rnd.uniform(-5, 30),
+                    "templow": rnd.uniform(-10, 10),
+                }
+                for d in range(days)
+            ]
+        )
+
+    return Scenario("forecast", build, update)
+
+
+def scenarios(args) -> List[Scenario]:
+    from minihometerm.app import MiniHomeTerm
+
+    app = MiniHomeTerm(load_config())
+    found = [Scenario("app", app.build)]
+    for cls in discover_screens("minihometerm.ui"):
+        found.append(Scenario(f"screen:{cls.__name__}", lambda cls=cls: wrap(cls(name="bench"))))
+    found.append(entity_grid(args.entities, args.updates))
+    found.append(button_grid(args.buttons, args.updates))
+    found.append(entity_browser(args.browser_entities, args.query))
+    found.append(forecast_panel(5, args.forecast_every))
+    return found
+
+
+def wrap(screen):
+    sm = ScreenManager()
+    sm.add_widget(screen)
+    return sm
+
+
+def run(scenario: Scenario, frames: int, warmup: int, tap_every: int) -> Dict:
+    window = EventLoop.window
+    root = scenario.build()
+    window.add_widget(root)
+    targets: List = []
+    times: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+    perf = time.perf_counter
+    try:
+        for frame in range(warmup + frames):
+            if frame == warmup:
+                targets = tap_targets(root)
+            t0 = perf()
+            if scenario.update:
+                scenario.update(frame)
+            Clock.tick()
+            if targets and frame % tap_every == 0:
+                target = targets[(frame // tap_every) % len(targets)]
+                touch = UnitTestTouch(*target.to_window(*target.center))
+                touch.touch_down()
+                touch.touch_up()
+            t1 = perf()
+            Builder.sync()
+            Clock.tick_draw()
+            Builder.sync()
+            t2 = perf()
+            if window.canvas.needs_redraw:
+                window.dispatch("on_draw")
+            t3 = perf()
+            if frame >= warmup:
+                times["events"].append(t1 - t0)
+                times["layout"].append(t2 - t1)
+                times["draw"].append(t3 - t2)
+                times["total"].append(t3 - t0)
+    finally:
+        window.remove_widget(root)
+
+    result: Dict = {
+        "widgets": sum(1 for _ in root.walk(restrict=True)),
+        "instructions": count_instructions(root),
+        "taps": len(targets),
+    }
+    for phase, values in times.items():
+        values.sort()
+        result[phase] = {
+            "p50": percentile(values, 50) * 1000,
+            "p95": percentile(values, 95) * 1000,
+            "p99": percentile(values, 99) * 1000,
+            "max": values[-1] * 1000,
+        }
+    return result
+
+
+def regressions(
+    results: Dict[str, Dict], max_p95: Optional[float], baseline: Dict, tolerance: float
+) -> List[str]:
+    failures = []
+    for name, r in results.items():
+        p95 = r["total"]["p95"]
+        if max_p95 is not None and p95 > max_p95:
+            failures.append(f"{name}: p95 {p95:.2f} ms > limit {max_p95:.2f} ms")
+        old = baseline.get(name)
+        if old:
+            limit = old["total"]["p95"] * (1 + tolerance)
+            if p95 > limit:
+                failures.append(
+                    f"{name}: p95 {p95:.2f} ms > baseline {old['total']['p95']:.2f} ms "
+                    f"+{tolerance:.0%}"
+                )
+            if r["widgets"] > old["widgets"]:
+                failures.append(f"{name}: {r['widgets']} widgets, baseline {old['widgets']}")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--entities", type=int, default=48, help="tiles in the entity grid")
+    parser.add_argument("--buttons", type=int, default=40, help="tiles in the button grid")
+    parser.add_argument("--browser-entities", type=int, default=5000)
+    parser.add_argument("--query", default="window 12", help="typed into the browser")
+    parser.add_argument("--updates", type=int, default=8, help="entity updates per frame")
+    parser.add_argument("--tap-every", type=int, default=10, help="frames between taps")
+    parser.add_argument("--forecast-every", type=int, default=30)
+    parser.add_argument("--only", help="run only scenarios whose name contains this")
+    parser.add_argument("--max-p95", type=float, help="fail if a frame p95 exceeds this (ms)")
+    parser.add_argument("--baseline", help="JSON from --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save", help="write the results as JSON")
+    args = parser.parse_args()
+
+    EventLoop.ensure_window()
+    if EventLoop.window is None:
+        raise SystemExit("no window provider available")
+
+    results = {}
+    for scenario in scenarios(args):
+        if args.only and args.only not in scenario.name:
+            continue
+        results[scenario.name] = run(scenario, args.frames, args.warmup, args.tap_every)
+
+    print(f"{args.frames} frames per scenario, times in ms (p50 / p95 / p99 / max)")
+    print(
+        f"{'scenario':<28} {'widgets':>7} {'instr':>6} "
+        + " ".join(f"{phase:>23}" for phase in PHASES)
+    )
+    for name, r in results.items():
+        cells = " ".join(
+            "{p50:>5.2f}/{p95:>5.2f}/{p99:>5.2f}/{max:>5.1f}".format(**r[phase]) for phase in PHASES
+        )
+        print(f"{name:<28} {r['widgets']:>7} {r['instructions']:>6} {cells}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    failures = regressions(results, args.max_p95, baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark HAWebSocketClient against a fake Home Assistant server.
+
+Streams synthetic state_changed events with permessage-deflate off and on and reports
+bytes on the wire against client CPU time. The server runs in a child process so the
+CPU numbers only cover the client.
+
+    python tools/bench_ws.py --events 5000
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_ha import Connection, FakeHomeAssistant, state_changed_event  # noqa: E402
+
+from minihometerm.hass_client import HAWebSocketClient  # noqa: E402
+
+
+def run_server(compress: bool, events: int, entities: int, port_queue) -> None:
+    def stream(conn: Connection, sub_id: int) -> None:
+        for i in range(1, events + 1):
+            conn.send_json(state_changed_event(sub_id, f"sensor.power_meter_{i % entities}", i))
+
+    server = FakeHomeAssistant(compress=compress, stream=stream)
+    port_queue.put(server.url)
+    server.serve_forever()
+
+
+def bench(compress: bool, events: int, entities: int) -> dict:
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=run_server, args=(compress, events, entities, port_queue), daemon=True
+    )
+    server.start()
+    url = port_queue.get(timeout=10)
+
+    done = threading.Event()
+    received = [0]
+
+    def on_update(eid, new_state, old_state):
+        received[0] += 1
+        if received[0] >= events:
+            done.set()
+
+    client = HAWebSocketClient(url, "token", on_entity_update=on_update, compression=compress)
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    client.start()
+    ok = done.wait(timeout=120)
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    client.stop()
+    server.terminate()
+    server.join()
+    if not ok:
+        raise SystemExit(f"only {received[0]}/{events} events arrived")
+
+    t = client.traffic
+    return {
+        "mode": "deflate" if client.compression_active else "plain",
+        "wire": t.wire_bytes_in,
+        "payload": t.payload_bytes_in,
+        "ratio": t.compression_ratio,
+        "cpu": cpu,
+        "wall": wall,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--entities", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = [bench(compress, args.events, args.entities) for compress in (False, True)]
+
+    print(f"{args.events} state_changed events, {args.entities} entities")
+    print(
+        f"{'mode':<8} {'wire KiB':>10} {'payload KiB':>12} {'ratio':>6} {'cpu s':>7} {'wall s':>7}"
+    )
+    for r in rows:
+        print(
+            f"{r['mode']:<8} {r['wire'] / 1024:>10.1f} {r['payload'] / 1024:>12.1f} "
+            f"{r['ratio']:>6.2f} {r['cpu']:>7.3f} {r['wall']:>7.3f}"
+        )
+    plain, deflate = rows
+    print(
+        f"deflate: {deflate['wire'] / max(plain['wire'], 1):.1%} of the bytes, "
+        f"{deflate['cpu'] / max(plain['cpu'], 1e-9):.2f}x the CPU"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for the Home Assistant websocket API, used by the benchmarks.
+
+It speaks just enough RFC 6455 (and optionally permessage-deflate) to authenticate a
+client, answer commands and stream synthetic ``state_changed`` events.
+"""
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import zlib
+from typing import Callable, Dict, List, Optional
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def make_state(entity_id: str, value: str, i: int = 0) -> Dict:
+    stamp = f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}.000000+00:00"
+    return {
+        "entity_id": entity_id,
+        "state": value,
+        "attributes": {
+            "state_class": "measurement",
+            "unit_of_measurement": "W",
+            "device_class": "power",
+            "friendly_name": entity_id.split(".", 1)[1].replace("_", " ").title(),
+        },
+        "last_changed": stamp,
+        "last_reported": stamp,
+        "last_updated": stamp,
+        "context": {"id": f"01HXYZ{i:020d}", "parent_id": None, "user_id": None},
+    }
+
+
+def state_changed_event(sub_id: int, entity_id: str, i: int) -> Dict:
+    return {
+        "id": sub_id,
+        "type": "event",
+        "event": {
+            "event_type": "state_changed",
+            "data": {
+                "entity_id": entity_id,
+                "old_state": make_state(entity_id, str(i - 1), i - 1),
+                "new_state": make_state(entity_id, str(i), i),
+            },
+            "origin": "LOCAL",
+            "time_fired": "2024-01-01T00:00:00.000000+00:00",
+            "context": {"id": f"01HXYZ{i:020d}", "parent_id": None, "user_id": None},
+        },
+    }
+
+
+class Connection:
+    def __init__(self, sock: socket.socket, compress: bool):
+        self.sock = sock
+        self.compress = compress
+        self.deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        self.lock = threading.Lock()
+        self._buf = b""
+
+    # ---------- Handshake ----------
+
+    def handshake(self) -> None:
+        while b"\r\n\r\n" not in self._buf:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("client went away during handshake")
+            self._buf += chunk
+        head, self._buf = self._buf.split(b"\r\n\r\n", 1)
+        headers = {}
+        for line in head.decode("latin-1").split("\r\n")[1:]:
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if "sec-websocket-key" not in headers:
+            # Plain HTTP, e.g. a camera_proxy request: nothing else is served here
+            self.sock.sendall(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+            raise ConnectionError("not a websocket request")
+        digest = hashlib.sha1((headers["sec-websocket-key"] + GUID).encode()).digest()  # nosec
+        lines = [
+            "HTTP/1.1 101 Switching Protocols",
+            "Upgrade: websocket",
+            "Connection: Upgrade",
+            f"Sec-WebSocket-Accept: {base64.b64encode(digest).decode()}",
+        ]
+        offered = "permessage-deflate" in headers.get("sec-websocket-extensions", "")
+        self.compress = self.compress and offered
+        if self.compress:
+            lines.append("Sec-WebSocket-Extensions: permessage-deflate")
+        self.sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode())
+
+    # ---------- Frames ----------
+
+    def send_json(self, payload: Dict) -> None:
+        data = json.dumps(payload).encode()
+        # Event stream and command replies send from different threads: the shared
+        # deflate context must see the messages in the order they go on the wire.
+        with self.lock:
+            b1 = 0x81
+            if self.compress:
+                data = self.deflate.compress(data) + self.deflate.flush(zlib.Z_SYNC_FLUSH)
+                data = data[:-4]
+                b1 |= 0x40
+            n = len(data)
+            if n < 126:
+                header = struct.pack("!BB", b1, n)
+            elif n < 65536:
+                header = struct.pack("!BBH", b1, 126, n)
+            else:
+                header = struct.pack("!BBQ", b1, 127, n)
+            self.sock.sendall(header + data)
+
+    def _read(self, n: int) -> bytes:
+        while len(self._buf) < n:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("client closed")
+            self._buf += chunk
+        data, self._buf = self._buf[:n], self._buf[n:]
+        return data
+
+    def recv_json(self) -> Optional[Dict]:
+        b1, b2 = self._read(2)
+        opcode = b1 & 0x0F
+        n = b2 & 0x7F
+        if n == 126:
+            (n,) = struct.unpack("!H", self._read(2))
+        elif n == 127:
+            (n,) = struct.unpack("!Q", self._read(8))
+        mask = self._read(4) if b2 & 0x80 else b"\x00\x00\x00\x00"
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(self._read(n)))
+        if opcode == 0x8:
+            raise ConnectionError("close frame")
+        if opcode != 0x1:
+            return None
+        return json.loads(payload)
+
+
+class FakeHomeAssistant:
+    """
+    Threaded fake HA server. ``handlers`` maps command types to functions returning
+    the ``result`` payload; ``stream`` is called once ``subscribe_events`` succeeded.
+    """
+
+    def __init__(
+        self,
+        compress: bool = True,
+        handlers: Optional[Dict[str, Callable[[Dict], object]]] = None,
+        stream: Optional[Callable[[Connection, int], None]] = None,
+    ):
+        self.compress = compress
+        self.handlers = handlers or {}
+        self.stream = stream
+        self.received: List[Dict] = []
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+        self.url = f"ws://127.0.0.1:{self.port}/api/websocket"
+
+    def serve_forever(self) -> None:
+        while True:
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def start(self) -> "FakeHomeAssistant":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def close(self) -> None:
+        self._server.close()
+
+    def _serve(self, sock: socket.socket) -> None:
+        conn = Connection(sock, self.compress)
+        try:
+            conn.handshake()
+            conn.send_json({"type": "auth_required", "ha_version": "2024.1.0"})
+            auth = conn.recv_json()
+            if not auth or auth.get("type") != "auth":
+                return
+            conn.send_json({"type": "auth_ok", "ha_version": "2024.1.0"})
+            while True:
+                msg = conn.recv_json()
+                if msg is None:
+                    continue
+                self.received.append(msg)
+                self._dispatch(conn, msg)
+        except OSError:
+            pass
+        finally:
+            sock.close()
+
+    def _dispatch(self, conn: Connection, msg: Dict) -> None:
+        mtype = msg.get("type")
+        if mtype == "ping":
+            conn.send_json({"id": msg["id"], "type": "pong"})
+            return
+        result = self.handlers[mtype](msg) if mtype in self.handlers else None
+        conn.send_json({"id": msg["id"], "type": "result", "success": True, "result": result})
+        if mtype == "subscribe_events" and self.stream:
+            threading.Thread(target=self.stream, args=(conn, msg["id"]), daemon=True).start()